@@ -0,0 +1,131 @@
+"""
+Sistema de Supermercado - Aplicação Flask
+Desenvolvido com Flask, PostgreSQL e interface moderna
+
+A aplicação é criada por create_app(); as rotas ficam nos blueprints de
+app/rotas (auth, admin, pdv e api). Bibliotecas pesadas (ReportLab) são
+importadas apenas quando uma nota fiscal em PDF é gerada.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente antes dos módulos que as leem na importação
+load_dotenv()
+
+from flask import Flask
+
+from app.extensoes import db, login_manager
+# Modelos reexportados para os scripts (populate_db.py, benchmark.py)
+from app.modelos import (Usuario, Produto, Venda, ItemVenda,
+                         ResumoVendaProduto, ResumoVendaCategoria, ResumoVendaOperador)
+from app.caches import cache_recibos
+
+# ==================== FÁBRICA DA APLICAÇÃO ====================
+
+def create_app(config=None):
+    """Cria e configura a aplicação Flask
+
+    `config` permite sobrescrever qualquer chave de configuração (por exemplo,
+    SQLALCHEMY_DATABASE_URI em benchmarks).
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'chave-padrao-desenvolvimento')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///supermercado.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    # Pool de conexões (por processo): com vários workers o banco recebe até
+    # workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) conexões
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+            'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1'
+        }
+    
+    # Métricas de requisições e consultas (METRICAS=0 desativa sem custo algum)
+    app.config['METRICAS'] = os.getenv('METRICAS', '1') == '1'
+    app.config['METRICAS_TOKEN'] = os.getenv('METRICAS_TOKEN')
+    
+    # Telas recebendo eventos de estoque/preço por processo: com workers gthread
+    # cada uma ocupa uma thread, então o limite deve ficar abaixo de WEB_THREADS
+    app.config['EVENTOS_MAX_ASSINANTES'] = int(os.getenv('EVENTOS_MAX_ASSINANTES', '500'))
+    
+    # Meses de vendas arquivados (python populate_db.py arquivar), ao lado do banco
+    app.config['VENDAS_ARQUIVO_DIR'] = os.getenv('VENDAS_ARQUIVO_DIR') or \
+        os.path.join(app.instance_path, 'arquivo_vendas')
+    
+    if config:
+        app.config.update(config)
+    
+    # Notas fiscais em instance/recibos, ao lado do banco SQLite padrão
+    if cache_recibos.diretorio is None:
+        cache_recibos.diretorio = os.path.join(app.instance_path, 'recibos')
+    
+    # Inicialização das extensões
+    db.init_app(app)
+    login_manager.init_app(app)
+    
+    from app.rotas.auth import auth_bp
+    from app.rotas.admin import admin_bp
+    from app.rotas.pdv import pdv_bp
+    from app.rotas.api import api_bp
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(pdv_bp)
+    app.register_blueprint(api_bp)
+    
+    if app.config['METRICAS']:
+        from app.metricas import instalar_metricas
+        with app.app_context():
+            engines = list(db.engines.values())
+        instalar_metricas(
+            app, engines,
+            limite_lento=float(os.getenv('METRICAS_CONSULTA_LENTA_MS', '100')) / 1000,
+            limite_consultas=int(os.getenv('METRICAS_LIMITE_CONSULTAS', '50')),
+            server_timing=os.getenv('METRICAS_SERVER_TIMING', '1') == '1'
+        )
+    
+    return app
+
+# ==================== INICIALIZAÇÃO DO BANCO DE DADOS ====================
+
+def init_db():
+    """Inicializa o banco de dados e cria usuário admin padrão"""
+    from app import migracoes
+    from app.relatorios import reconstruir_resumos
+    
+    migracoes.aplicar_migracoes(db)
+    
+    # Bancos anteriores aos resumos de vendas: calcular a partir do histórico
+    if not db.session.query(ResumoVendaOperador.dia).first() and db.session.query(Venda.id).first():
+        dias = reconstruir_resumos()
+        print(f"Resumos de vendas reconstruídos ({dias} dias)")
+    
+    # Criar usuário admin padrão se não existir
+    admin = Usuario.query.filter_by(login='admin').first()
+    if not admin:
+        admin = Usuario(
+            nome='Administrador',
+            login='admin',
+            tipo='admin'
+        )
+        admin.set_password('admin123')
+        db.session.add(admin)
+        
+        # Criar usuário operador padrão
+        operador = Usuario(
+            nome='Operador',
+            login='operador',
+            tipo='operador'
+        )
+        operador.set_password('op123')
+        db.session.add(operador)
+        
+        db.session.commit()
+        print("Usuários padrão criados:")
+        print("Admin - Login: admin, Senha: admin123")
+        print("Operador - Login: operador, Senha: op123")
@@ -0,0 +1,279 @@
+"""
+Sistema de Supermercado - Arquivo mensal de vendas antigas
+Os meses fechados saem de vendas/itens_venda para um arquivo por mês
+(vendas-AAAA-MM.jsonl.gz), mantendo as tabelas do dia a dia do tamanho dos
+últimos meses. Cada arquivo é uma sequência de blocos gzip independentes de
+VENDAS_POR_BLOCO vendas em ordem de id, e a tabela arquivo_vendas guarda
+onde está cada bloco: a reimpressão de uma nota arquivada descomprime só o
+bloco da venda. Os resumos diários dos relatórios não são arquivados, e cada
+venda arquivada deixa uma linha em resumo_vendas_arquivadas (id, operador,
+data, total e itens) para o histórico paginar sem descomprimir os meses.
+"""
+
+import gzip
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app
+
+from app.extensoes import db
+from app.caches import cache_vendas_recentes
+from app.modelos import Usuario, Produto, Venda, ItemVenda, BlocoArquivoVendas, ResumoVendaArquivada
+from app.estatisticas import inicio_do_dia_utc
+from app.relatorios import dia_local
+
+# Vendas por bloco comprimido (uma reimpressão lê um bloco inteiro)
+VENDAS_POR_BLOCO = 1000
+
+# Meses mantidos no banco além do atual
+MESES_MANTIDOS = 12
+
+def _mes_seguinte(ano, mes):
+    return (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+def _limites_periodo(ano, mes):
+    """Intervalo [início, fim) do mês local em UTC, como data_venda é gravada"""
+    return (inicio_do_dia_utc(date(ano, mes, 1)),
+            inicio_do_dia_utc(date(*_mes_seguinte(ano, mes), 1)))
+
+def primeiro_dia_no_banco():
+    """Primeiro dia local cujas vendas ainda estão no banco (None sem arquivo)"""
+    periodo = db.session.scalar(db.select(db.func.max(BlocoArquivoVendas.periodo)))
+    if periodo is None:
+        return None
+    ano, mes = (int(parte) for parte in periodo.split('-'))
+    return date(*_mes_seguinte(ano, mes), 1)
+
+def _registro(venda, itens):
+    """Venda arquivada: com os nomes do operador e dos produtos, para a nota"""
+    return {
+        'id': venda.id,
+        'uuid': venda.uuid,
+        'offline': venda.offline,
+        'data_venda': venda.data_venda.isoformat(),
+        'operador_id': venda.operador_id,
+        'operador': venda.operador,
+        'valor_total': str(venda.valor_total),
+        'itens': [{
+            'id': item.id,
+            'produto_id': item.produto_id,
+            'nome': item.nome,
+            'quantidade': item.quantidade,
+            'preco_unitario': str(item.preco_unitario),
+            'subtotal': str(item.subtotal)
+        } for item in itens]
+    }
+
+def _nome_livre(diretorio, periodo):
+    """Nome do arquivo do mês; um mês arquivado de novo ganha um sufixo"""
+    nome = f'vendas-{periodo}.jsonl.gz'
+    sequencia = 1
+    while os.path.exists(os.path.join(diretorio, nome)):
+        sequencia += 1
+        nome = f'vendas-{periodo}.{sequencia}.jsonl.gz'
+    return nome
+
+def arquivar_periodo(ano, mes):
+    """Move as vendas de um mês para o arquivo e as remove do banco
+
+    O arquivo é gravado e sincronizado em disco antes da transação que
+    remove as vendas e registra os blocos; se ela falhar, o arquivo é
+    apagado e o banco fica como estava. Retorna o resumo do mês ou None se
+    não houver vendas.
+    """
+    periodo = f'{ano:04d}-{mes:02d}'
+    inicio, fim = _limites_periodo(ano, mes)
+    no_periodo = db.and_(Venda.data_venda >= inicio, Venda.data_venda < fim)
+
+    diretorio = current_app.config['VENDAS_ARQUIVO_DIR']
+    os.makedirs(diretorio, exist_ok=True)
+    nome = _nome_livre(diretorio, periodo)
+    caminho = os.path.join(diretorio, nome)
+    temporario = caminho + '.tmp'
+
+    blocos, resumos, ultimo = [], [], 0
+    with open(temporario, 'wb') as arquivo:
+        while True:
+            vendas = db.session.execute(
+                db.select(Venda.id, Venda.uuid, Venda.offline, Venda.data_venda, Venda.operador_id,
+                          Usuario.nome.label('operador'), Venda.valor_total)
+                .outerjoin(Usuario, Usuario.id == Venda.operador_id)
+                .where(no_periodo, Venda.id > ultimo)
+                .order_by(Venda.id)
+                .limit(VENDAS_POR_BLOCO)
+            ).all()
+            if not vendas:
+                break
+
+            itens_por_venda = {}
+            for item in db.session.execute(
+                db.select(ItemVenda.id, ItemVenda.venda_id, ItemVenda.produto_id, Produto.nome, ItemVenda.quantidade,
+                          ItemVenda.preco_unitario, ItemVenda.subtotal)
+                .outerjoin(Produto, Produto.id == ItemVenda.produto_id)
+                .where(ItemVenda.venda_id.in_([venda.id for venda in vendas]))
+                .order_by(ItemVenda.id)
+            ):
+                itens_por_venda.setdefault(item.venda_id, []).append(item)
+
+            linhas = ''.join(
+                json.dumps(_registro(venda, itens_por_venda.get(venda.id, [])),
+                           ensure_ascii=False, separators=(',', ':')) + '\n'
+                for venda in vendas
+            )
+            # Cada bloco é um membro gzip completo: o arquivo inteiro continua
+            # legível com zcat e cada bloco pode ser lido sozinho
+            dados = gzip.compress(linhas.encode('utf-8'), compresslevel=6)
+            blocos.append({
+                'periodo': periodo, 'arquivo': nome, 'posicao': arquivo.tell(), 'tamanho': len(dados),
+                'primeiro_id': vendas[0].id, 'ultimo_id': vendas[-1].id, 'vendas': len(vendas),
+                'itens': sum(len(itens) for itens in itens_por_venda.values()),
+                'arquivado_em': datetime.utcnow()
+            })
+            resumos += [{
+                'id': venda.id, 'periodo': periodo, 'operador_id': venda.operador_id,
+                'data_venda': venda.data_venda, 'valor_total': venda.valor_total,
+                'itens': len(itens_por_venda.get(venda.id, []))
+            } for venda in vendas]
+            arquivo.write(dados)
+            ultimo = vendas[-1].id
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+
+    if not blocos:
+        os.remove(temporario)
+        db.session.rollback()
+        return None
+    os.replace(temporario, caminho)
+
+    total_vendas = sum(bloco['vendas'] for bloco in blocos)
+    try:
+        # Apenas o que foi gravado (vendas confirmadas depois da leitura ficam)
+        gravadas = db.and_(no_periodo, Venda.id <= ultimo)
+        db.session.execute(ItemVenda.__table__.delete().where(
+            ItemVenda.venda_id.in_(db.select(Venda.id).where(gravadas))))
+        removidas = db.session.execute(Venda.__table__.delete().where(gravadas)).rowcount
+        if removidas != total_vendas:
+            raise RuntimeError(f'{periodo}: {total_vendas} vendas arquivadas, {removidas} removidas')
+        db.session.execute(BlocoArquivoVendas.__table__.insert(), blocos)
+        db.session.execute(ResumoVendaArquivada.__table__.insert(), resumos)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        os.remove(caminho)
+        raise
+    # As vendas recentes em cache podem incluir vendas que saíram do banco
+    cache_vendas_recentes.clear()
+
+    return {
+        'periodo': periodo,
+        'arquivo': caminho,
+        'vendas': total_vendas,
+        'itens': sum(bloco['itens'] for bloco in blocos),
+        'bytes': os.path.getsize(caminho)
+    }
+
+def arquivar_vendas(meses_mantidos=MESES_MANTIDOS):
+    """Arquiva, do mais antigo ao mais recente, os meses anteriores aos mantidos
+
+    Mantém ao menos o mês atual e o anterior: o último dia arquivado fica
+    sempre mais de PRAZO_VENDA_OFFLINE para trás, então nenhuma venda feita
+    sem conexão chega depois a um mês já arquivado.
+    """
+    meses_mantidos = max(int(meses_mantidos), 1)
+    hoje = date.today()
+    ano, mes = hoje.year, hoje.month - meses_mantidos
+    while mes < 1:
+        ano, mes = ano - 1, mes + 12
+    limite = date(ano, mes, 1)
+
+    primeira = db.session.scalar(db.select(db.func.min(Venda.data_venda)))
+    if primeira is None:
+        return []
+
+    resultados = []
+    ano, mes = dia_local(primeira).year, dia_local(primeira).month
+    while date(ano, mes, 1) < limite:
+        resultado = arquivar_periodo(ano, mes)
+        if resultado:
+            resultados.append(resultado)
+        ano, mes = _mes_seguinte(ano, mes)
+    return resultados
+
+# ==================== LEITURA ====================
+
+def _ler_bloco(bloco):
+    """Linhas (JSON, ainda não interpretadas) de um bloco do arquivo"""
+    caminho = os.path.join(current_app.config['VENDAS_ARQUIVO_DIR'], bloco.arquivo)
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(bloco.posicao)
+        dados = arquivo.read(bloco.tamanho)
+    return gzip.decompress(dados).splitlines()
+
+def _converter(registro):
+    registro['data_venda'] = datetime.fromisoformat(registro['data_venda'])
+    registro['valor_total'] = Decimal(registro['valor_total'])
+    for item in registro['itens']:
+        item['preco_unitario'] = Decimal(item['preco_unitario'])
+        item['subtotal'] = Decimal(item['subtotal'])
+    return registro
+
+def venda_arquivada(venda_id):
+    """Venda arquivada (datas e valores já convertidos) ou None
+
+    Os ids crescem com a data, então em geral um só bloco cobre a venda; as
+    faixas só se sobrepõem com vendas feitas sem conexão, que entram com id
+    novo em um mês anterior. Os blocos mais estreitos são lidos primeiro.
+    """
+    blocos = db.session.scalars(
+        db.select(BlocoArquivoVendas)
+        .where(BlocoArquivoVendas.ultimo_id >= venda_id, BlocoArquivoVendas.primeiro_id <= venda_id)
+        .order_by(BlocoArquivoVendas.ultimo_id - BlocoArquivoVendas.primeiro_id)
+    ).all()
+    # Cada linha começa pelo id: só a linha da venda é interpretada
+    prefixo = f'{{"id":{venda_id},'.encode()
+    for bloco in blocos:
+        for linha in _ler_bloco(bloco):
+            if linha.startswith(prefixo):
+                return _converter(json.loads(linha))
+    return None
+
+def vendas_arquivadas(periodo):
+    """Todas as vendas arquivadas de um mês (AAAA-MM), bloco a bloco"""
+    blocos = db.session.scalars(
+        db.select(BlocoArquivoVendas)
+        .where(BlocoArquivoVendas.periodo == periodo)
+        .order_by(BlocoArquivoVendas.arquivo, BlocoArquivoVendas.posicao)
+    ).all()
+    for bloco in blocos:
+        for linha in _ler_bloco(bloco):
+            yield _converter(json.loads(linha))
+
+def vendas_arquivadas_entre(desde_id, ate_id):
+    """Vendas arquivadas com desde_id < id <= ate_id, bloco a bloco"""
+    blocos = db.session.scalars(
+        db.select(BlocoArquivoVendas)
+        .where(BlocoArquivoVendas.ultimo_id > desde_id, BlocoArquivoVendas.primeiro_id <= ate_id)
+        .order_by(BlocoArquivoVendas.primeiro_id)
+    ).all()
+    for bloco in blocos:
+        for linha in _ler_bloco(bloco):
+            registro = json.loads(linha)
+            if desde_id < registro['id'] <= ate_id:
+                yield _converter(registro)
+
+def ultima_venda_arquivada():
+    """Maior id de venda arquivada (0 sem arquivo)"""
+    return db.session.scalar(db.select(db.func.max(BlocoArquivoVendas.ultimo_id))) or 0
+
+def periodos_arquivados():
+    """Meses arquivados com o total de vendas, itens e bytes"""
+    return [dict(linha) for linha in db.session.execute(
+        db.select(BlocoArquivoVendas.periodo,
+                  db.func.sum(BlocoArquivoVendas.vendas).label('vendas'),
+                  db.func.sum(BlocoArquivoVendas.itens).label('itens'),
+                  db.func.sum(BlocoArquivoVendas.tamanho).label('bytes'))
+        .group_by(BlocoArquivoVendas.periodo)
+        .order_by(BlocoArquivoVendas.periodo)
+    ).mappings()]
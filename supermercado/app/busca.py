@@ -0,0 +1,301 @@
+"""
+Sistema de Supermercado - Busca de produtos
+Busca indexada, sem acentos, por prefixo e tolerante a erros de digitação
+
+- PostgreSQL: índices GIN com pg_trgm (similaridade) e tsvector (prefixo)
+  sobre o nome normalizado por unaccent; sem as extensões (usuário do banco
+  sem permissão para criá-las), ILIKE até um administrador instalá-las
+- SQLite: tabela virtual FTS5 mantida por triggers, com uma coluna de
+  trigramas para a busca aproximada
+- Outros bancos: ILIKE simples, como antes
+"""
+
+import re
+import sqlite3
+import unicodedata
+
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+LIMITE_PADRAO_BUSCA = 20
+LIMITE_MAXIMO_BUSCA = 1000
+
+# Similaridade mínima (0 a 1) para aceitar um resultado aproximado
+SIMILARIDADE_MINIMA = 0.3
+
+# Candidatos avaliados em Python na busca aproximada do SQLite
+CANDIDATOS_APROXIMADOS = 200
+
+_bancos_com_fts = {}
+_bancos_com_trigramas = {}
+
+EXTENSOES_POSTGRESQL = ('pg_trgm', 'unaccent')
+
+# ==================== NORMALIZAÇÃO DE TEXTO ====================
+
+def normalizar(texto):
+    """Remove acentos e converte para minúsculas ("Açúcar" -> "acucar")"""
+    if texto is None:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+def palavras(texto):
+    """Quebra o texto normalizado em palavras alfanuméricas"""
+    return re.findall(r'\w+', normalizar(texto))
+
+def escapar_like(texto):
+    """Escapa os curingas do LIKE (`%`, `_` e a barra) para usar com ESCAPE '\\'"""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def trigramas(palavra):
+    """Trigramas de uma palavra com preenchimento, no estilo do pg_trgm"""
+    preenchida = f'  {palavra} '
+    return {preenchida[i:i + 3] for i in range(len(preenchida) - 2)}
+
+def texto_trigramas(texto):
+    """Trigramas sem preenchimento, separados por espaço, para indexar no FTS5"""
+    grupos = []
+    for palavra in palavras(texto):
+        if len(palavra) < 3:
+            grupos.append(palavra)
+        else:
+            grupos.extend(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return ' '.join(grupos)
+
+def similaridade(consulta, nome):
+    """Similaridade média entre cada palavra da consulta e a melhor palavra do nome"""
+    termos = palavras(consulta)
+    alvos = [trigramas(p) for p in palavras(nome)]
+    if not termos or not alvos:
+        return 0.0
+
+    total = 0.0
+    for termo in termos:
+        tri = trigramas(termo)
+        total += max(len(tri & alvo) / len(tri | alvo) for alvo in alvos)
+    return total / len(termos)
+
+@event.listens_for(Engine, 'connect')
+def _registrar_funcoes_sqlite(dbapi_connection, connection_record):
+    """Disponibiliza as funções de normalização para os triggers do SQLite"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('busca_trigramas', 1, texto_trigramas, deterministic=True)
+
+# ==================== CRIAÇÃO DOS ÍNDICES ====================
+
+def criar_indice_busca(db):
+    """Cria (se necessário) as estruturas de busca do banco configurado"""
+    dialeto = db.engine.dialect.name
+    if dialeto == 'postgresql':
+        _criar_indice_postgresql(db)
+    elif dialeto == 'sqlite':
+        _criar_indice_sqlite(db)
+
+def _criar_indice_postgresql(db):
+    faltando = []
+    for extensao in EXTENSOES_POSTGRESQL:
+        # Uma transação por extensão: a falha de uma não desfaz a outra
+        try:
+            with db.engine.begin() as conexao:
+                conexao.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extensao}"))
+        except DBAPIError:
+            faltando.append(extensao)
+    if faltando:
+        # Usuário sem permissão de criar extensões: a aplicação sobe com ILIKE
+        _bancos_com_trigramas[str(db.engine.url)] = False
+        current_app.logger.warning(
+            f"Busca de produtos sem índice (usando ILIKE): não foi possível criar as extensões "
+            f"{', '.join(faltando)}. Peça a um superusuário para executar "
+            + '; '.join(f'CREATE EXTENSION {extensao}' for extensao in faltando)
+            + " e depois rode: python migracoes.py busca"
+        )
+        return
+
+    comandos = [
+        # unaccent() não é IMMUTABLE; o wrapper permite usá-la em índices
+        """CREATE OR REPLACE FUNCTION busca_normalizar(text) RETURNS text AS $$
+               SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1))
+           $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT""",
+        """CREATE INDEX IF NOT EXISTS ix_produtos_nome_trgm ON produtos
+           USING gin (busca_normalizar(nome) gin_trgm_ops) WHERE ativo""",
+        """CREATE INDEX IF NOT EXISTS ix_produtos_nome_tsv ON produtos
+           USING gin (to_tsvector('simple', busca_normalizar(nome))) WHERE ativo""",
+        """CREATE INDEX IF NOT EXISTS ix_produtos_codigo_barras_prefixo ON produtos
+           (codigo_barras text_pattern_ops)""",
+    ]
+    with db.engine.begin() as conexao:
+        for comando in comandos:
+            conexao.execute(text(comando))
+    _bancos_com_trigramas[str(db.engine.url)] = True
+
+def _postgresql_tem_trigramas(db):
+    chave = str(db.engine.url)
+    if chave not in _bancos_com_trigramas:
+        with db.engine.connect() as conexao:
+            _bancos_com_trigramas[chave] = conexao.execute(text(
+                "SELECT 1 FROM pg_proc WHERE proname = 'busca_normalizar'"
+            )).first() is not None
+    return _bancos_com_trigramas[chave]
+
+def _criar_indice_sqlite(db):
+    with db.engine.begin() as conexao:
+        try:
+            existe = conexao.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'produtos_busca'"
+            )).first()
+            if not existe:
+                conexao.execute(text(
+                    """CREATE VIRTUAL TABLE produtos_busca USING fts5(
+                           nome, codigo_barras, trigramas,
+                           tokenize = 'unicode61 remove_diacritics 2'
+                       )"""
+                ))
+                conexao.execute(text(
+                    """INSERT INTO produtos_busca (rowid, nome, codigo_barras, trigramas)
+                       SELECT id, nome, codigo_barras, busca_trigramas(nome)
+                       FROM produtos WHERE ativo"""
+                ))
+        except Exception:
+            # SQLite compilado sem FTS5: a busca usa ILIKE
+            _bancos_com_fts[str(db.engine.url)] = False
+            return
+
+        # Apenas produtos ativos ficam no índice; a baixa de estoque não dispara
+        # os triggers porque eles observam só nome, código e status
+        conexao.execute(text(
+            """CREATE TRIGGER IF NOT EXISTS produtos_busca_ai AFTER INSERT ON produtos
+               WHEN new.ativo BEGIN
+                   INSERT INTO produtos_busca (rowid, nome, codigo_barras, trigramas)
+                   VALUES (new.id, new.nome, new.codigo_barras, busca_trigramas(new.nome));
+               END"""
+        ))
+        conexao.execute(text(
+            """CREATE TRIGGER IF NOT EXISTS produtos_busca_au
+               AFTER UPDATE OF nome, codigo_barras, ativo ON produtos BEGIN
+                   DELETE FROM produtos_busca WHERE rowid = old.id;
+                   INSERT INTO produtos_busca (rowid, nome, codigo_barras, trigramas)
+                   SELECT new.id, new.nome, new.codigo_barras, busca_trigramas(new.nome)
+                   WHERE new.ativo;
+               END"""
+        ))
+        conexao.execute(text(
+            """CREATE TRIGGER IF NOT EXISTS produtos_busca_ad AFTER DELETE ON produtos BEGIN
+                   DELETE FROM produtos_busca WHERE rowid = old.id;
+               END"""
+        ))
+    _bancos_com_fts[str(db.engine.url)] = True
+
+def _sqlite_tem_fts(db):
+    chave = str(db.engine.url)
+    if chave not in _bancos_com_fts:
+        with db.engine.connect() as conexao:
+            _bancos_com_fts[chave] = conexao.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'produtos_busca'"
+            )).first() is not None
+    return _bancos_com_fts[chave]
+
+# ==================== CONSULTA ====================
+
+def buscar_ids(db, termo, limite=LIMITE_PADRAO_BUSCA):
+    """Retorna os ids dos produtos ativos que casam com o termo, do mais relevante ao menos"""
+    limite = min(max(int(limite), 1), LIMITE_MAXIMO_BUSCA)
+    if not palavras(termo):
+        return []
+
+    dialeto = db.engine.dialect.name
+    if dialeto == 'postgresql' and _postgresql_tem_trigramas(db):
+        return _buscar_postgresql(db, termo, limite)
+    if dialeto == 'sqlite' and _sqlite_tem_fts(db):
+        return _buscar_sqlite(db, termo, limite)
+    return _buscar_ilike(db, termo, limite)
+
+def _buscar_postgresql(db, termo, limite):
+    consulta_ts = ' & '.join(f"{p}:*" for p in palavras(termo))
+    linhas = db.session.execute(text(
+        """SELECT id FROM (
+               SELECT id,
+                      CASE WHEN busca_normalizar(nome) LIKE :inicio ESCAPE '\\' THEN 1 ELSE 0 END AS no_inicio,
+                      CASE WHEN codigo_barras LIKE :prefixo ESCAPE '\\' THEN 2 ELSE 0 END
+                      + CASE WHEN to_tsvector('simple', busca_normalizar(nome))
+                                  @@ to_tsquery('simple', :consulta_ts) THEN 1 ELSE 0 END
+                      + word_similarity(:termo, busca_normalizar(nome)) AS relevancia
+               FROM produtos
+               WHERE ativo AND (
+                   to_tsvector('simple', busca_normalizar(nome)) @@ to_tsquery('simple', :consulta_ts)
+                   OR :termo <% busca_normalizar(nome)
+                   OR codigo_barras LIKE :prefixo ESCAPE '\\'
+               )
+           ) AS resultados
+           ORDER BY no_inicio DESC, relevancia DESC, id
+           LIMIT :limite"""
+    ), {
+        'termo': normalizar(termo),
+        'consulta_ts': consulta_ts,
+        'inicio': escapar_like(' '.join(palavras(termo))) + '%',
+        'prefixo': escapar_like(termo.strip()) + '%',
+        'limite': limite
+    }).all()
+    return [linha.id for linha in linhas]
+
+def _buscar_sqlite(db, termo, limite):
+    # Códigos de barras: faixa no índice único de codigo_barras, em ordem
+    codigo = termo.strip()
+    if codigo.isdigit():
+        fim = codigo[:-1] + chr(ord(codigo[-1]) + 1)
+        ids = [linha.id for linha in db.session.execute(text(
+            """SELECT id FROM produtos
+               WHERE codigo_barras >= :inicio AND codigo_barras < :fim AND ativo
+               ORDER BY codigo_barras LIMIT :limite"""
+        ), {'inicio': codigo, 'fim': fim, 'limite': limite}).all()]
+        if ids:
+            return ids
+
+    # 1) Todas as palavras como prefixo; primeiro os nomes que começam pelo
+    # termo ("acucar": Açúcar Cristal antes de Pão de Açúcar), depois por bm25
+    termos = palavras(termo)
+    consulta_prefixo = '{nome codigo_barras} : (' + ' '.join(f'"{p}"*' for p in termos) + ')'
+    ids = [linha.rowid for linha in db.session.execute(text(
+        """SELECT rowid FROM produtos_busca WHERE produtos_busca MATCH :consulta
+           ORDER BY rowid IN (SELECT rowid FROM produtos_busca WHERE produtos_busca MATCH :inicio) DESC,
+                    rank
+           LIMIT :limite"""
+    ), {'consulta': consulta_prefixo, 'inicio': 'nome : ^ "' + ' '.join(termos) + '"*',
+        'limite': limite}).all()]
+
+    if len(ids) >= limite:
+        return ids
+
+    # 2) Busca aproximada: candidatos que compartilham trigramas, reavaliados em Python
+    tri = texto_trigramas(termo).split()
+    if not tri:
+        return ids
+    consulta_aproximada = 'trigramas : (' + ' OR '.join(f'"{t}"' for t in set(tri)) + ')'
+    candidatos = db.session.execute(text(
+        """SELECT rowid, nome FROM produtos_busca WHERE produtos_busca MATCH :consulta
+           ORDER BY rank LIMIT :candidatos"""
+    ), {'consulta': consulta_aproximada, 'candidatos': CANDIDATOS_APROXIMADOS}).all()
+
+    encontrados = set(ids)
+    aproximados = []
+    for linha in candidatos:
+        if linha.rowid in encontrados:
+            continue
+        nota = similaridade(termo, linha.nome)
+        if nota >= SIMILARIDADE_MINIMA:
+            aproximados.append((-nota, linha.rowid))
+    aproximados.sort()
+
+    return ids + [produto_id for _, produto_id in aproximados[:limite - len(ids)]]
+
+def _buscar_ilike(db, termo, limite):
+    termo = escapar_like(termo)
+    linhas = db.session.execute(text(
+        """SELECT id FROM produtos
+           WHERE ativo AND (lower(nome) LIKE lower(:padrao) ESCAPE '\\'
+                            OR codigo_barras LIKE :padrao ESCAPE '\\')
+           ORDER BY id LIMIT :limite"""
+    ), {'padrao': f'%{termo}%', 'limite': limite}).all()
+    return [linha.id for linha in linhas]
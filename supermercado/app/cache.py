@@ -0,0 +1,99 @@
+"""
+Sistema de Supermercado - Cache em memória
+Cache LRU com expiração (TTL) usado para aliviar as consultas mais quentes
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Cache LRU limitado por tamanho, com expiração por tempo e contadores"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Incrementada a cada escrita/invalidação; permite descartar
+        # preenchimentos feitos a partir de leituras anteriores a uma escrita
+        self.geracao = 0
+
+    def get(self, chave):
+        """Retorna o valor em cache ou None se ausente/expirado"""
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            valor, expira_em = entrada
+            if expira_em <= agora:
+                del self._dados[chave]
+                self.misses += 1
+                return None
+
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def set(self, chave, valor, geracao=None):
+        """Armazena um valor, descartando o menos usado se o cache estiver cheio
+
+        Se `geracao` for informada e o cache tiver sido alterado desde então,
+        o valor (possivelmente desatualizado) não é armazenado.
+        """
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            if geracao is not None and geracao != self.geracao:
+                return
+            if geracao is None:
+                self.geracao += 1
+            self._dados[chave] = (valor, time.monotonic() + self.ttl)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+                self.evictions += 1
+
+    def atualizar(self, chave, funcao):
+        """Substitui um valor presente por funcao(valor), mantendo a expiração original"""
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is None or entrada[1] <= agora:
+                return
+            self.geracao += 1
+            self._dados[chave] = (funcao(entrada[0]), entrada[1])
+
+    def invalidate(self, chave):
+        """Remove uma chave do cache"""
+        with self._lock:
+            self.geracao += 1
+            self._dados.pop(chave, None)
+
+    def clear(self):
+        """Esvazia o cache"""
+        with self._lock:
+            self.geracao += 1
+            self._dados.clear()
+
+    def stats(self):
+        """Retorna os contadores de uso do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'tamanho': len(self._dados),
+                'tamanho_maximo': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
@@ -0,0 +1,46 @@
+"""
+Sistema de Supermercado - Caches compartilhados
+Instâncias únicas por processo, configuradas pelas variáveis de ambiente
+"""
+
+import os
+
+from app.cache import TTLCache
+from app.recibos import CacheRecibos
+
+# Cache de produtos por código de barras (consulta mais frequente do PDV).
+# Em implantações com vários processos, cada um descarta os produtos que os
+# outros alteraram consultando o feed de versões do catálogo a cada
+# CACHE_PRODUTOS_SINCRONIZACAO segundos; o TTL é o limite de segurança.
+cache_produtos = TTLCache(
+    maxsize=int(os.getenv('CACHE_PRODUTOS_TAMANHO', '5000')),
+    ttl=float(os.getenv('CACHE_PRODUTOS_TTL', '30'))
+)
+
+# Cache dos contadores do dashboard, mantido incrementalmente pelas vendas
+cache_estatisticas = TTLCache(
+    maxsize=4,
+    ttl=float(os.getenv('CACHE_ESTATISTICAS_TTL', '60'))
+)
+
+# Últimas vendas de cada caixa (botão "Vendas Recentes" do PDV). As vendas
+# deste processo entram na hora; as feitas em outros workers são detectadas
+# por uma consulta ao índice a cada uso (ver historico_vendas.vendas_recentes)
+cache_vendas_recentes = TTLCache(
+    maxsize=int(os.getenv('CACHE_VENDAS_RECENTES_TAMANHO', '500')),
+    ttl=float(os.getenv('CACHE_VENDAS_RECENTES_TTL', '10'))
+)
+
+# Usuários logados: evita consultar o banco a cada requisição autenticada.
+# O TTL limita por quanto tempo outro processo ainda aceita um usuário desativado
+cache_usuarios = TTLCache(
+    maxsize=int(os.getenv('CACHE_USUARIOS_TAMANHO', '1000')),
+    ttl=float(os.getenv('CACHE_USUARIOS_TTL', '30'))
+)
+
+# Notas fiscais já geradas, em disco (RECIBOS_CACHE_MB=0 desativa).
+# Sem RECIBOS_CACHE_DIR, create_app() usa a pasta instance/recibos
+cache_recibos = CacheRecibos(
+    os.getenv('RECIBOS_CACHE_DIR'),
+    tamanho_maximo=int(float(os.getenv('RECIBOS_CACHE_MB', '200')) * 1024 * 1024)
+)
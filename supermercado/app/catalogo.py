@@ -0,0 +1,352 @@
+"""
+Sistema de Supermercado - Importação e exportação do catálogo
+Arquivos CSV e JSON lidos e gravados em blocos, sem carregar o catálogo
+inteiro na memória; a importação faz upsert pelo código de barras
+"""
+
+import csv
+import io
+import itertools
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from app.extensoes import db
+from app.modelos import Produto
+from app.caches import cache_produtos, cache_estatisticas
+from app.sincronizacao import marcar_produtos_alterados
+
+FORMATOS_CATALOGO = ('csv', 'json')
+CAMPOS_CATALOGO = ('codigo_barras', 'nome', 'preco', 'estoque', 'categoria', 'ativo')
+
+# Produtos gravados por comando INSERT ... ON CONFLICT (e por transação)
+LOTE_CATALOGO = 1000
+
+# Erros por linha guardados no relatório (os demais são apenas contados)
+LIMITE_ERROS_CATALOGO = 1000
+
+# Maior item de um catálogo JSON (caracteres); um produto tem menos de 1 KB
+TAMANHO_MAXIMO_ITEM_JSON = 1024 * 1024
+
+_SEPARADORES_JSON = ' \t\r\n,[]'
+_VERDADEIROS = ('1', 'true', 'sim', 's', 'yes', 'y', 'ativo')
+_FALSOS = ('0', 'false', 'nao', 'não', 'n', 'no', 'inativo')
+
+class CatalogoInvalido(Exception):
+    """Arquivo de catálogo que não pode ser lido (formato ou cabeçalho)"""
+
+# ==================== LEITURA ====================
+
+def ler_csv(arquivo):
+    """Linhas (número, dados) de um CSV separado por vírgula ou ponto e vírgula"""
+    cabecalho = arquivo.readline()
+    if not cabecalho.strip():
+        raise CatalogoInvalido('Arquivo vazio')
+    delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+
+    leitor = csv.DictReader(itertools.chain([cabecalho], arquivo), delimiter=delimitador)
+    leitor.fieldnames = [(c or '').strip().lower() for c in leitor.fieldnames]
+    faltando = [c for c in ('codigo_barras', 'nome', 'preco', 'categoria') if c not in leitor.fieldnames]
+    if faltando:
+        raise CatalogoInvalido(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+
+    for dados in leitor:
+        if not any((v or '').strip() for k, v in dados.items() if k is not None):
+            continue  # linha em branco
+        yield leitor.line_num, dados
+
+def ler_json(arquivo, tamanho_bloco=64 * 1024, tamanho_maximo=TAMANHO_MAXIMO_ITEM_JSON):
+    """Objetos (número, dados) de uma lista JSON ou de um arquivo JSON Lines
+
+    O arquivo é lido em blocos e cada objeto é decodificado assim que
+    termina, de modo que a lista nunca fica inteira na memória. Um item que
+    não termina em `tamanho_maximo` caracteres (JSON inválido no meio do
+    arquivo, por exemplo) interrompe a leitura em vez de acumular o resto.
+    """
+    decodificador = json.JSONDecoder()
+    buffer, posicao, numero, terminou = '', 0, 0, False
+    while True:
+        while posicao < len(buffer) and buffer[posicao] in _SEPARADORES_JSON:
+            posicao += 1
+
+        if posicao < len(buffer):
+            try:
+                dados, fim = decodificador.raw_decode(buffer, posicao)
+            except json.JSONDecodeError as e:
+                if terminou:
+                    raise CatalogoInvalido(f'JSON inválido no item {numero + 1}: {e.msg}')
+            else:
+                # Um valor que termina no fim do bloco pode continuar no próximo
+                if terminou or fim < len(buffer):
+                    numero += 1
+                    posicao = fim
+                    yield numero, dados
+                    continue
+        elif terminou:
+            return
+
+        # Valor incompleto ou buffer consumido: ler o próximo bloco
+        if len(buffer) - posicao > tamanho_maximo:
+            raise CatalogoInvalido(f'JSON inválido no item {numero + 1}: '
+                                   f'não termina em {tamanho_maximo} caracteres')
+        bloco = arquivo.read(tamanho_bloco)
+        terminou = not bloco
+        buffer = buffer[posicao:] + bloco
+        posicao = 0
+
+def ler_catalogo(arquivo, formato):
+    """Linhas do arquivo de catálogo no formato indicado (csv ou json)"""
+    if formato == 'csv':
+        return ler_csv(arquivo)
+    if formato == 'json':
+        return ler_json(arquivo)
+    raise CatalogoInvalido('Formato inválido (use csv ou json)')
+
+def formato_do_arquivo(nome, padrao=None):
+    """Formato do catálogo pela extensão do arquivo (.csv, .json ou .jsonl)"""
+    extensao = (nome or '').rsplit('.', 1)[-1].lower()
+    if extensao in ('json', 'jsonl', 'ndjson'):
+        return 'json'
+    if extensao == 'csv':
+        return 'csv'
+    return padrao
+
+# ==================== VALIDAÇÃO ====================
+
+def _texto(dados, campo):
+    valor = dados.get(campo)
+    valor = '' if valor is None else str(valor).strip()
+    if not valor:
+        raise ValueError(f'{campo} obrigatório')
+    tamanho = Produto.__table__.c[campo].type.length
+    if len(valor) > tamanho:
+        raise ValueError(f'{campo} com mais de {tamanho} caracteres')
+    return valor
+
+def _preco(valor):
+    if isinstance(valor, bool):
+        raise ValueError('preco inválido')
+    texto = str(valor if valor is not None else '').strip().replace('R$', '').strip()
+    if ',' in texto:
+        # Formato brasileiro: 1.234,56
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        preco = Decimal(texto).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'preco inválido: {valor!r}')
+    if not preco.is_finite() or preco < 0 or preco >= Decimal('100000000'):
+        raise ValueError(f'preco fora do intervalo: {valor!r}')
+    return preco
+
+def _estoque(valor):
+    try:
+        estoque = Decimal(str(valor).strip())
+    except InvalidOperation:
+        raise ValueError(f'estoque inválido: {valor!r}')
+    if isinstance(valor, bool) or not estoque.is_finite() or estoque != estoque.to_integral_value():
+        raise ValueError(f'estoque inválido: {valor!r}')
+    if estoque < 0:
+        raise ValueError('estoque negativo')
+    return int(estoque)
+
+def _ativo(valor):
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in _VERDADEIROS:
+        return True
+    if texto in _FALSOS:
+        return False
+    raise ValueError(f'ativo inválido: {valor!r}')
+
+def validar_produto(dados):
+    """Produto pronto para gravar a partir de uma linha do arquivo
+
+    Estoque e ativo são opcionais: sem estoque, um produto existente mantém
+    o estoque atual (e um novo começa com 0); sem ativo, o produto fica ativo.
+    Levanta ValueError com a descrição do problema.
+    """
+    if not isinstance(dados, dict):
+        raise ValueError('linha deve ser um objeto')
+
+    produto = {
+        'codigo_barras': _texto(dados, 'codigo_barras'),
+        'nome': _texto(dados, 'nome'),
+        'preco': _preco(dados.get('preco')),
+        'categoria': _texto(dados, 'categoria'),
+        'estoque': None,
+        'ativo': True
+    }
+    if dados.get('estoque') not in (None, ''):
+        produto['estoque'] = _estoque(dados['estoque'])
+    if dados.get('ativo') not in (None, ''):
+        produto['ativo'] = _ativo(dados['ativo'])
+    return produto
+
+# ==================== IMPORTAÇÃO ====================
+
+def _upsert(linhas, atualizar):
+    """Grava as linhas com INSERT ... ON CONFLICT (codigo_barras) DO UPDATE"""
+    tabela = Produto.__table__
+    dialeto = db.engine.dialect.name
+
+    if dialeto in ('postgresql', 'sqlite'):
+        if dialeto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        # As linhas vão como parâmetros (executemany): o comando é compilado
+        # uma única vez e o driver agrupa os VALUES
+        comando = insert(tabela)
+        db.session.execute(comando.on_conflict_do_update(
+            index_elements=['codigo_barras'],
+            set_={c: comando.excluded[c] for c in atualizar}
+        ), linhas)
+        return
+
+    for linha in linhas:
+        resultado = db.session.execute(
+            tabela.update()
+            .where(tabela.c.codigo_barras == linha['codigo_barras'])
+            .values({c: linha[c] for c in atualizar})
+        )
+        if resultado.rowcount == 0:
+            db.session.execute(tabela.insert().values(linha))
+
+def _gravar_lote(lote):
+    """Grava um lote (código -> produto) em uma transação; retorna (inseridos, atualizados)"""
+    codigos = sorted(lote)
+    existentes = set(db.session.scalars(
+        db.select(Produto.codigo_barras).where(Produto.codigo_barras.in_(codigos))
+    ))
+
+    agora = datetime.utcnow()
+    com_estoque, sem_estoque = [], []
+    for codigo in codigos:
+        produto = dict(lote[codigo], data_criacao=agora, atualizado_em=agora)
+        if produto['estoque'] is None:
+            produto['estoque'] = 0
+            sem_estoque.append(produto)
+        else:
+            com_estoque.append(produto)
+
+    atualizar = ['nome', 'preco', 'categoria', 'ativo', 'atualizado_em']
+    if com_estoque:
+        _upsert(com_estoque, atualizar + ['estoque'])
+    if sem_estoque:
+        _upsert(sem_estoque, atualizar)
+    # Versão depois do upsert: produtos bloqueados antes do contador, como nas vendas
+    marcar_produtos_alterados(codigos=codigos)
+    db.session.commit()
+
+    # Leituras em andamento não podem repor no cache os dados anteriores
+    cache_produtos.clear()
+    cache_estatisticas.clear()
+    return len(codigos) - len(existentes), len(existentes)
+
+def importar_catalogo(linhas, tamanho_lote=LOTE_CATALOGO, limite_erros=LIMITE_ERROS_CATALOGO):
+    """Importa (upsert pelo código de barras) as linhas (número, dados) de ler_catalogo
+
+    As linhas válidas são gravadas em lotes de `tamanho_lote`, cada um em
+    sua própria transação; linhas inválidas não interrompem a importação e
+    aparecem no relatório com o número da linha e o motivo. Um código de
+    barras repetido no arquivo prevalece com a última ocorrência. Se o
+    arquivo se tornar ilegível no meio, as linhas anteriores são gravadas e
+    o motivo fica em relatorio['interrompido'].
+    """
+    relatorio = {'linhas': 0, 'inseridos': 0, 'atualizados': 0, 'repetidos': 0,
+                 'erros': [], 'total_erros': 0}
+
+    def registrar_erro(numero, mensagem):
+        relatorio['total_erros'] += 1
+        if len(relatorio['erros']) < limite_erros:
+            relatorio['erros'].append({'linha': numero, 'erro': mensagem})
+
+    def gravar(lote, numeros):
+        try:
+            inseridos, atualizados = _gravar_lote(lote)
+        except Exception as e:
+            db.session.rollback()
+            for numero in numeros:
+                registrar_erro(numero, f'erro ao gravar o lote: {e.__class__.__name__}')
+            return
+        relatorio['inseridos'] += inseridos
+        relatorio['atualizados'] += atualizados
+
+    lote, numeros = {}, []
+    try:
+        for numero, dados in linhas:
+            relatorio['linhas'] += 1
+            try:
+                produto = validar_produto(dados)
+            except ValueError as e:
+                registrar_erro(numero, str(e))
+                continue
+
+            if produto['codigo_barras'] in lote:
+                # Mesmo produto duas vezes no lote: vale a última linha
+                relatorio['repetidos'] += 1
+            lote[produto['codigo_barras']] = produto
+            numeros.append(numero)
+            if len(lote) >= tamanho_lote:
+                gravar(lote, numeros)
+                lote, numeros = {}, []
+    except CatalogoInvalido as e:
+        if not relatorio['linhas']:
+            raise
+        # Arquivo corrompido no meio: as linhas anteriores continuam valendo
+        relatorio['interrompido'] = str(e)
+
+    if lote:
+        gravar(lote, numeros)
+    return relatorio
+
+# ==================== EXPORTAÇÃO ====================
+
+def exportar_catalogo(formato='csv', apenas_ativos=False, tamanho_lote=LOTE_CATALOGO):
+    """Gera o catálogo em blocos de texto (CSV ou lista JSON)
+
+    Os produtos são lidos em páginas por id, de modo que a memória usada não
+    depende do tamanho do catálogo. O resultado pode ser reimportado.
+    """
+    if formato not in FORMATOS_CATALOGO:
+        raise CatalogoInvalido('Formato inválido (use csv ou json)')
+
+    colunas = [getattr(Produto, c) for c in CAMPOS_CATALOGO]
+    if formato == 'csv':
+        yield ','.join(CAMPOS_CATALOGO) + '\r\n'
+    else:
+        yield '['
+
+    ultimo_id, primeiro = 0, True
+    while True:
+        consulta = db.select(Produto.id, *colunas).where(Produto.id > ultimo_id)
+        if apenas_ativos:
+            consulta = consulta.where(Produto.ativo == True)
+        linhas = db.session.execute(consulta.order_by(Produto.id).limit(tamanho_lote)).all()
+        if not linhas:
+            break
+        ultimo_id = linhas[-1].id
+
+        bloco = io.StringIO()
+        if formato == 'csv':
+            escritor = csv.writer(bloco)
+            for linha in linhas:
+                escritor.writerow([linha.codigo_barras, linha.nome, linha.preco, linha.estoque,
+                                   linha.categoria, int(bool(linha.ativo))])
+        else:
+            for linha in linhas:
+                bloco.write('\n' if primeiro else ',\n')
+                primeiro = False
+                json.dump({
+                    'codigo_barras': linha.codigo_barras,
+                    'nome': linha.nome,
+                    'preco': float(linha.preco),
+                    'estoque': linha.estoque,
+                    'categoria': linha.categoria,
+                    'ativo': bool(linha.ativo)
+                }, bloco, ensure_ascii=False)
+        yield bloco.getvalue()
+
+    if formato == 'json':
+        yield '\n]\n'
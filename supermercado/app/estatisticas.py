@@ -0,0 +1,69 @@
+"""
+Sistema de Supermercado - Estatísticas do dashboard
+"""
+
+from datetime import datetime, date, timedelta, timezone
+from decimal import Decimal
+
+from app.extensoes import db
+from app.modelos import Usuario, Produto, Venda, ItemVenda
+from app.caches import cache_estatisticas
+
+def inicio_do_dia_utc(dia=None):
+    """Início do dia local convertido para UTC (as datas são gravadas em UTC)"""
+    dia = dia or date.today()
+    return datetime.combine(dia, datetime.min.time()).astimezone(timezone.utc).replace(tzinfo=None)
+
+def calcular_estatisticas(inicio):
+    """Calcula os contadores do dashboard para o dia iniciado em `inicio` (UTC)
+    
+    As vendas do dia são filtradas por intervalo semiaberto em data_venda
+    [inicio, inicio + 1 dia), o que usa o índice ix_vendas_data_venda.
+    """
+    fim = inicio + timedelta(days=1)
+    no_dia = db.and_(Venda.data_venda >= inicio, Venda.data_venda < fim)
+    
+    vendas_hoje, faturamento = db.session.execute(
+        db.select(db.func.count(Venda.id), db.func.coalesce(db.func.sum(Venda.valor_total), 0))
+        .where(no_dia)
+    ).one()
+    itens_vendidos = db.session.execute(
+        db.select(db.func.coalesce(db.func.sum(ItemVenda.quantidade), 0))
+        .join(Venda, ItemVenda.venda_id == Venda.id)
+        .where(no_dia)
+    ).scalar()
+    
+    return {
+        'total_produtos': Produto.query.filter_by(ativo=True).count(),
+        'total_usuarios': Usuario.query.filter_by(ativo=True).count(),
+        'vendas_hoje': vendas_hoje,
+        'faturamento_hoje': Decimal(str(faturamento)),
+        'itens_vendidos_hoje': int(itens_vendidos)
+    }
+
+def obter_estatisticas():
+    """Contadores do dashboard, servidos do cache sempre que possível"""
+    inicio = inicio_do_dia_utc()
+    geracao = cache_estatisticas.geracao
+    estatisticas = cache_estatisticas.get(inicio)
+    if estatisticas is None:
+        estatisticas = calcular_estatisticas(inicio)
+        cache_estatisticas.set(inicio, estatisticas, geracao=geracao)
+    
+    resultado = dict(estatisticas)
+    resultado['faturamento_hoje'] = float(estatisticas['faturamento_hoje'])
+    resultado['ticket_medio'] = round(
+        resultado['faturamento_hoje'] / estatisticas['vendas_hoje'], 2
+    ) if estatisticas['vendas_hoje'] else 0.0
+    return resultado
+
+def registrar_venda_estatisticas(valor_total, itens):
+    """Soma uma venda recém-confirmada aos contadores do dia em cache"""
+    def somar(estatisticas):
+        atualizadas = dict(estatisticas)
+        atualizadas['vendas_hoje'] += 1
+        atualizadas['faturamento_hoje'] += valor_total
+        atualizadas['itens_vendidos_hoje'] += itens
+        return atualizadas
+    
+    cache_estatisticas.atualizar(inicio_do_dia_utc(), somar)
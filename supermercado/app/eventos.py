@@ -0,0 +1,206 @@
+"""
+Sistema de Supermercado - Eventos de estoque e preço em tempo real (SSE)
+Uma única thread por processo lê o feed de versões do catálogo e publica cada
+lote de alterações, já serializado, em um buffer circular; cada tela conectada
+só acompanha a sua posição nele. Publicar custa o mesmo com 1 ou 500
+assinantes, e as alterações feitas em outros workers chegam pelo mesmo
+caminho. Vendas e edições de produtos acordam a thread logo após o commit.
+"""
+
+import json
+import os
+import threading
+
+from app.extensoes import db
+from app.modelos import Produto
+from app.sincronizacao import linhas_alteradas, versao_catalogo, ULTIMO_ID
+
+# Lotes guardados para assinantes lentos (quem fica mais para trás recarrega)
+EVENTOS_GUARDADOS = 256
+
+# Intervalo (s) entre consultas ao feed enquanto houver assinantes; as escritas
+# deste processo acordam a thread na hora, as de outros workers esperam até isso
+INTERVALO_EVENTOS = float(os.getenv('EVENTOS_INTERVALO', '1'))
+
+# Comentário enviado às conexões paradas, para detectar telas que já fecharam
+INTERVALO_KEEPALIVE = 15
+
+# Alterações por lote; acima disso (importação) as telas recebem 'recarregar'
+LIMITE_LOTE_EVENTOS = 1000
+
+COLUNAS_EVENTO = (Produto.codigo_barras, Produto.preco, Produto.estoque, Produto.ativo)
+
+def _mensagem(evento, dados, identificador=None):
+    """Mensagem no formato text/event-stream"""
+    linhas = f'id: {identificador}\n' if identificador else ''
+    linhas += f'event: {evento}\ndata: {json.dumps(dados, separators=(",", ":"))}\n\n'
+    return linhas.encode()
+
+def _lote(linhas, posicao):
+    """Mensagem 'produtos' de um lote de alterações
+
+    O id é a posição no feed (versão:id): ao reconectar, o navegador o envia
+    em Last-Event-ID e a tela recebe o que perdeu, mesmo vindo de outro worker.
+    """
+    return _mensagem('produtos', [{
+        'id': linha.id,
+        'codigo_barras': linha.codigo_barras,
+        'preco': float(linha.preco),
+        'estoque': linha.estoque,
+        'ativo': bool(linha.ativo)
+    } for linha in linhas], f"{posicao['desde']}:{posicao['apos_id']}")
+
+def _posicao_atual():
+    # Versões anteriores à última reservada já foram confirmadas
+    return {'desde': max(versao_catalogo() - 1, 0), 'apos_id': ULTIMO_ID}
+
+class Assinatura:
+    """Iterador das mensagens de uma tela conectada
+
+    O servidor WSGI chama close() quando a conexão termina, mesmo que o
+    iterador nunca tenha sido consumido.
+    """
+
+    def __init__(self, canal, proxima, iniciais):
+        self._canal = canal
+        self._proxima = proxima
+        self._pendentes = list(iniciais)
+        self._fechada = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._fechada:
+            raise StopIteration
+        if self._pendentes:
+            mensagens, self._pendentes = self._pendentes, []
+            return b''.join(mensagens)
+        self._proxima, mensagens = self._canal.aguardar(self._proxima, INTERVALO_KEEPALIVE)
+        return b''.join(mensagens) if mensagens else b': keepalive\n\n'
+
+    def close(self):
+        if not self._fechada:
+            self._fechada = True
+            self._canal.cancelar()
+
+class CanalProdutos:
+    """Buffer circular de lotes de eventos compartilhado pelos assinantes"""
+
+    def __init__(self, eventos_guardados=EVENTOS_GUARDADOS):
+        self.eventos_guardados = eventos_guardados
+        self._condicao = threading.Condition()
+        self._eventos = {}        # sequência -> mensagem já serializada
+        self._sequencia = 0
+        self._acordar = threading.Event()
+        self._thread = None
+        self._posicao = None
+        self.assinantes = 0
+        self.publicados = 0
+
+    def publicar(self, mensagem):
+        """Disponibiliza uma mensagem para todos os assinantes (O(1))"""
+        with self._condicao:
+            self._sequencia += 1
+            self._eventos[self._sequencia] = mensagem
+            self._eventos.pop(self._sequencia - self.eventos_guardados, None)
+            self.publicados += 1
+            self._condicao.notify_all()
+
+    def aguardar(self, proxima, tempo_limite):
+        """Mensagens a partir da sequência `proxima` (espera até tempo_limite)
+
+        Retorna (próxima sequência, mensagens). Quem ficou para trás do buffer
+        recebe 'recarregar'.
+        """
+        with self._condicao:
+            if self._sequencia < proxima:
+                self._condicao.wait(tempo_limite)
+            ultima = self._sequencia
+            if proxima <= ultima - self.eventos_guardados:
+                return ultima + 1, [_mensagem('recarregar', {})]
+            return ultima + 1, [self._eventos[s] for s in range(proxima, ultima + 1)]
+
+    def assinar(self, app, ultimo_id=None, limite=None):
+        """Registra uma tela e retorna o iterador das suas mensagens
+
+        Com `ultimo_id` (Last-Event-ID de uma reconexão), as alterações desde
+        aquela posição são lidas do banco e enviadas primeiro. Retorna None se
+        o processo já tiver `limite` assinantes.
+        """
+        with self._condicao:
+            if limite is not None and self.assinantes >= limite:
+                return None
+            self.assinantes += 1
+            proxima = self._sequencia + 1
+            sem_posicao = self._posicao is None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._acompanhar, args=(app,),
+                                                name='eventos-produtos', daemon=True)
+                self._thread.start()
+
+        if sem_posicao:
+            # Primeira tela: a thread passa a acompanhar o feed a partir de agora
+            posicao = _posicao_atual()
+            with self._condicao:
+                if self._posicao is None:
+                    self._posicao = posicao
+
+        # Lido depois do registro: o que for publicado nesse meio chega em dobro,
+        # nunca se perde (aplicar um evento duas vezes não muda nada na tela)
+        iniciais = [b'retry: 3000\n\n']
+        try:
+            desde, apos_id = (int(parte) for parte in (ultimo_id or '').split(':'))
+        except ValueError:
+            desde = None
+        if desde is not None:
+            linhas, tem_mais, posicao = linhas_alteradas(COLUNAS_EVENTO, desde, apos_id, LIMITE_LOTE_EVENTOS)
+            if tem_mais:
+                iniciais.append(_mensagem('recarregar', {}))
+            elif linhas:
+                iniciais.append(_lote(linhas, posicao))
+        return Assinatura(self, proxima, iniciais)
+
+    def cancelar(self):
+        with self._condicao:
+            self.assinantes -= 1
+
+    def notificar(self):
+        """Acorda a thread de eventos (chamado após o commit de uma escrita)"""
+        if self.assinantes:
+            self._acordar.set()
+
+    def _acompanhar(self, app):
+        """Thread do processo: lê o feed de alterações e publica os lotes"""
+        with app.app_context():
+            while True:
+                self._acordar.wait(INTERVALO_EVENTOS)
+                self._acordar.clear()
+                with self._condicao:
+                    if not self.assinantes:
+                        # Sem telas conectadas não há consultas; a próxima recomeça do atual
+                        self._posicao = None
+                        continue
+                try:
+                    self._consultar()
+                except Exception as e:
+                    app.logger.warning(f"Falha ao ler alterações para os eventos: {e}")
+                finally:
+                    # Não segurar conexão do pool entre as consultas
+                    db.session.remove()
+
+    def _consultar(self):
+        if self._posicao is None:
+            return
+        linhas, tem_mais, posicao = linhas_alteradas(
+            COLUNAS_EVENTO, self._posicao['desde'], self._posicao['apos_id'], LIMITE_LOTE_EVENTOS
+        )
+        if tem_mais:
+            self._posicao = _posicao_atual()
+            self.publicar(_mensagem('recarregar', {}))
+        elif linhas:
+            self._posicao = posicao
+            self.publicar(_lote(linhas, posicao))
+
+# Canal único por processo
+canal_produtos = CanalProdutos()
@@ -0,0 +1,359 @@
+"""
+Sistema de Supermercado - Exportação das vendas para análise (Parquet/Arrow)
+Uma linha por item vendido, já com a venda, o operador e o produto, lida em
+lotes de tamanho fixo com cursor no servidor e gravada em Parquet ou Arrow
+(pip install pyarrow). A memória usada depende do lote, não do período.
+
+A exportação é incremental pelo id da venda, até a última venda com todas as
+anteriores já confirmadas (ultima_venda_exportavel): a próxima exportação,
+com as vendas de id acima dessa marca, não perde nenhuma. No PostgreSQL a
+marca vem da transação aberta mais antiga (pg_stat_activity), comparada com
+vendas.gravada_em do relógio do banco: uma transação parada ou esperando
+bloqueio segura a marca em vez de ter suas vendas puladas. Ela só enxerga as
+transações do próprio usuário do banco (ou todas, com pg_read_all_stats):
+as vendas devem ser gravadas pelo mesmo usuário que exporta.
+"""
+
+import json
+import os
+import shutil
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from app.extensoes import db
+from app.modelos import Usuario, Produto, Venda, ItemVenda
+from app.relatorios import dia_local
+from app.arquivo_vendas import vendas_arquivadas_entre, ultima_venda_arquivada
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # dependência opcional
+    pa = pq = None
+
+FORMATOS_EXPORTACAO = ('parquet', 'arrow')
+
+# Linhas por lote lido do banco e gravado (um row group no Parquet)
+LOTE_EXPORTACAO = 50000
+
+# Arquivos de dia abertos ao mesmo tempo na exportação para diretório
+ARQUIVOS_ABERTOS = 32
+
+# Marca da última exportação, dentro do diretório de destino
+ARQUIVO_MARCA = '_marca.json'
+
+# Tempo máximo entre gravar a venda e confirmá-la: vendas gravadas há menos
+# que isso ficam para a próxima exportação (bancos além de PostgreSQL e SQLite)
+HORIZONTE_EXPORTACAO = timedelta(seconds=float(os.getenv('EXPORTACAO_HORIZONTE', '60')))
+
+COLUNAS_EXPORTACAO = (
+    'venda_id', 'item_id', 'data_venda', 'dia', 'operador_id', 'operador', 'venda_uuid',
+    'produto_id', 'codigo_barras', 'produto', 'categoria',
+    'quantidade', 'preco_unitario', 'subtotal', 'valor_total_venda'
+)
+
+class ExportacaoIndisponivel(Exception):
+    """pyarrow não instalado ou formato inválido"""
+
+def _esquema():
+    dinheiro = pa.decimal128(10, 2)
+    return pa.schema([
+        ('venda_id', pa.int64()), ('item_id', pa.int64()),
+        ('data_venda', pa.timestamp('us', tz='UTC')), ('dia', pa.date32()),
+        ('operador_id', pa.int32()), ('operador', pa.string()), ('venda_uuid', pa.string()),
+        ('produto_id', pa.int32()), ('codigo_barras', pa.string()), ('produto', pa.string()),
+        ('categoria', pa.string()), ('quantidade', pa.int32()),
+        ('preco_unitario', dinheiro), ('subtotal', dinheiro), ('valor_total_venda', dinheiro),
+    ])
+
+def _verificar(formato):
+    if pa is None:
+        raise ExportacaoIndisponivel('Exportação em Parquet/Arrow requer o pacote pyarrow')
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ExportacaoIndisponivel('Formato inválido (use parquet ou arrow)')
+
+def _horizonte_postgresql():
+    """Início da transação aberta mais antiga de outra conexão (UTC, relógio do banco)
+
+    O relógio é lido antes das transações: uma que comece entre as duas
+    leituras começou depois do horizonte devolvido.
+    """
+    agora = db.session.scalar(db.text("SELECT clock_timestamp() AT TIME ZONE 'UTC'"))
+    # pg_stat_activity é lida uma vez por transação; a leitura seguinte é atual
+    db.session.execute(db.text("SELECT pg_stat_clear_snapshot()"))
+    mais_antiga = db.session.scalar(db.text(
+        """SELECT min(xact_start) AT TIME ZONE 'UTC' FROM pg_stat_activity
+           WHERE datname = current_database() AND pid <> pg_backend_pid()"""
+    ))
+    return min(agora, mais_antiga) if mais_antiga is not None else agora
+
+def ultima_venda_exportavel():
+    """Maior id de venda abaixo do qual todas as vendas já foram confirmadas
+
+    No PostgreSQL as vendas recebem o id ao gravar e são confirmadas em
+    qualquer ordem: uma venda de id menor ainda em andamento sumiria da
+    exportação que passasse do seu id. gravada_em é o relógio do banco no
+    INSERT que gera o id, então uma venda gravada antes do início da
+    transação aberta mais antiga já terminou, e todo id menor que o dela
+    também (foi gerado antes, por uma transação que não está mais aberta).
+    No SQLite a escrita é exclusiva até o commit, então os ids seguem a
+    ordem de confirmação e vale o maior id. Nos demais bancos vale o
+    horizonte de tempo, que perde vendas confirmadas depois dele.
+    """
+    consulta = db.select(Venda.id).order_by(Venda.id.desc()).limit(1)
+    dialeto = db.engine.dialect.name
+    if dialeto == 'postgresql':
+        consulta = consulta.where(Venda.gravada_em < _horizonte_postgresql())
+    elif dialeto != 'sqlite':
+        consulta = consulta.where(Venda.gravada_em <= datetime.utcnow() - HORIZONTE_EXPORTACAO)
+    return max(db.session.scalar(consulta) or 0, ultima_venda_arquivada())
+
+# ==================== LEITURA EM LOTES ====================
+
+def _lotes_arquivados(desde, ate, tamanho_lote):
+    """Itens das vendas arquivadas, com código e categoria do cadastro atual"""
+    lote = []
+
+    def completar(lote):
+        produtos = dict((linha.id, linha) for linha in db.session.execute(
+            db.select(Produto.id, Produto.codigo_barras, Produto.categoria)
+            .where(Produto.id.in_({linha[7] for linha in lote}))
+        ))
+        for i, linha in enumerate(lote):
+            produto = produtos.get(linha[7])
+            if produto is not None:
+                lote[i] = linha[:8] + (produto.codigo_barras, linha[9], produto.categoria) + linha[11:]
+        return lote
+
+    for venda in vendas_arquivadas_entre(desde, ate):
+        for item in venda['itens']:
+            lote.append((venda['id'], item.get('id'), venda['data_venda'], None, venda['operador_id'],
+                         venda['operador'], venda['uuid'], item['produto_id'], None, item['nome'],
+                         None, item['quantidade'], item['preco_unitario'], item['subtotal'],
+                         venda['valor_total']))
+        if len(lote) >= tamanho_lote:
+            yield completar(lote)
+            lote = []
+    if lote:
+        yield completar(lote)
+
+def _lotes_banco(desde, ate, tamanho_lote):
+    """Itens das vendas no banco, em ordem de venda, com cursor no servidor"""
+    consulta = (
+        db.select(Venda.id, ItemVenda.id, Venda.data_venda, Venda.operador_id, Usuario.nome,
+                  Venda.uuid, ItemVenda.produto_id, Produto.codigo_barras,
+                  Produto.nome, Produto.categoria, ItemVenda.quantidade, ItemVenda.preco_unitario,
+                  ItemVenda.subtotal, Venda.valor_total)
+        .join(Venda, Venda.id == ItemVenda.venda_id)
+        .outerjoin(Usuario, Usuario.id == Venda.operador_id)
+        .outerjoin(Produto, Produto.id == ItemVenda.produto_id)
+        .where(ItemVenda.venda_id > desde, ItemVenda.venda_id <= ate)
+        .order_by(ItemVenda.venda_id, ItemVenda.id)
+    )
+    # stream_results: cursor no servidor (PostgreSQL), sem carregar o resultado inteiro
+    resultado = db.session.execute(consulta.execution_options(stream_results=True, yield_per=tamanho_lote))
+    for particao in resultado.partitions():
+        # Dia (índice 3) preenchido ao montar a tabela
+        yield [linha[:3] + (None,) + linha[3:] for linha in particao]
+
+def lotes_vendas(desde=0, ate=None, tamanho_lote=LOTE_EXPORTACAO):
+    """Lotes de linhas (uma por item) das vendas com desde < id <= ate
+
+    Cada linha segue COLUNAS_EXPORTACAO, com o dia ainda vazio. As vendas
+    arquivadas vêm primeiro, lidas do arquivo mensal.
+    """
+    if ate is None:
+        ate = ultima_venda_exportavel()
+    if desde < ultima_venda_arquivada():
+        yield from _lotes_arquivados(desde, ate, tamanho_lote)
+    yield from _lotes_banco(desde, ate, tamanho_lote)
+
+def _tabela(lote, esquema, dias):
+    """Lote de linhas -> tabela Arrow, com o dia local de cada venda"""
+    colunas = [list(coluna) for coluna in zip(*lote)]
+    dia = colunas[3]
+    for i, data in enumerate(colunas[2]):
+        # O fuso local só muda de hora em hora: um cálculo por hora
+        chave = data.replace(minute=0, second=0, microsecond=0)
+        if chave not in dias:
+            dias[chave] = dia_local(chave)
+        dia[i] = dias[chave]
+    return pa.Table.from_arrays(
+        [pa.array(coluna, type=campo.type) for coluna, campo in zip(colunas, esquema)],
+        schema=esquema
+    )
+
+# ==================== SAÍDA EM STREAMING (HTTP) ====================
+
+class _SaidaMemoria:
+    """Arquivo só de escrita que guarda os bytes até serem enviados"""
+
+    def __init__(self):
+        self.partes = []
+        self.posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        dados = bytes(dados)
+        self.partes.append(dados)
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self.posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def retirar(self):
+        dados, self.partes = b''.join(self.partes), []
+        return dados
+
+def _novo_escritor(destino, formato, esquema, fluxo=False):
+    if formato == 'parquet':
+        return pq.ParquetWriter(destino, esquema, compression='zstd')
+    return pa.ipc.new_stream(destino, esquema) if fluxo else pa.ipc.new_file(destino, esquema)
+
+def exportar_vendas_fluxo(formato='parquet', desde=0, ate=None, tamanho_lote=LOTE_EXPORTACAO):
+    """Arquivo Parquet ou Arrow (formato de fluxo do IPC) em blocos de bytes
+
+    Valida o formato na chamada e retorna o gerador dos blocos, um por lote.
+    """
+    _verificar(formato)
+    esquema = _esquema()
+
+    def blocos():
+        saida = _SaidaMemoria()
+        escritor = _novo_escritor(saida, formato, esquema, fluxo=True)
+        dias = {}
+        for lote in lotes_vendas(desde, ate, tamanho_lote):
+            escritor.write_table(_tabela(lote, esquema, dias))
+            yield saida.retirar()
+        escritor.close()
+        yield saida.retirar()
+
+    return blocos()
+
+# ==================== EXPORTAÇÃO PARA DIRETÓRIO ====================
+
+def ler_marca(destino):
+    """Última venda exportada para o diretório (0 na primeira exportação)"""
+    try:
+        with open(os.path.join(destino, ARQUIVO_MARCA), encoding='utf-8') as arquivo:
+            return int(json.load(arquivo)['ultima_venda_id'])
+    except FileNotFoundError:
+        return 0
+
+class _ArquivosPorDia:
+    """Um arquivo por dia (dia=AAAA-MM-DD/), com no máximo `limite` abertos
+
+    O dia fica só no nome da pasta (partição hive), não como coluna do arquivo.
+    """
+
+    def __init__(self, diretorio, prefixo, formato, esquema, limite=ARQUIVOS_ABERTOS):
+        self.diretorio = diretorio
+        self.prefixo = prefixo
+        self.formato = formato
+        self.esquema = esquema
+        self.limite = limite
+        self.abertos = OrderedDict()     # dia -> (arquivo, escritor)
+        self.partes = {}                 # dia -> arquivos já criados
+        self.gravados = []
+
+    def escrever(self, dia, tabela):
+        if dia in self.abertos:
+            self.abertos.move_to_end(dia)
+        else:
+            if len(self.abertos) >= self.limite:
+                self._fechar(next(iter(self.abertos)))
+            # Dia reaberto (venda sem conexão chegando depois): outro arquivo
+            parte = self.partes.get(dia, 0) + 1
+            self.partes[dia] = parte
+            pasta = os.path.join(self.diretorio, f'dia={dia.isoformat()}')
+            os.makedirs(pasta, exist_ok=True)
+            caminho = os.path.join(pasta, f'{self.prefixo}-{parte:04d}.{self.formato}')
+            arquivo = open(caminho, 'wb')
+            self.abertos[dia] = (arquivo, _novo_escritor(arquivo, self.formato, self.esquema))
+            self.gravados.append(caminho)
+        self.abertos[dia][1].write_table(tabela)
+
+    def _fechar(self, dia):
+        arquivo, escritor = self.abertos.pop(dia)
+        escritor.close()
+        arquivo.close()
+
+    def fechar(self):
+        while self.abertos:
+            self._fechar(next(iter(self.abertos)))
+
+def exportar_vendas_diretorio(destino, formato='parquet', desde=None, tamanho_lote=LOTE_EXPORTACAO):
+    """Exporta as vendas novas para `destino`, particionadas por dia local
+
+    Sem `desde`, continua da marca gravada em destino/_marca.json. Os arquivos
+    são montados em uma pasta temporária e movidos para dia=AAAA-MM-DD/ só no
+    fim, antes da nova marca; uma exportação interrompida é refeita por
+    inteiro na próxima execução, sem linhas repetidas.
+    """
+    _verificar(formato)
+    os.makedirs(destino, exist_ok=True)
+    if desde is None:
+        desde = ler_marca(destino)
+    ate = ultima_venda_exportavel()
+    prefixo = f'vendas-{desde + 1}'
+
+    # Restos de uma execução interrompida a partir da mesma marca
+    for nome in os.listdir(destino):
+        caminho = os.path.join(destino, nome)
+        if nome.startswith('_tmp-'):
+            shutil.rmtree(caminho, ignore_errors=True)
+        elif nome.startswith('dia='):
+            for arquivo in os.listdir(caminho):
+                if arquivo.startswith(prefixo + '-'):
+                    os.remove(os.path.join(caminho, arquivo))
+
+    relatorio = {'desde': desde, 'ate': ate, 'linhas': 0, 'arquivos': 0, 'dias': 0}
+    if ate <= desde:
+        return relatorio
+
+    esquema = _esquema()
+    temporario = os.path.join(destino, f'_tmp-{desde + 1}-{ate}')
+    arquivos = _ArquivosPorDia(temporario, f'{prefixo}-{ate}', formato, esquema.remove(3))
+    dias = {}
+    try:
+        for lote in lotes_vendas(desde, ate, tamanho_lote):
+            tabela = _tabela(lote, esquema, dias)
+            relatorio['linhas'] += tabela.num_rows
+            coluna_dia = tabela.column('dia').to_pylist()
+            # Lote em ordem de venda: os dias aparecem em sequência
+            inicio = 0
+            for fim in range(1, len(coluna_dia) + 1):
+                if fim == len(coluna_dia) or coluna_dia[fim] != coluna_dia[inicio]:
+                    arquivos.escrever(coluna_dia[inicio], tabela.slice(inicio, fim - inicio).remove_column(3))
+                    inicio = fim
+    finally:
+        arquivos.fechar()
+
+    for caminho in arquivos.gravados:
+        final = os.path.join(destino, os.path.relpath(caminho, temporario))
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(caminho, final)
+    shutil.rmtree(temporario, ignore_errors=True)
+
+    marca = os.path.join(destino, ARQUIVO_MARCA)
+    with open(marca + '.tmp', 'w', encoding='utf-8') as arquivo:
+        json.dump({'ultima_venda_id': ate, 'exportado_em': datetime.utcnow().isoformat(),
+                   'formato': formato, 'linhas': relatorio['linhas']}, arquivo)
+    os.replace(marca + '.tmp', marca)
+
+    relatorio['arquivos'] = len(arquivos.gravados)
+    relatorio['dias'] = len(arquivos.partes)
+    return relatorio
@@ -0,0 +1,13 @@
+"""
+Sistema de Supermercado - Extensões do Flask
+Criadas sem aplicação e ligadas a ela em create_app()
+"""
+
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+
+db = SQLAlchemy()
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+login_manager.login_message = 'Por favor, faça login para acessar esta página.'
@@ -0,0 +1,149 @@
+"""
+Sistema de Supermercado - Histórico de vendas (botão "Vendas Recentes" do PDV)
+Resumos das vendas (id, data, total e número de itens), da mais recente para
+a mais antiga, por operador e período. As páginas seguem a posição
+(data_venda, id) da última venda recebida, sem OFFSET: cada página é uma busca
+no índice ix_vendas_operador_data, não importa quantas vendas a loja tenha.
+O número de itens vem do índice de itens_venda, sem ler os itens. Quando o
+banco acaba antes de completar a página, ela continua pelos resumos das vendas
+arquivadas (resumo_vendas_arquivadas), com a mesma busca por posição: os
+arquivos mensais não são lidos.
+
+As últimas vendas de cada caixa (operador) que estão no banco ficam em cache e
+recebem as vendas deste processo logo após o commit. Antes de usá-las, o maior
+id de venda do caixa desde a mais antiga em cache é conferido no índice: uma
+venda feita em outro worker muda esse id e a lista é lida de novo. O cache não
+guarda vendas arquivadas; com poucas vendas no banco, a primeira página é
+completada pelos resumos arquivados a cada consulta.
+"""
+
+from datetime import datetime, timezone
+
+from app.extensoes import db
+from app.modelos import Venda, ItemVenda, ResumoVendaArquivada
+from app.caches import cache_vendas_recentes
+
+LIMITE_PADRAO_HISTORICO = 20
+LIMITE_MAXIMO_HISTORICO = 100
+
+# Vendas guardadas por caixa no cache (a primeira página do PDV)
+VENDAS_RECENTES = LIMITE_PADRAO_HISTORICO
+
+def data_historico(valor):
+    """Posição `antes` recebida do cliente (ISO 8601) em UTC sem fuso, ou None"""
+    try:
+        data = datetime.fromisoformat(str(valor))
+    except ValueError:
+        return None
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+def _filtrar(consulta, tabela, operador_id, inicio, fim, antes):
+    """Filtros do histórico em `vendas` ou nos resumos arquivados (mesmas colunas)"""
+    if operador_id is not None:
+        consulta = consulta.where(tabela.operador_id == operador_id)
+    if inicio is not None:
+        consulta = consulta.where(tabela.data_venda >= inicio)
+    if fim is not None:
+        consulta = consulta.where(tabela.data_venda < fim)
+    if antes is not None:
+        data, venda_id = antes
+        # O `<=` isolado limita a busca no índice; o OR desempata pelo id
+        consulta = consulta.where(
+            tabela.data_venda <= data,
+            db.or_(tabela.data_venda < data, tabela.id < venda_id)
+        )
+    return consulta.order_by(tabela.data_venda.desc(), tabela.id.desc())
+
+def _consultar(operador_id, inicio, fim, antes, limite, arquivo=True):
+    """Até `limite` resumos (id, data_venda, valor_total, itens, operador_id)
+
+    Com `arquivo`, a página que o banco não completa continua pelas vendas
+    arquivadas, todas anteriores às do banco.
+    """
+    itens = (
+        db.select(db.func.count())
+        .where(ItemVenda.venda_id == Venda.id)
+        .scalar_subquery()
+    )
+    consulta = db.select(Venda.id, Venda.data_venda, Venda.valor_total, itens.label('itens'),
+                         Venda.operador_id)
+    linhas = [tuple(linha) for linha in db.session.execute(
+        _filtrar(consulta, Venda, operador_id, inicio, fim, antes).limit(limite)
+    )]
+    if arquivo and len(linhas) < limite:
+        linhas += _consultar_arquivo(operador_id, inicio, fim, antes, limite - len(linhas))
+    return linhas
+
+def _consultar_arquivo(operador_id, inicio, fim, antes, limite):
+    """Continuação de _consultar nos resumos das vendas arquivadas"""
+    consulta = db.select(ResumoVendaArquivada.id, ResumoVendaArquivada.data_venda,
+                         ResumoVendaArquivada.valor_total, ResumoVendaArquivada.itens,
+                         ResumoVendaArquivada.operador_id)
+    return [tuple(linha) for linha in db.session.execute(
+        _filtrar(consulta, ResumoVendaArquivada, operador_id, inicio, fim, antes).limit(limite)
+    )]
+
+def _pagina(linhas, limite):
+    """Resposta da API: até `limite` vendas e a posição da próxima página"""
+    vendas = [{
+        'id': venda_id,
+        'data_venda': data_venda.isoformat() + 'Z',
+        'valor_total': float(valor_total),
+        'itens': itens,
+        'operador_id': operador_id
+    } for venda_id, data_venda, valor_total, itens, operador_id in linhas[:limite]]
+    proximo = None
+    if len(linhas) > limite:
+        proximo = {'antes': vendas[-1]['data_venda'], 'antes_id': vendas[-1]['id']}
+    return {'vendas': vendas, 'proximo': proximo}
+
+def historico_vendas(operador_id=None, inicio=None, fim=None, antes=None,
+                     limite=LIMITE_PADRAO_HISTORICO):
+    """Página do histórico: vendas com data em [inicio, fim) (UTC) antes da posição
+
+    `antes` é a posição (data_venda, id) da última venda da página anterior.
+    A primeira página de um caixa, sem período, vem do cache.
+    """
+    if operador_id is not None and inicio is None and fim is None and antes is None \
+            and limite <= VENDAS_RECENTES:
+        linhas = vendas_recentes(operador_id)
+        if len(linhas) <= limite:
+            # As vendas do caixa no banco acabaram: a página segue pelo arquivo
+            ultima = (linhas[-1][1], linhas[-1][0]) if linhas else None
+            linhas = linhas + _consultar_arquivo(operador_id, None, None, ultima, limite + 1 - len(linhas))
+        return _pagina(linhas, limite)
+    return _pagina(_consultar(operador_id, inicio, fim, antes, limite + 1), limite)
+
+def _ultima_venda_desde(operador_id, linhas):
+    """Maior id de venda do caixa com data a partir da mais antiga de `linhas`"""
+    consulta = db.select(db.func.max(Venda.id)).where(Venda.operador_id == operador_id)
+    if linhas:
+        consulta = consulta.where(Venda.data_venda >= linhas[-1][1])
+    return db.session.execute(consulta).scalar()
+
+def vendas_recentes(operador_id):
+    """Últimas VENDAS_RECENTES + 1 vendas do caixa no banco (a extra indica se há mais)"""
+    geracao = cache_vendas_recentes.geracao
+    linhas = cache_vendas_recentes.get(operador_id)
+    # Qualquer venda nova do caixa (de qualquer worker, mesmo com data antiga
+    # dentro da lista) tem id maior que todos os da lista. Se as da lista forem
+    # arquivadas, o maior id muda uma vez e a lista lida de novo passa a conferir
+    if linhas is not None and \
+            _ultima_venda_desde(operador_id, linhas) != max((l[0] for l in linhas), default=None):
+        linhas = None
+    if linhas is None:
+        linhas = _consultar(operador_id, None, None, None, VENDAS_RECENTES + 1, arquivo=False)
+        cache_vendas_recentes.set(operador_id, linhas, geracao=geracao)
+    return linhas
+
+def registrar_venda_historico(venda, itens):
+    """Põe uma venda recém-confirmada nas vendas recentes do caixa em cache"""
+    linha = (venda.id, venda.data_venda, venda.valor_total, itens, venda.operador_id)
+
+    def incluir(linhas):
+        # Vendas feitas sem conexão podem ter data anterior às já listadas
+        return sorted(linhas + [linha], key=lambda l: (l[1], l[0]), reverse=True)[:VENDAS_RECENTES + 1]
+
+    cache_vendas_recentes.atualizar(venda.operador_id, incluir)
@@ -0,0 +1,202 @@
+"""
+Sistema de Supermercado - Métricas de requisições e consultas SQL
+Tempo por endpoint, consultas por requisição e consultas lentas, coletados
+por hooks do Flask e eventos do SQLAlchemy e expostos no formato de texto
+do Prometheus e no cabeçalho Server-Timing
+
+As métricas ficam na memória de cada processo: com vários workers do
+gunicorn, cada coleta do Prometheus enxerga apenas o worker que respondeu.
+"""
+
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Limites (em segundos) dos histogramas de latência
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Limites dos histogramas de consultas SQL por requisição
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100)
+
+# Consultas lentas guardadas para inspeção (as mais recentes)
+CONSULTAS_LENTAS_GUARDADAS = 50
+
+class Histograma:
+    """Histograma cumulativo no estilo do Prometheus (sem lock próprio)"""
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * len(limites)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.soma += valor
+        self.total += 1
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+
+    def linhas(self, nome, rotulos):
+        """Linhas _bucket/_sum/_count do histograma"""
+        acumulado = 0
+        for limite, contagem in zip(self.limites, self.contagens):
+            acumulado += contagem
+            yield f'{nome}_bucket{{{rotulos},le="{limite:g}"}} {acumulado}'
+        yield f'{nome}_bucket{{{rotulos},le="+Inf"}} {self.total}'
+        yield f'{nome}_sum{{{rotulos}}} {self.soma:.6f}'
+        yield f'{nome}_count{{{rotulos}}} {self.total}'
+
+def _rotulo(valor):
+    """Escapa um valor de rótulo do Prometheus"""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class RegistroMetricas:
+    """Métricas acumuladas do processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._latencias = {}       # (endpoint, método, status) -> Histograma
+            self._consultas = {}       # endpoint -> Histograma de consultas por requisição
+            self._tempo_sql = {}       # endpoint -> segundos em consultas
+            self._lentas_total = {}    # endpoint -> consultas lentas
+            self._lentas = deque(maxlen=CONSULTAS_LENTAS_GUARDADAS)
+
+    def registrar_requisicao(self, endpoint, metodo, status, duracao, consultas, tempo_sql):
+        with self._lock:
+            chave = (endpoint, metodo, status)
+            if chave not in self._latencias:
+                self._latencias[chave] = Histograma(LIMITES_LATENCIA)
+            self._latencias[chave].observar(duracao)
+            if endpoint not in self._consultas:
+                self._consultas[endpoint] = Histograma(LIMITES_CONSULTAS)
+            self._consultas[endpoint].observar(consultas)
+            self._tempo_sql[endpoint] = self._tempo_sql.get(endpoint, 0.0) + tempo_sql
+
+    def registrar_consulta_lenta(self, endpoint, sql, duracao):
+        with self._lock:
+            self._lentas_total[endpoint] = self._lentas_total.get(endpoint, 0) + 1
+            self._lentas.append({
+                'endpoint': endpoint,
+                'duracao_ms': round(duracao * 1000, 2),
+                'sql': sql[:2000],
+                'instante': time.time()
+            })
+
+    def consultas_lentas(self):
+        """Consultas lentas mais recentes, da mais nova para a mais antiga"""
+        with self._lock:
+            return list(reversed(self._lentas))
+
+    def prometheus(self, caches=None):
+        """Métricas no formato de texto do Prometheus (versão 0.0.4)
+
+        `caches` é um dicionário nome -> objeto com stats() (hits, misses,
+        evictions) para exportar também o uso dos caches.
+        """
+        linhas = []
+        with self._lock:
+            linhas.append('# HELP supermercado_requisicao_segundos Tempo de resposta por endpoint')
+            linhas.append('# TYPE supermercado_requisicao_segundos histogram')
+            for (endpoint, metodo, status), histograma in sorted(self._latencias.items()):
+                rotulos = f'endpoint="{_rotulo(endpoint)}",metodo="{metodo}",status="{status}"'
+                linhas.extend(histograma.linhas('supermercado_requisicao_segundos', rotulos))
+
+            linhas.append('# HELP supermercado_consultas_por_requisicao Consultas SQL por requisição')
+            linhas.append('# TYPE supermercado_consultas_por_requisicao histogram')
+            for endpoint, histograma in sorted(self._consultas.items()):
+                linhas.extend(histograma.linhas('supermercado_consultas_por_requisicao',
+                                                f'endpoint="{_rotulo(endpoint)}"'))
+
+            linhas.append('# HELP supermercado_sql_segundos_total Tempo gasto em consultas SQL por endpoint')
+            linhas.append('# TYPE supermercado_sql_segundos_total counter')
+            for endpoint, segundos in sorted(self._tempo_sql.items()):
+                linhas.append(f'supermercado_sql_segundos_total{{endpoint="{_rotulo(endpoint)}"}} {segundos:.6f}')
+
+            linhas.append('# HELP supermercado_consultas_lentas_total Consultas acima de METRICAS_CONSULTA_LENTA_MS')
+            linhas.append('# TYPE supermercado_consultas_lentas_total counter')
+            for endpoint, total in sorted(self._lentas_total.items()):
+                linhas.append(f'supermercado_consultas_lentas_total{{endpoint="{_rotulo(endpoint)}"}} {total}')
+
+        if caches:
+            for metrica in ('hits', 'misses', 'evictions'):
+                linhas.append(f'# TYPE supermercado_cache_{metrica}_total counter')
+                for nome, cache in sorted(caches.items()):
+                    linhas.append(f'supermercado_cache_{metrica}_total{{cache="{nome}"}} {cache.stats()[metrica]}')
+        return '\n'.join(linhas) + '\n'
+
+# Registro único por processo
+metricas = RegistroMetricas()
+
+# ==================== HOOKS ====================
+
+def _endpoint_atual():
+    if not has_request_context():
+        return 'segundo_plano'
+    return request.endpoint or 'sem_rota'
+
+def instalar_metricas(app, engines, limite_lento=0.1, limite_consultas=50, server_timing=True):
+    """Registra os hooks de tempo de requisição e os eventos de consulta SQL
+
+    Só é chamada com METRICAS ativado; desativado, nenhum hook é registrado
+    e não há custo algum por requisição ou consulta.
+    """
+
+    def antes_da_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+        conexao.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+    def depois_da_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+        inicios = conexao.info.get('metricas_inicio')
+        if not inicios:
+            return
+        duracao = time.perf_counter() - inicios.pop()
+        if has_request_context() and 'metricas_inicio' in g:
+            g.metricas_consultas += 1
+            g.metricas_tempo_sql += duracao
+        if duracao >= limite_lento:
+            endpoint = _endpoint_atual()
+            sql = ' '.join(sql.split())
+            metricas.registrar_consulta_lenta(endpoint, sql, duracao)
+            app.logger.warning(f"Consulta lenta ({duracao * 1000:.0f}ms) em {endpoint}: {sql[:200]}")
+
+    def erro_na_consulta(contexto):
+        if contexto.connection is not None and contexto.connection.info.get('metricas_inicio'):
+            contexto.connection.info['metricas_inicio'].pop()
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', antes_da_consulta)
+        event.listen(engine, 'after_cursor_execute', depois_da_consulta)
+        event.listen(engine, 'handle_error', erro_na_consulta)
+
+    @app.before_request
+    def iniciar_medicao():
+        g.metricas_inicio = time.perf_counter()
+        g.metricas_consultas = 0
+        g.metricas_tempo_sql = 0.0
+
+    @app.after_request
+    def finalizar_medicao(resposta):
+        if 'metricas_inicio' not in g:
+            return resposta
+        # Respostas em streaming: mede até o início do envio do corpo
+        duracao = time.perf_counter() - g.metricas_inicio
+        endpoint = _endpoint_atual()
+        metricas.registrar_requisicao(endpoint, request.method, resposta.status_code,
+                                      duracao, g.metricas_consultas, g.metricas_tempo_sql)
+        if g.metricas_consultas > limite_consultas:
+            # Provável N+1: uma consulta por item em vez de uma por lote
+            app.logger.warning(f"{endpoint} executou {g.metricas_consultas} consultas SQL")
+        if server_timing:
+            resposta.headers['Server-Timing'] = (
+                f'app;dur={duracao * 1000:.1f}, '
+                f'db;dur={g.metricas_tempo_sql * 1000:.1f};desc="{g.metricas_consultas} consultas"'
+            )
+        return resposta
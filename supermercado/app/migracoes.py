@@ -0,0 +1,286 @@
+"""
+Sistema de Supermercado - Migrações de esquema versionadas
+Cada migração é aplicada uma única vez e registrada na tabela schema_versao.
+As migrações devem ser idempotentes: a versão 1 cria as tabelas a partir dos
+modelos atuais, então as seguintes precisam tolerar objetos já existentes.
+
+Linha de comando: python migracoes.py [status|aplicar|compactar]
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import inspect, text
+
+from app import busca as busca_produtos
+
+# Tabelas criadas fora dos modelos, removidas junto em recriar_banco()
+TABELAS_AUXILIARES = ['produtos_busca', 'schema_versao', 'vendas_itens_arquivo']
+
+# Vendas processadas por transação nas migrações de dados
+LOTE_MIGRACAO = 5000
+
+# ==================== MIGRAÇÕES ====================
+
+def _criar_tabelas(db):
+    db.create_all()
+
+def _indices_busca(db):
+    busca_produtos.criar_indice_busca(db)
+
+def _indices_consultas(db):
+    """Índices declarados nos modelos para as consultas frequentes"""
+    nomes = {
+        'ix_produtos_ativo_categoria', 'ix_produtos_ativos_nome',
+        'ix_vendas_data_venda', 'ix_vendas_operador_data',
+        'ix_itens_venda_venda_id', 'ix_itens_venda_produto_id',
+    }
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            if indice.name in nomes:
+                indice.create(db.engine, checkfirst=True)
+
+def _criar_tabelas_novas(*nomes):
+    """Cria tabelas declaradas nos modelos que ainda não existem no banco"""
+    def migracao(db):
+        for nome in nomes:
+            db.metadata.tables[nome].create(db.engine, checkfirst=True)
+    return migracao
+
+def _item_do_json(venda_id, item):
+    preco = Decimal(str(item['preco']))
+    quantidade = int(item['quantidade'])
+    subtotal = Decimal(str(item['subtotal'])) if item.get('subtotal') is not None else preco * quantidade
+    return {
+        'venda_id': venda_id,
+        'produto_id': int(item['id']),
+        'quantidade': quantidade,
+        'preco_unitario': preco.quantize(Decimal('0.01')),
+        'subtotal': subtotal.quantize(Decimal('0.01'))
+    }
+
+def _normalizar_itens_vendas(db):
+    """Leva para itens_venda as vendas que só tinham o JSON e remove vendas.itens_json
+
+    Vendas cujo JSON não pode ser convertido (produto inexistente ou conteúdo
+    inválido) são guardadas em vendas_itens_arquivo antes da remoção.
+    """
+    if 'itens_json' not in {coluna['name'] for coluna in inspect(db.engine).get_columns('vendas')}:
+        return
+
+    with db.engine.connect() as conexao:
+        produtos = {linha.id for linha in conexao.execute(text("SELECT id FROM produtos"))}
+
+    migradas = arquivadas = ultimo = 0
+    while True:
+        # Cada lote em sua própria transação: se interrompida, a migração recomeça
+        # apenas das vendas que ainda não têm itens
+        with db.engine.begin() as conexao:
+            vendas = conexao.execute(text(
+                """SELECT v.id, v.itens_json FROM vendas v
+                   WHERE v.id > :ultimo AND v.itens_json IS NOT NULL
+                     AND NOT EXISTS (SELECT 1 FROM itens_venda i WHERE i.venda_id = v.id)
+                   ORDER BY v.id LIMIT :lote"""
+            ), {'ultimo': ultimo, 'lote': LOTE_MIGRACAO}).all()
+            if not vendas:
+                break
+
+            itens, arquivo = [], []
+            for venda in vendas:
+                try:
+                    linhas = [_item_do_json(venda.id, item) for item in json.loads(venda.itens_json)]
+                except (ValueError, TypeError, KeyError, ArithmeticError):
+                    linhas = []
+                if linhas and all(linha['produto_id'] in produtos for linha in linhas):
+                    itens.extend(linhas)
+                    migradas += 1
+                else:
+                    arquivo.append({'venda_id': venda.id, 'itens_json': venda.itens_json})
+
+            if itens:
+                conexao.execute(db.metadata.tables['itens_venda'].insert(), itens)
+            if arquivo:
+                conexao.execute(text(
+                    """CREATE TABLE IF NOT EXISTS vendas_itens_arquivo (
+                           venda_id INTEGER PRIMARY KEY,
+                           itens_json TEXT NOT NULL
+                       )"""
+                ))
+                conexao.execute(text(
+                    "INSERT INTO vendas_itens_arquivo (venda_id, itens_json) VALUES (:venda_id, :itens_json)"
+                ), arquivo)
+                arquivadas += len(arquivo)
+            ultimo = vendas[-1].id
+
+    with db.engine.begin() as conexao:
+        if db.engine.dialect.name == 'sqlite' and sqlite3.sqlite_version_info < (3, 35):
+            # SQLite antigo não tem DROP COLUMN: a coluna fica vazia e sem uso
+            conexao.execute(text("UPDATE vendas SET itens_json = NULL"))
+        else:
+            conexao.execute(text("ALTER TABLE vendas DROP COLUMN itens_json"))
+
+    if migradas:
+        print(f"   {migradas} vendas antigas ganharam itens normalizados; "
+              f"execute 'python populate_db.py resumos' para atualizar os relatórios")
+    if arquivadas:
+        print(f"   {arquivadas} vendas com JSON não convertido guardadas em vendas_itens_arquivo")
+
+def _sincronizacao_pdv(db):
+    """Versão do catálogo em produtos e identificador das vendas enviadas pelo PDV
+
+    Os produtos existentes ficam na versão 0, que a primeira sincronização
+    de cada caixa já inclui: não é preciso reescrever a tabela.
+    """
+    inspetor = inspect(db.engine)
+    colunas_produtos = {coluna['name'] for coluna in inspetor.get_columns('produtos')}
+    colunas_vendas = {coluna['name'] for coluna in inspetor.get_columns('vendas')}
+    with db.engine.begin() as conexao:
+        if 'versao' not in colunas_produtos:
+            conexao.execute(text("ALTER TABLE produtos ADD COLUMN versao BIGINT NOT NULL DEFAULT 0"))
+        if 'uuid' not in colunas_vendas:
+            conexao.execute(text("ALTER TABLE vendas ADD COLUMN uuid VARCHAR(36)"))
+
+    tabelas = db.metadata.tables
+    tabelas['catalogo_versao'].create(db.engine, checkfirst=True)
+    for tabela, indice in (('produtos', 'ix_produtos_versao'), ('vendas', 'ix_vendas_uuid')):
+        for item in tabelas[tabela].indexes:
+            if item.name == indice:
+                item.create(db.engine, checkfirst=True)
+
+    with db.engine.begin() as conexao:
+        if conexao.execute(text("SELECT COUNT(*) FROM catalogo_versao")).scalar() == 0:
+            conexao.execute(text("INSERT INTO catalogo_versao (id, versao) VALUES (1, 0)"))
+
+def _data_alteracao_produtos(db):
+    """Coluna produtos.atualizado_em, iniciada com a data de criação"""
+    if 'atualizado_em' in {coluna['name'] for coluna in inspect(db.engine).get_columns('produtos')}:
+        return
+    with db.engine.begin() as conexao:
+        conexao.execute(text("ALTER TABLE produtos ADD COLUMN atualizado_em TIMESTAMP"))
+        conexao.execute(text("UPDATE produtos SET atualizado_em = data_criacao"))
+
+def _velocidade_vendas(db):
+    """Velocidade de vendas dos produtos (reposição), começando em zero
+
+    Para partir do histórico: python populate_db.py velocidades
+    """
+    colunas = {coluna['name'] for coluna in inspect(db.engine).get_columns('produtos')}
+    with db.engine.begin() as conexao:
+        if 'velocidade_vendas' not in colunas:
+            conexao.execute(text("ALTER TABLE produtos ADD COLUMN velocidade_vendas FLOAT NOT NULL DEFAULT 0"))
+        if 'velocidade_atualizada_em' not in colunas:
+            conexao.execute(text("ALTER TABLE produtos ADD COLUMN velocidade_atualizada_em TIMESTAMP"))
+
+def _data_gravacao_vendas(db):
+    """Horário em que cada venda foi gravada (as antigas recebem a data da venda)"""
+    colunas = {coluna['name'] for coluna in inspect(db.engine).get_columns('vendas')}
+    with db.engine.begin() as conexao:
+        if 'gravada_em' not in colunas:
+            conexao.execute(text("ALTER TABLE vendas ADD COLUMN gravada_em TIMESTAMP"))
+        conexao.execute(text("UPDATE vendas SET gravada_em = data_venda WHERE gravada_em IS NULL"))
+
+def _vendas_offline(db):
+    """Marca das vendas aceitas como feitas sem conexão (as antigas ficam sem)"""
+    colunas = {coluna['name'] for coluna in inspect(db.engine).get_columns('vendas')}
+    if 'offline' not in colunas:
+        with db.engine.begin() as conexao:
+            conexao.execute(text("ALTER TABLE vendas ADD COLUMN offline BOOLEAN NOT NULL DEFAULT FALSE"))
+
+def _resumos_vendas_arquivadas(db):
+    """Resumos das vendas já arquivadas, lidos uma vez dos arquivos mensais"""
+    from app.arquivo_vendas import periodos_arquivados, vendas_arquivadas
+    from app.modelos import ResumoVendaArquivada
+
+    tabela = ResumoVendaArquivada.__table__
+    tabela.create(db.engine, checkfirst=True)
+    for periodo in (p['periodo'] for p in periodos_arquivados()):
+        with db.engine.begin() as conexao:
+            conexao.execute(tabela.delete().where(tabela.c.periodo == periodo))
+            lote = []
+            for venda in vendas_arquivadas(periodo):
+                lote.append({
+                    'id': venda['id'], 'periodo': periodo, 'operador_id': venda['operador_id'],
+                    'data_venda': venda['data_venda'], 'valor_total': venda['valor_total'],
+                    'itens': len(venda['itens'])
+                })
+                if len(lote) >= LOTE_MIGRACAO:
+                    conexao.execute(tabela.insert(), lote)
+                    lote = []
+            if lote:
+                conexao.execute(tabela.insert(), lote)
+
+MIGRACOES = [
+    (1, 'Tabelas iniciais', _criar_tabelas),
+    (2, 'Índices de busca de produtos', _indices_busca),
+    (3, 'Índices das consultas frequentes', _indices_consultas),
+    (4, 'Resumos diários de vendas', _criar_tabelas_novas(
+        'resumo_vendas_produto', 'resumo_vendas_categoria', 'resumo_vendas_operador')),
+    (5, 'Itens das vendas apenas em itens_venda (remove vendas.itens_json)', _normalizar_itens_vendas),
+    (6, 'Versão do catálogo e vendas identificadas pelo PDV', _sincronizacao_pdv),
+    (7, 'Data da última alteração dos produtos', _data_alteracao_produtos),
+    (8, 'Índice das vendas arquivadas por mês', _criar_tabelas_novas('arquivo_vendas')),
+    (9, 'Velocidade de vendas dos produtos', _velocidade_vendas),
+    (10, 'Horário de gravação das vendas', _data_gravacao_vendas),
+    (11, 'Vendas aceitas como feitas sem conexão', _vendas_offline),
+    (12, 'Resumos das vendas arquivadas (histórico)', _resumos_vendas_arquivadas),
+]
+
+# ==================== EXECUÇÃO ====================
+
+def _garantir_tabela_versao(db):
+    with db.engine.begin() as conexao:
+        conexao.execute(text(
+            """CREATE TABLE IF NOT EXISTS schema_versao (
+                   versao INTEGER PRIMARY KEY,
+                   descricao VARCHAR(200) NOT NULL,
+                   aplicada_em TIMESTAMP NOT NULL
+               )"""
+        ))
+
+def versao_atual(db):
+    """Retorna a última versão aplicada (0 para banco sem migrações)"""
+    _garantir_tabela_versao(db)
+    with db.engine.connect() as conexao:
+        return conexao.execute(text("SELECT MAX(versao) FROM schema_versao")).scalar() or 0
+
+def aplicar_migracoes(db):
+    """Aplica, em ordem, as migrações ainda pendentes"""
+    atual = versao_atual(db)
+    aplicadas = []
+    for versao, descricao, migracao in MIGRACOES:
+        if versao <= atual:
+            continue
+        migracao(db)
+        with db.engine.begin() as conexao:
+            conexao.execute(text(
+                "INSERT INTO schema_versao (versao, descricao, aplicada_em) "
+                "VALUES (:versao, :descricao, :aplicada_em)"
+            ), {'versao': versao, 'descricao': descricao, 'aplicada_em': datetime.utcnow()})
+        aplicadas.append(versao)
+        print(f"Migração {versao} aplicada: {descricao}")
+    return aplicadas
+
+def compactar(db):
+    """Devolve ao disco o espaço liberado (por exemplo, após a migração 5)"""
+    dialeto = db.engine.dialect.name
+    if dialeto == 'sqlite':
+        comandos = ["VACUUM", "ANALYZE"]
+    elif dialeto == 'postgresql':
+        comandos = ["VACUUM FULL ANALYZE vendas", "VACUUM ANALYZE itens_venda"]
+    else:
+        return False
+    # VACUUM não pode rodar dentro de uma transação
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexao:
+        for comando in comandos:
+            conexao.execute(text(comando))
+    return True
+
+def recriar_banco(db):
+    """Apaga todas as tabelas (inclusive as auxiliares) e reaplica as migrações"""
+    db.drop_all()
+    with db.engine.begin() as conexao:
+        for tabela in TABELAS_AUXILIARES:
+            conexao.execute(text(f"DROP TABLE IF EXISTS {tabela}"))
+    aplicar_migracoes(db)
@@ -0,0 +1,223 @@
+"""
+Sistema de Supermercado - Modelos do banco de dados
+"""
+
+from datetime import datetime
+
+from flask_login import UserMixin
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+from app.extensoes import db
+from app.senhas import ConfiguracaoSenhas
+
+# Algoritmo e custo do hash de senhas (SENHA_ALGORITMO e afins)
+configuracao_senhas = ConfiguracaoSenhas.do_ambiente()
+
+class agora_banco(FunctionElement):
+    """Horário UTC do relógio do banco no próprio comando (não no início da transação)"""
+    type = db.DateTime()
+    inherit_cache = True
+
+@compiles(agora_banco)
+def _agora_banco(elemento, compilador, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+@compiles(agora_banco, 'postgresql')
+def _agora_banco_postgresql(elemento, compilador, **kw):
+    return "(clock_timestamp() AT TIME ZONE 'UTC')"
+
+@compiles(agora_banco, 'sqlite')
+def _agora_banco_sqlite(elemento, compilador, **kw):
+    return "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# ==================== MODELOS DO BANCO DE DADOS ====================
+
+class Usuario(UserMixin, db.Model):
+    """Modelo para usuários do sistema (Admin/Operador)"""
+    __tablename__ = 'usuarios'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    login = db.Column(db.String(50), unique=True, nullable=False)
+    senha_hash = db.Column(db.String(255), nullable=False)
+    tipo = db.Column(db.String(20), nullable=False)  # 'admin' ou 'operador'
+    ativo = db.Column(db.Boolean, default=True)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def set_password(self, senha):
+        """Define a senha do usuário com hash"""
+        self.senha_hash = configuracao_senhas.gerar_hash(senha)
+    
+    def check_password(self, senha):
+        """Verifica se a senha está correta (SenhasOcupadas se não houver vaga)"""
+        return configuracao_senhas.verificar_limitado(self.senha_hash, senha)
+    
+    def precisa_rehash(self):
+        """Indica se o hash foi gerado com algoritmo ou custo diferentes dos atuais"""
+        return configuracao_senhas.precisa_rehash(self.senha_hash)
+    
+    def is_admin(self):
+        """Verifica se o usuário é administrador"""
+        return self.tipo == 'admin'
+
+class Produto(db.Model):
+    """Modelo para produtos do supermercado"""
+    __tablename__ = 'produtos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(200), nullable=False)
+    preco = db.Column(db.Numeric(10, 2), nullable=False)
+    estoque = db.Column(db.Integer, nullable=False, default=0)
+    codigo_barras = db.Column(db.String(50), unique=True, nullable=False)
+    categoria = db.Column(db.String(100), nullable=False)
+    ativo = db.Column(db.Boolean, default=True)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    # Data e versão do catálogo da última alteração (sincronização dos PDVs)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+    # Velocidade de vendas (unidades/dia, com decaimento) na data da última venda
+    velocidade_vendas = db.Column(db.Float, nullable=False, default=0)
+    velocidade_atualizada_em = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # Sincronização incremental: alterações após a versão (versao, id)
+        db.Index('ix_produtos_versao', 'versao', 'id'),
+        # Contagem de ativos, filtro por categoria e paginação por id
+        db.Index('ix_produtos_ativo_categoria', 'ativo', 'categoria', 'id'),
+        # Listagem ordenada por nome apenas dos produtos ativos
+        db.Index('ix_produtos_ativos_nome', 'nome', 'id',
+                 postgresql_where=db.text('ativo'), sqlite_where=db.text('ativo = 1')),
+    )
+    
+    def to_dict(self):
+        """Converte o produto para dicionário"""
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'preco': float(self.preco),
+            'estoque': self.estoque,
+            'codigo_barras': self.codigo_barras,
+            'categoria': self.categoria,
+            'ativo': self.ativo
+        }
+
+class CatalogoVersao(db.Model):
+    """Contador (linha única) das versões do catálogo de produtos"""
+    __tablename__ = 'catalogo_versao'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+
+class Venda(db.Model):
+    """Modelo para vendas realizadas"""
+    __tablename__ = 'vendas'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    operador_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    data_venda = db.Column(db.DateTime, default=datetime.utcnow)
+    valor_total = db.Column(db.Numeric(10, 2), nullable=False)
+    # Identificador gerado pelo PDV: reenvios da mesma venda não a duplicam
+    uuid = db.Column(db.String(36))
+    # Horário do banco ao gravar (data_venda de uma venda offline é a do caixa),
+    # no mesmo comando que gera o id: ver ultima_venda_exportavel()
+    gravada_em = db.Column(db.DateTime, default=agora_banco())
+    # Aceita sem as validações de estoque e produto ativo (venda feita sem conexão)
+    offline = db.Column(db.Boolean, nullable=False, default=False)
+    
+    __table_args__ = (
+        db.Index('ix_vendas_data_venda', 'data_venda'),
+        db.Index('ix_vendas_operador_data', 'operador_id', 'data_venda'),
+        db.Index('ix_vendas_uuid', 'uuid', unique=True),
+    )
+    
+    # Relacionamentos
+    operador = db.relationship('Usuario', backref='vendas')
+    itens = db.relationship('ItemVenda', backref='venda', cascade='all, delete-orphan')
+
+class ItemVenda(db.Model):
+    """Modelo para itens individuais de uma venda"""
+    __tablename__ = 'itens_venda'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    venda_id = db.Column(db.Integer, db.ForeignKey('vendas.id'), nullable=False)
+    produto_id = db.Column(db.Integer, db.ForeignKey('produtos.id'), nullable=False)
+    quantidade = db.Column(db.Integer, nullable=False)
+    preco_unitario = db.Column(db.Numeric(10, 2), nullable=False)
+    subtotal = db.Column(db.Numeric(10, 2), nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_itens_venda_venda_id', 'venda_id'),
+        db.Index('ix_itens_venda_produto_id', 'produto_id'),
+    )
+    
+    # Relacionamentos
+    produto = db.relationship('Produto', backref='vendas_item')
+
+class BlocoArquivoVendas(db.Model):
+    """Bloco de vendas movidas para o arquivo de um mês (ver app/arquivo_vendas.py)"""
+    __tablename__ = 'arquivo_vendas'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    periodo = db.Column(db.String(7), nullable=False)        # AAAA-MM (mês local)
+    arquivo = db.Column(db.String(255), nullable=False)      # nome no diretório do arquivo
+    posicao = db.Column(db.BigInteger, nullable=False)       # bytes até o bloco no arquivo
+    tamanho = db.Column(db.Integer, nullable=False)          # bytes do bloco comprimido
+    primeiro_id = db.Column(db.Integer, nullable=False)
+    ultimo_id = db.Column(db.Integer, nullable=False)
+    vendas = db.Column(db.Integer, nullable=False)
+    itens = db.Column(db.Integer, nullable=False)
+    arquivado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_arquivo_vendas_ids', 'ultimo_id', 'primeiro_id'),
+        db.Index('ix_arquivo_vendas_periodo', 'periodo'),
+    )
+
+class ResumoVendaArquivada(db.Model):
+    """Resumo de uma venda arquivada, para o histórico sem ler o arquivo"""
+    __tablename__ = 'resumo_vendas_arquivadas'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)   # id da venda
+    periodo = db.Column(db.String(7), nullable=False)
+    operador_id = db.Column(db.Integer, nullable=False)
+    data_venda = db.Column(db.DateTime, nullable=False)
+    valor_total = db.Column(db.Numeric(10, 2), nullable=False)
+    itens = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_resumo_vendas_arquivadas_operador_data', 'operador_id', 'data_venda'),
+        db.Index('ix_resumo_vendas_arquivadas_data', 'data_venda'),
+    )
+
+# ==================== RESUMOS DE VENDAS (RELATÓRIOS) ====================
+
+class ResumoVendaProduto(db.Model):
+    """Totais diários de vendas por produto, mantidos a cada venda"""
+    __tablename__ = 'resumo_vendas_produto'
+    
+    dia = db.Column(db.Date, primary_key=True)
+    produto_id = db.Column(db.Integer, db.ForeignKey('produtos.id'), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    receita = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    vendas = db.Column(db.Integer, nullable=False, default=0)
+
+class ResumoVendaCategoria(db.Model):
+    """Totais diários de vendas por categoria, mantidos a cada venda"""
+    __tablename__ = 'resumo_vendas_categoria'
+    
+    dia = db.Column(db.Date, primary_key=True)
+    categoria = db.Column(db.String(100), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    receita = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    vendas = db.Column(db.Integer, nullable=False, default=0)
+
+class ResumoVendaOperador(db.Model):
+    """Totais diários de vendas por operador, mantidos a cada venda"""
+    __tablename__ = 'resumo_vendas_operador'
+    
+    dia = db.Column(db.Date, primary_key=True)
+    operador_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    receita = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    vendas = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,91 @@
+"""
+Sistema de Supermercado - Notas fiscais das vendas
+Carrega os dados da venda e mantém os PDFs no cache em disco
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.extensoes import db
+from app.modelos import Usuario, Produto, Venda, ItemVenda
+from app.caches import cache_recibos
+from app.arquivo_vendas import venda_arquivada
+from app.recibos import renderizar_pdf
+
+# Geração da nota em segundo plano logo após a venda
+pre_renderizar_recibos = os.getenv('RECIBOS_PRE_RENDERIZAR', '1') == '1'
+_executor_recibos = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recibos')
+
+def carregar_nota_fiscal(venda_id):
+    """Dados da nota fiscal (venda, operador e itens) em uma única consulta
+
+    Vendas de meses arquivados são lidas do arquivo do mês.
+    """
+    linhas = db.session.execute(
+        db.select(
+            Venda.id, Venda.data_venda, Venda.valor_total, Usuario.nome.label('operador'),
+            Produto.nome, ItemVenda.quantidade, ItemVenda.preco_unitario, ItemVenda.subtotal
+        )
+        .join(Usuario, Usuario.id == Venda.operador_id)
+        .outerjoin(ItemVenda, ItemVenda.venda_id == Venda.id)
+        .outerjoin(Produto, Produto.id == ItemVenda.produto_id)
+        .where(Venda.id == venda_id)
+        .order_by(ItemVenda.id)
+    ).all()
+    if not linhas:
+        venda = venda_arquivada(venda_id)
+        if venda is None:
+            return None
+        return {
+            'id': venda['id'],
+            'data_venda': venda['data_venda'],
+            'operador': venda['operador'] or '',
+            'valor_total': venda['valor_total'],
+            'itens': [{
+                'nome': item['nome'] or '',
+                'quantidade': item['quantidade'],
+                'preco_unitario': item['preco_unitario'],
+                'subtotal': item['subtotal']
+            } for item in venda['itens']]
+        }
+    
+    return {
+        'id': linhas[0].id,
+        'data_venda': linhas[0].data_venda,
+        'operador': linhas[0].operador,
+        'valor_total': linhas[0].valor_total,
+        'itens': [{
+            'nome': linha.nome or '',
+            'quantidade': linha.quantidade,
+            'preco_unitario': linha.preco_unitario,
+            'subtotal': linha.subtotal
+        } for linha in linhas if linha.quantidade is not None]
+    }
+
+def obter_nota_fiscal_pdf(venda_id):
+    """PDF da nota fiscal, do cache em disco ou gerado (e guardado) na hora"""
+    pdf = cache_recibos.obter(venda_id)
+    if pdf is not None:
+        return pdf
+    
+    nota = carregar_nota_fiscal(venda_id)
+    if nota is None:
+        return None
+    pdf = renderizar_pdf(nota)
+    cache_recibos.gravar(venda_id, pdf)
+    return pdf
+
+def _pre_renderizar_nota_fiscal(app, venda_id):
+    with app.app_context():
+        try:
+            obter_nota_fiscal_pdf(venda_id)
+        except Exception as e:
+            # A nota será gerada no momento da impressão
+            app.logger.warning(f"Falha ao pré-gerar nota fiscal {venda_id}: {e}")
+
+def agendar_nota_fiscal(venda_id):
+    """Gera a nota em segundo plano para que a impressão seja só uma leitura do disco"""
+    if pre_renderizar_recibos and cache_recibos.tamanho_maximo > 0:
+        _executor_recibos.submit(_pre_renderizar_nota_fiscal, current_app._get_current_object(), venda_id)
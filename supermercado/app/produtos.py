@@ -0,0 +1,179 @@
+"""
+Sistema de Supermercado - Listagem de produtos
+Projeção de campos, filtros, ordenação e paginação por cursor, e consulta
+de vários produtos por código de barras ou id de uma só vez
+"""
+
+import base64
+import json
+from decimal import Decimal
+
+from flask import jsonify
+
+from app import busca as busca_produtos
+from app.extensoes import db
+from app.modelos import Produto
+from app.caches import cache_produtos
+
+CAMPOS_PRODUTO = ('id', 'nome', 'preco', 'estoque', 'codigo_barras', 'categoria', 'ativo')
+ORDENACOES_PRODUTO = ('id', 'nome', 'preco', 'estoque', 'categoria')
+LIMITE_PADRAO_PRODUTOS = 50
+LIMITE_MAXIMO_PRODUTOS = 500
+
+# Códigos de barras + ids aceitos por consulta em lote
+LIMITE_MAXIMO_LOTE = 500
+
+def _codificar_cursor(valor, produto_id):
+    """Gera o cursor opaco da próxima página a partir da última linha"""
+    if isinstance(valor, Decimal):
+        valor = str(valor)
+    bruto = json.dumps([valor, produto_id]).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+def _decodificar_cursor(cursor, ordenar):
+    """Lê um cursor gerado por _codificar_cursor"""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valor, produto_id = json.loads(bruto)
+        if ordenar == 'preco':
+            valor = Decimal(valor)
+        return valor, int(produto_id)
+    except (ValueError, TypeError, ArithmeticError):
+        raise ValueError('Cursor inválido')
+
+def listar_produtos(args):
+    """Lista produtos ativos com filtros, ordenação, projeção e paginação por cursor
+    
+    Parâmetros: busca, categoria, ordenar, ordem (asc/desc), fields (lista de
+    campos separados por vírgula), limit, after_id (ordenação por id) e cursor.
+    Sem limit/after_id/cursor a resposta continua sendo a lista completa, como
+    antes; com eles a resposta traz a página e o cursor da próxima.
+    """
+    campos = [c.strip() for c in args.get('fields', '').split(',') if c.strip()] or list(CAMPOS_PRODUTO)
+    ordenar = args.get('ordenar', 'id')
+    ordem = args.get('ordem', 'asc').lower()
+    if any(c not in CAMPOS_PRODUTO for c in campos):
+        return jsonify({'success': False, 'message': 'Campo inválido em fields'}), 400
+    if ordenar not in ORDENACOES_PRODUTO or ordem not in ('asc', 'desc'):
+        return jsonify({'success': False, 'message': 'Ordenação inválida'}), 400
+    
+    paginado = any(p in args for p in ('limit', 'after_id', 'cursor'))
+    coluna = getattr(Produto, ordenar)
+    
+    # Selecionar apenas as colunas necessárias, sem montar objetos do ORM
+    colunas = list(dict.fromkeys(campos + ([ordenar, 'id'] if paginado else [])))
+    consulta = db.select(*[getattr(Produto, c) for c in colunas]).where(Produto.ativo == True)
+    
+    busca = args.get('busca', '')
+    if busca:
+        # Filtro pelo índice de busca (sem acentos e tolerante a erros)
+        ids = busca_produtos.buscar_ids(db, busca, limite=busca_produtos.LIMITE_MAXIMO_BUSCA)
+        consulta = consulta.where(Produto.id.in_(ids))
+    if args.get('categoria'):
+        consulta = consulta.where(Produto.categoria == args['categoria'])
+    
+    if ordem == 'desc':
+        consulta = consulta.order_by(coluna.desc(), Produto.id.desc())
+    else:
+        consulta = consulta.order_by(coluna.asc(), Produto.id.asc())
+    
+    if paginado:
+        try:
+            limite = min(max(int(args.get('limit', LIMITE_PADRAO_PRODUTOS)), 1), LIMITE_MAXIMO_PRODUTOS)
+            if args.get('cursor'):
+                ultimo_valor, ultimo_id = _decodificar_cursor(args['cursor'], ordenar)
+            elif args.get('after_id'):
+                if ordenar != 'id':
+                    raise ValueError('after_id só pode ser usado com ordenar=id')
+                ultimo_id = int(args['after_id'])
+                ultimo_valor = ultimo_id
+            else:
+                ultimo_id = None
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        # Keyset: continuar a partir da última linha (valor, id) já entregue
+        if ultimo_id is not None:
+            if ordem == 'desc':
+                consulta = consulta.where(db.or_(
+                    coluna < ultimo_valor,
+                    db.and_(coluna == ultimo_valor, Produto.id < ultimo_id)
+                ))
+            else:
+                consulta = consulta.where(db.or_(
+                    coluna > ultimo_valor,
+                    db.and_(coluna == ultimo_valor, Produto.id > ultimo_id)
+                ))
+        consulta = consulta.limit(limite + 1)
+    
+    linhas = db.session.execute(consulta).all()
+    
+    def serializar(linha):
+        dados = {c: getattr(linha, c) for c in campos}
+        if 'preco' in dados:
+            dados['preco'] = float(dados['preco'])
+        return dados
+    
+    if not paginado:
+        return jsonify([serializar(linha) for linha in linhas])
+    
+    tem_mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    proximo_cursor = None
+    if tem_mais:
+        ultima = linhas[-1]
+        proximo_cursor = _codificar_cursor(getattr(ultima, ordenar), ultima.id)
+    
+    return jsonify({
+        'success': True,
+        'produtos': [serializar(linha) for linha in linhas],
+        'tem_mais': tem_mais,
+        'proximo_cursor': proximo_cursor
+    })
+
+def consultar_produtos_lote(codigos=(), ids=()):
+    """Produtos ativos por código de barras e/ou id em uma única consulta
+    
+    Os códigos que estão no cache de produtos não vão ao banco; os demais e
+    os ids são resolvidos em um só SELECT ... IN. Retorna (produtos na ordem
+    pedida, sem repetições; códigos não encontrados; ids não encontrados).
+    """
+    codigos = list(dict.fromkeys(codigos))
+    ids = list(dict.fromkeys(ids))
+    
+    por_codigo = {}
+    for codigo in codigos:
+        produto_dict = cache_produtos.get(codigo)
+        if produto_dict is not None:
+            por_codigo[codigo] = produto_dict
+    faltando = [codigo for codigo in codigos if codigo not in por_codigo]
+    
+    por_id = {}
+    if faltando or ids:
+        # Capturar a geração antes da consulta (mesma regra da busca unitária)
+        geracao = cache_produtos.geracao
+        filtros = []
+        if faltando:
+            filtros.append(Produto.codigo_barras.in_(faltando))
+        if ids:
+            filtros.append(Produto.id.in_(ids))
+        # Inativos descartados aqui: com `ativo` no WHERE o planejador pode
+        # trocar os índices de código/id pelo de (ativo, categoria)
+        for produto in db.session.scalars(db.select(Produto).where(db.or_(*filtros))):
+            if not produto.ativo:
+                continue
+            produto_dict = produto.to_dict()
+            por_id[produto.id] = produto_dict
+            por_codigo.setdefault(produto.codigo_barras, produto_dict)
+            cache_produtos.set(produto.codigo_barras, produto_dict, geracao=geracao)
+    
+    produtos, vistos = [], set()
+    for produto_dict in [por_codigo[c] for c in codigos if c in por_codigo] + \
+            [por_id[i] for i in ids if i in por_id]:
+        if produto_dict['id'] not in vistos:
+            vistos.add(produto_dict['id'])
+            produtos.append(produto_dict)
+    
+    return (produtos,
+            [codigo for codigo in codigos if codigo not in por_codigo],
+            [produto_id for produto_id in ids if produto_id not in por_id])
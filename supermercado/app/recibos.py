@@ -0,0 +1,303 @@
+"""
+Sistema de Supermercado - Notas fiscais (recibos)
+Renderização em PDF com várias páginas, em texto para bobina (40/48 colunas)
+e em ESC/POS para impressoras térmicas, além do cache em disco dos PDFs
+
+Uma venda confirmada não muda mais, então a nota fiscal pode ser gerada uma
+única vez e servida do disco nas reimpressões.
+"""
+
+import io
+import os
+import tempfile
+import threading
+
+# Incrementar ao alterar o layout: as notas antigas em cache deixam de ser usadas
+VERSAO_LAYOUT = 2
+
+# Posições verticais do layout (pontos a partir da base da página)
+_MARGEM_INFERIOR = 100
+_ALTURA_LINHA = 15
+
+# ==================== RENDERIZAÇÃO EM PDF ====================
+
+def _cabecalho_tabela(p, y):
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(50, y, "Produto")
+    p.drawString(300, y, "Qtd")
+    p.drawString(350, y, "Preço Unit.")
+    p.drawString(450, y, "Subtotal")
+    p.setFont("Helvetica", 9)
+    return y - 20
+
+def _rodape(p, largura, pagina, total_paginas, continua):
+    p.setFont("Helvetica", 8)
+    if continua:
+        p.drawString(50, 65, "Continua na próxima página...")
+    else:
+        p.drawString(50, 50, "Obrigado pela preferência!")
+    if total_paginas > 1:
+        p.drawRightString(largura - 50, 50, f"Página {pagina}/{total_paginas}")
+
+def _linhas_por_pagina(inicio_y):
+    return int((inicio_y - 20 - _MARGEM_INFERIOR) // _ALTURA_LINHA) + 1
+
+def _total_paginas(quantidade_itens, altura):
+    """Quantas páginas a nota ocupa, incluindo a linha do total"""
+    paginas, inicio_y = 1, altura - 190
+    while quantidade_itens > _linhas_por_pagina(inicio_y):
+        quantidade_itens -= _linhas_por_pagina(inicio_y)
+        paginas, inicio_y = paginas + 1, altura - 110
+    if _precisa_pagina_total(inicio_y - 20 - quantidade_itens * _ALTURA_LINHA):
+        paginas += 1
+    return paginas
+
+def _precisa_pagina_total(y):
+    return y - 30 < _MARGEM_INFERIOR - _ALTURA_LINHA
+
+def renderizar_pdf(nota):
+    """Gera o PDF da nota fiscal e retorna os bytes
+
+    `nota` é um dicionário com id, data_venda, operador, valor_total e itens
+    (lista de dicionários com nome, quantidade, preco_unitario e subtotal).
+    """
+    # ReportLab só é carregado na primeira nota em PDF
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    width, height = letter
+    itens = nota['itens']
+
+    total_paginas = _total_paginas(len(itens), height)
+
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    p.setTitle(f"Nota Fiscal {nota['id']:06d}")
+
+    # Cabeçalho
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(50, height - 50, "SUPERMERCADO SISTEMA")
+    p.setFont("Helvetica", 12)
+    p.drawString(50, height - 70, "Nota Fiscal Simplificada")
+
+    # Informações da venda
+    p.drawString(50, height - 100, f"Venda Nº: {nota['id']:06d}")
+    p.drawString(50, height - 120, f"Data: {nota['data_venda'].strftime('%d/%m/%Y %H:%M')}")
+    p.drawString(50, height - 140, f"Operador: {nota['operador']}")
+
+    # Linha separadora
+    p.line(50, height - 160, width - 50, height - 160)
+
+    pagina = 1
+    y = _cabecalho_tabela(p, height - 190)
+    for item in itens:
+        if y < _MARGEM_INFERIOR:
+            _rodape(p, width, pagina, total_paginas, continua=True)
+            p.showPage()
+            pagina += 1
+            p.setFont("Helvetica-Bold", 12)
+            p.drawString(50, height - 50, f"Venda Nº: {nota['id']:06d} (continuação)")
+            p.line(50, height - 80, width - 50, height - 80)
+            y = _cabecalho_tabela(p, height - 110)
+
+        p.drawString(50, y, item['nome'][:35])
+        p.drawString(300, y, str(item['quantidade']))
+        p.drawString(350, y, f"R$ {item['preco_unitario']:.2f}")
+        p.drawString(450, y, f"R$ {item['subtotal']:.2f}")
+        y -= _ALTURA_LINHA
+
+    if _precisa_pagina_total(y):
+        _rodape(p, width, pagina, total_paginas, continua=True)
+        p.showPage()
+        pagina += 1
+        y = height - 50
+
+    # Total
+    p.line(50, y - 10, width - 50, y - 10)
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(350, y - 30, f"TOTAL: R$ {nota['valor_total']:.2f}")
+
+    _rodape(p, width, pagina, total_paginas, continua=False)
+    p.save()
+    return buffer.getvalue()
+
+# ==================== TEXTO E ESC/POS (IMPRESSORA TÉRMICA) ====================
+
+FORMATOS_NOTA = ('pdf', 'texto', 'escpos')
+COLUNAS_BOBINA = (40, 48)
+
+# Comandos ESC/POS (padrão Epson)
+_ESC_INICIAR = b'\x1b@'
+_ESC_PAGINA_PORTUGUES = b'\x1bt\x03'  # tabela de caracteres PC860
+_ESC_CENTRO = b'\x1ba\x01'
+_ESC_ESQUERDA = b'\x1ba\x00'
+_ESC_NEGRITO = b'\x1bE\x01'
+_ESC_NORMAL = b'\x1bE\x00'
+_ESC_DUPLO = b'\x1d!\x11'
+_ESC_SIMPLES = b'\x1d!\x00'
+_ESC_CORTE = b'\x1dVB\x00'  # avança o papel e faz corte parcial
+
+def _dois_lados(esquerda, direita, colunas):
+    espaco = colunas - len(direita) - 1
+    return f"{esquerda[:espaco]:<{espaco}} {direita}"
+
+def _linhas_bobina(nota, colunas):
+    """Linhas da nota para bobina, como pares (estilo, texto)
+
+    Estilos: 'titulo' (centralizado, tamanho duplo), 'centro', 'negrito' e None.
+    """
+    separador = '-' * colunas
+    yield 'titulo', 'SUPERMERCADO SISTEMA'
+    yield 'centro', 'Nota Fiscal Simplificada'
+    yield None, separador
+    yield None, f"Venda Nº: {nota['id']:06d}"
+    yield None, f"Data: {nota['data_venda'].strftime('%d/%m/%Y %H:%M')}"
+    yield None, f"Operador: {nota['operador']}"[:colunas]
+    yield None, separador
+    yield 'negrito', _dois_lados('Produto', 'Subtotal', colunas)
+    for item in nota['itens']:
+        yield None, item['nome'][:colunas]
+        yield None, _dois_lados(
+            f"  {item['quantidade']} x R$ {item['preco_unitario']:.2f}",
+            f"R$ {item['subtotal']:.2f}", colunas
+        )
+    yield None, separador
+    yield 'negrito', _dois_lados('TOTAL', f"R$ {nota['valor_total']:.2f}", colunas)
+    yield None, ''
+    yield 'centro', 'Obrigado pela preferência!'
+
+def renderizar_texto(nota, colunas=48):
+    """Gera a nota em texto puro, linha a linha"""
+    for estilo, texto in _linhas_bobina(nota, colunas):
+        if estilo in ('titulo', 'centro'):
+            texto = texto.center(colunas).rstrip()
+        yield texto + '\n'
+
+def renderizar_escpos(nota, colunas=48):
+    """Gera a nota como comandos ESC/POS, em blocos de bytes"""
+    yield _ESC_INICIAR + _ESC_PAGINA_PORTUGUES
+    for estilo, texto in _linhas_bobina(nota, colunas):
+        dados = texto.encode('cp860', errors='replace') + b'\n'
+        if estilo == 'titulo':
+            yield _ESC_CENTRO + _ESC_DUPLO + dados + _ESC_SIMPLES + _ESC_ESQUERDA
+        elif estilo == 'centro':
+            yield _ESC_CENTRO + dados + _ESC_ESQUERDA
+        elif estilo == 'negrito':
+            yield _ESC_NEGRITO + dados + _ESC_NORMAL
+        else:
+            yield dados
+    yield b'\n\n\n' + _ESC_CORTE
+
+# ==================== CACHE EM DISCO ====================
+
+class CacheRecibos:
+    """Cache de notas fiscais em disco, limitado pelo tamanho total dos arquivos
+
+    Cada nota é gravada em um arquivo identificado pela venda e pela versão do
+    layout. A gravação é atômica (arquivo temporário + rename), então vários
+    processos podem compartilhar o diretório. Quando o limite é ultrapassado,
+    os arquivos menos usados recentemente (mtime, atualizado a cada leitura)
+    são removidos até sobrar 80% do limite.
+    """
+
+    def __init__(self, diretorio, tamanho_maximo=200 * 1024 * 1024):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        # Estimativa do tamanho ocupado; cada processo conhece só as próprias
+        # gravações e recalcula tudo ao varrer o diretório na limpeza
+        self._tamanho = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _caminho(self, venda_id):
+        return os.path.join(self.diretorio, f"{venda_id // 1000:06d}",
+                            f"nota_{venda_id:09d}_v{VERSAO_LAYOUT}.pdf")
+
+    def obter(self, venda_id):
+        """Retorna os bytes da nota em cache ou None"""
+        if self.tamanho_maximo <= 0:
+            return None
+        caminho = self._caminho(venda_id)
+        try:
+            with open(caminho, 'rb') as arquivo:
+                dados = arquivo.read()
+            os.utime(caminho)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return dados
+
+    def gravar(self, venda_id, dados):
+        """Grava a nota no cache e libera espaço se necessário"""
+        if self.tamanho_maximo <= 0 or len(dados) > self.tamanho_maximo:
+            return
+        caminho = self._caminho(venda_id)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'wb') as arquivo:
+                arquivo.write(dados)
+            os.replace(temporario, caminho)
+        except OSError:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            return
+
+        with self._lock:
+            if self._tamanho is None:
+                self._tamanho = self._varrer()[1]
+            else:
+                self._tamanho += len(dados)
+            if self._tamanho > self.tamanho_maximo:
+                self._limpar()
+
+    def _varrer(self):
+        arquivos = []
+        total = 0
+        for raiz, _, nomes in os.walk(self.diretorio):
+            for nome in nomes:
+                if not nome.endswith('.pdf'):
+                    continue
+                caminho = os.path.join(raiz, nome)
+                try:
+                    info = os.stat(caminho)
+                except OSError:
+                    continue
+                arquivos.append((info.st_mtime, info.st_size, caminho))
+                total += info.st_size
+        return arquivos, total
+
+    def _limpar(self):
+        arquivos, total = self._varrer()
+        alvo = self.tamanho_maximo * 0.8
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= alvo:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+            self.evictions += 1
+        self._tamanho = total
+
+    def stats(self):
+        """Retorna os contadores de uso do cache"""
+        with self._lock:
+            if self._tamanho is None:
+                self._tamanho = self._varrer()[1]
+            total = self.hits + self.misses
+            return {
+                'diretorio': self.diretorio,
+                'bytes': self._tamanho,
+                'bytes_maximo': self.tamanho_maximo,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
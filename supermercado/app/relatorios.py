@@ -0,0 +1,189 @@
+"""
+Sistema de Supermercado - Motor de relatórios
+Resumos diários de vendas mantidos a cada venda e consultas sobre eles
+"""
+
+from datetime import date, timedelta, timezone
+
+from app.extensoes import db
+from app.modelos import (Usuario, Produto, Venda, ItemVenda,
+                         ResumoVendaProduto, ResumoVendaCategoria, ResumoVendaOperador)
+from app.estatisticas import inicio_do_dia_utc
+
+def dia_local(data_utc):
+    """Dia local de um instante gravado em UTC"""
+    return data_utc.replace(tzinfo=timezone.utc).astimezone().date()
+
+def _acumular(modelo, chaves, linhas):
+    """Soma as linhas nas tabelas de resumo (INSERT ... ON CONFLICT DO UPDATE)
+    
+    As linhas são gravadas em ordem de chave para que transações concorrentes
+    bloqueiem as linhas de resumo sempre na mesma ordem.
+    """
+    tabela = modelo.__table__
+    linhas = sorted(linhas, key=lambda linha: tuple(linha[c] for c in chaves))
+    dialeto = db.engine.dialect.name
+    
+    if dialeto in ('postgresql', 'sqlite'):
+        if dialeto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        comando = insert(tabela).values(linhas)
+        db.session.execute(comando.on_conflict_do_update(
+            index_elements=chaves,
+            set_={c: tabela.c[c] + comando.excluded[c] for c in ('quantidade', 'receita', 'vendas')}
+        ))
+        return
+    
+    for linha in linhas:
+        resultado = db.session.execute(
+            tabela.update()
+            .where(*[tabela.c[c] == linha[c] for c in chaves])
+            .values({c: tabela.c[c] + linha[c] for c in ('quantidade', 'receita', 'vendas')})
+        )
+        if resultado.rowcount == 0:
+            db.session.execute(tabela.insert().values(linha))
+
+def acumular_resumos_venda(venda, produtos, quantidades):
+    """Soma uma venda (na transação corrente) aos resumos diários"""
+    dia = dia_local(venda.data_venda)
+    
+    por_categoria = {}
+    linhas_produto = []
+    for produto in produtos:
+        quantidade = quantidades[produto.id]
+        receita = produto.preco * quantidade
+        linhas_produto.append({'dia': dia, 'produto_id': produto.id, 'quantidade': quantidade,
+                               'receita': receita, 'vendas': 1})
+        categoria = por_categoria.setdefault(produto.categoria, {
+            'dia': dia, 'categoria': produto.categoria, 'quantidade': 0, 'receita': 0, 'vendas': 1
+        })
+        categoria['quantidade'] += quantidade
+        categoria['receita'] += receita
+    
+    _acumular(ResumoVendaProduto, ['dia', 'produto_id'], linhas_produto)
+    _acumular(ResumoVendaCategoria, ['dia', 'categoria'], list(por_categoria.values()))
+    _acumular(ResumoVendaOperador, ['dia', 'operador_id'], [{
+        'dia': dia, 'operador_id': venda.operador_id, 'quantidade': sum(quantidades.values()),
+        'receita': venda.valor_total, 'vendas': 1
+    }])
+
+def reconstruir_resumos(inicio=None, fim=None):
+    """Recalcula os resumos dos dias locais [inicio, fim] a partir das vendas
+    
+    Cada dia é agregado com um intervalo semiaberto em data_venda, usando o
+    índice de vendas; sem datas, reconstrói todo o histórico. Os meses já
+    arquivados não têm mais vendas no banco e mantêm os resumos que tinham.
+    Retorna o número de dias processados.
+    """
+    from app.arquivo_vendas import primeiro_dia_no_banco
+    
+    no_banco = primeiro_dia_no_banco()
+    if inicio is not None and no_banco is not None and inicio < no_banco:
+        inicio = no_banco
+    if inicio is None:
+        primeira = db.session.query(db.func.min(Venda.data_venda)).scalar()
+        if primeira is None:
+            return 0
+        inicio = dia_local(primeira)
+    fim = fim or date.today()
+    if inicio > fim:
+        return 0
+    
+    for modelo in (ResumoVendaProduto, ResumoVendaCategoria, ResumoVendaOperador):
+        db.session.execute(modelo.__table__.delete().where(
+            modelo.__table__.c.dia >= inicio, modelo.__table__.c.dia <= fim
+        ))
+    
+    dias = 0
+    dia = inicio
+    while dia <= fim:
+        de = inicio_do_dia_utc(dia)
+        no_dia = db.and_(Venda.data_venda >= de, Venda.data_venda < de + timedelta(days=1))
+        literal_dia = db.literal(dia, db.Date)
+        
+        db.session.execute(ResumoVendaProduto.__table__.insert().from_select(
+            ['dia', 'produto_id', 'quantidade', 'receita', 'vendas'],
+            db.select(literal_dia, ItemVenda.produto_id, db.func.sum(ItemVenda.quantidade),
+                      db.func.sum(ItemVenda.subtotal), db.func.count(db.distinct(ItemVenda.venda_id)))
+            .join(Venda, ItemVenda.venda_id == Venda.id)
+            .where(no_dia)
+            .group_by(ItemVenda.produto_id)
+        ))
+        db.session.execute(ResumoVendaCategoria.__table__.insert().from_select(
+            ['dia', 'categoria', 'quantidade', 'receita', 'vendas'],
+            db.select(literal_dia, Produto.categoria, db.func.sum(ItemVenda.quantidade),
+                      db.func.sum(ItemVenda.subtotal), db.func.count(db.distinct(ItemVenda.venda_id)))
+            .join(Venda, ItemVenda.venda_id == Venda.id)
+            .join(Produto, ItemVenda.produto_id == Produto.id)
+            .where(no_dia)
+            .group_by(Produto.categoria)
+        ))
+        itens_por_venda = (
+            db.select(ItemVenda.venda_id, db.func.sum(ItemVenda.quantidade).label('itens'))
+            .join(Venda, ItemVenda.venda_id == Venda.id)
+            .where(no_dia)
+            .group_by(ItemVenda.venda_id)
+            .subquery()
+        )
+        db.session.execute(ResumoVendaOperador.__table__.insert().from_select(
+            ['dia', 'operador_id', 'quantidade', 'receita', 'vendas'],
+            db.select(literal_dia, Venda.operador_id,
+                      db.func.coalesce(db.func.sum(itens_por_venda.c.itens), 0),
+                      db.func.sum(Venda.valor_total), db.func.count(Venda.id))
+            .outerjoin(itens_por_venda, itens_por_venda.c.venda_id == Venda.id)
+            .where(no_dia)
+            .group_by(Venda.operador_id)
+        ))
+        dias += 1
+        dia += timedelta(days=1)
+    
+    db.session.commit()
+    return dias
+
+AGRUPAMENTOS_RELATORIO = ('dia', 'produto', 'categoria', 'operador')
+
+def gerar_relatorio(inicio, fim, agrupar='dia', limite=50):
+    """Consulta os resumos diários entre os dias locais inicio e fim (inclusive)"""
+    def totais(modelo, *colunas):
+        return db.select(*colunas, db.func.sum(modelo.quantidade).label('quantidade'),
+                         db.func.sum(modelo.receita).label('receita'),
+                         db.func.sum(modelo.vendas).label('vendas')) \
+                 .where(modelo.dia >= inicio, modelo.dia <= fim)
+    
+    if agrupar == 'dia':
+        consulta = totais(ResumoVendaOperador, ResumoVendaOperador.dia) \
+            .group_by(ResumoVendaOperador.dia).order_by(ResumoVendaOperador.dia)
+    elif agrupar == 'produto':
+        consulta = totais(ResumoVendaProduto, ResumoVendaProduto.produto_id, Produto.nome) \
+            .join(Produto, Produto.id == ResumoVendaProduto.produto_id) \
+            .group_by(ResumoVendaProduto.produto_id, Produto.nome) \
+            .order_by(db.desc('receita')).limit(limite)
+    elif agrupar == 'categoria':
+        consulta = totais(ResumoVendaCategoria, ResumoVendaCategoria.categoria) \
+            .group_by(ResumoVendaCategoria.categoria).order_by(db.desc('receita'))
+    else:
+        consulta = totais(ResumoVendaOperador, ResumoVendaOperador.operador_id, Usuario.nome) \
+            .join(Usuario, Usuario.id == ResumoVendaOperador.operador_id) \
+            .group_by(ResumoVendaOperador.operador_id, Usuario.nome) \
+            .order_by(db.desc('receita'))
+    
+    linhas = []
+    for linha in db.session.execute(consulta).mappings():
+        linha = dict(linha)
+        if 'dia' in linha:
+            linha['dia'] = linha['dia'].isoformat()
+        linha['receita'] = float(linha['receita'] or 0)
+        linha['ticket_medio'] = round(linha['receita'] / linha['vendas'], 2) if linha['vendas'] else 0.0
+        linhas.append(linha)
+    
+    geral = db.session.execute(totais(ResumoVendaOperador)).one()
+    return {
+        'linhas': linhas,
+        'totais': {
+            'quantidade': int(geral.quantidade or 0),
+            'receita': float(geral.receita or 0),
+            'vendas': int(geral.vendas or 0)
+        }
+    }
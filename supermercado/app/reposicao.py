@@ -0,0 +1,166 @@
+"""
+Sistema de Supermercado - Velocidade de vendas e reposição de estoque
+Cada produto guarda a sua velocidade de vendas (unidades/dia) como média com
+decaimento exponencial: cada venda soma quantidade/τ e o valor acumulado cai
+à metade a cada MEIA_VIDA_DIAS. A venda atualiza a velocidade no mesmo UPDATE
+que baixa o estoque, a partir da linha que já bloqueou; nada varre o
+histórico. Dela saem os dias de cobertura (estoque / velocidade) e a
+sugestão de compra de cada produto.
+"""
+
+import math
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.extensoes import db
+from app.modelos import Produto, ResumoVendaProduto
+from app.estatisticas import inicio_do_dia_utc
+
+# Dias para o peso de uma venda cair à metade
+MEIA_VIDA_DIAS = float(os.getenv('REPOSICAO_MEIA_VIDA_DIAS', '7'))
+
+# Prazo de entrega do fornecedor e estoque de segurança, em dias de venda:
+# abaixo dessa cobertura o produto entra nas sugestões
+PRAZO_DIAS = float(os.getenv('REPOSICAO_PRAZO_DIAS', '7'))
+SEGURANCA_DIAS = float(os.getenv('REPOSICAO_SEGURANCA_DIAS', '3'))
+
+# Dias de venda que a compra sugerida deve cobrir depois de chegar
+COBERTURA_DIAS = float(os.getenv('REPOSICAO_COBERTURA_DIAS', '14'))
+
+# Abaixo disso (unidades/dia) o produto não tem giro para sugerir compra
+VELOCIDADE_MINIMA = 0.05
+
+LIMITE_PADRAO_REPOSICAO = 50
+LIMITE_MAXIMO_REPOSICAO = 1000
+
+# Constante de tempo do decaimento, em dias
+_TAU = MEIA_VIDA_DIAS / math.log(2)
+
+def _dias(inicio, fim):
+    return (fim - inicio).total_seconds() / 86400
+
+def velocidade_atual(velocidade, atualizada_em, momento=None):
+    """Velocidade guardada em `atualizada_em`, decaída até `momento` (unidades/dia)"""
+    if not velocidade or atualizada_em is None:
+        return 0.0
+    momento = momento or datetime.utcnow()
+    return velocidade * math.exp(-max(_dias(atualizada_em, momento), 0) / _TAU)
+
+def somar_venda(velocidade, atualizada_em, quantidade, data):
+    """(velocidade, referência) depois de vender `quantidade` unidades em `data`
+
+    Uma venda feita sem conexão, com data anterior à referência, entra já
+    decaída em vez de mover a referência para trás.
+    """
+    referencia = max(data, atualizada_em) if atualizada_em else data
+    return (velocidade_atual(velocidade, atualizada_em, referencia)
+            + quantidade / _TAU * math.exp(-_dias(data, referencia) / _TAU), referencia)
+
+def _sugestao(linha, momento):
+    """Cobertura e compra sugerida de um produto, ou None se não precisar"""
+    velocidade = velocidade_atual(linha.velocidade_vendas, linha.velocidade_atualizada_em, momento)
+    estoque = max(linha.estoque, 0)
+    if velocidade < VELOCIDADE_MINIMA or estoque >= velocidade * (PRAZO_DIAS + SEGURANCA_DIAS):
+        return None
+    return {
+        'id': linha.id,
+        'codigo_barras': linha.codigo_barras,
+        'nome': linha.nome,
+        'categoria': linha.categoria,
+        'estoque': linha.estoque,
+        'velocidade': round(velocidade, 2),
+        'dias_cobertura': round(estoque / velocidade, 1),
+        # O que vende até a entrega mais a cobertura desejada, menos o que há
+        'sugerido': max(math.ceil(velocidade * (PRAZO_DIAS + COBERTURA_DIAS) - estoque), 1)
+    }
+
+def sugestoes_reposicao(limite=LIMITE_PADRAO_REPOSICAO, categoria=None, momento=None):
+    """Produtos ativos com cobertura abaixo do prazo mais a segurança, os mais urgentes primeiro
+
+    A velocidade guardada só diminui com o tempo, então o filtro
+    estoque < velocidade guardada × horizonte, feito no banco, nunca deixa de
+    fora um produto que precise de reposição; a conta exata é feita só nesses.
+    """
+    momento = momento or datetime.utcnow()
+    horizonte = PRAZO_DIAS + SEGURANCA_DIAS
+    consulta = db.select(
+        Produto.id, Produto.codigo_barras, Produto.nome, Produto.categoria, Produto.estoque,
+        Produto.velocidade_vendas, Produto.velocidade_atualizada_em
+    ).where(
+        Produto.ativo == True,
+        Produto.velocidade_vendas >= VELOCIDADE_MINIMA,
+        Produto.estoque < Produto.velocidade_vendas * horizonte
+    )
+    if categoria:
+        consulta = consulta.where(Produto.categoria == categoria)
+
+    sugestoes = [sugestao for sugestao in (_sugestao(linha, momento) for linha in db.session.execute(consulta))
+                 if sugestao is not None]
+    sugestoes.sort(key=lambda sugestao: (sugestao['dias_cobertura'], -sugestao['velocidade']))
+    return {
+        'parametros': {
+            'meia_vida_dias': MEIA_VIDA_DIAS,
+            'prazo_dias': PRAZO_DIAS,
+            'seguranca_dias': SEGURANCA_DIAS,
+            'cobertura_dias': COBERTURA_DIAS
+        },
+        'total': len(sugestoes),
+        'sugestoes': sugestoes[:limite]
+    }
+
+def valor_estoque():
+    """Valor do estoque a preço de venda, por categoria, somado no banco"""
+    linhas = db.session.execute(
+        db.select(Produto.categoria, db.func.count(Produto.id), db.func.sum(Produto.estoque),
+                  db.func.sum(Produto.preco * Produto.estoque))
+        .where(Produto.estoque > 0)
+        .group_by(Produto.categoria)
+        .order_by(Produto.categoria)
+    ).all()
+    categorias = [{
+        'categoria': categoria,
+        'produtos': produtos,
+        'unidades': int(unidades),
+        # SQLite devolve float na multiplicação: arredondar para centavos
+        'valor': Decimal(str(valor)).quantize(Decimal('0.01'))
+    } for categoria, produtos, unidades, valor in linhas]
+    return {
+        'valor_total': sum((categoria['valor'] for categoria in categorias), Decimal('0.00')),
+        'unidades': sum(categoria['unidades'] for categoria in categorias),
+        'categorias': categorias
+    }
+
+def recalcular_velocidades(momento=None):
+    """Recalcula a velocidade de todos os produtos a partir dos resumos diários
+
+    Usa os últimos 10 períodos de meia-vida (o resto pesa menos de 0,1%),
+    inclusive de meses arquivados, com cada dia pesado pelo seu meio-dia.
+    Retorna o número de produtos com velocidade.
+    """
+    momento = momento or datetime.utcnow()
+    inicio = (momento - timedelta(days=10 * MEIA_VIDA_DIAS)).date()
+    velocidades = {}
+    for dia, produto_id, quantidade in db.session.execute(
+        db.select(ResumoVendaProduto.dia, ResumoVendaProduto.produto_id, ResumoVendaProduto.quantidade)
+        .where(ResumoVendaProduto.dia >= inicio)
+    ):
+        meio_dia = min(inicio_do_dia_utc(dia) + timedelta(hours=12), momento)
+        velocidade, _ = somar_venda(velocidades.get(produto_id, 0.0), momento, quantidade, meio_dia)
+        velocidades[produto_id] = velocidade
+
+    tabela = Produto.__table__
+    # Sem mexer em atualizado_em: a velocidade não é alteração do cadastro
+    db.session.execute(tabela.update().values(velocidade_vendas=0, velocidade_atualizada_em=None,
+                                              atualizado_em=tabela.c.atualizado_em))
+    if velocidades:
+        db.session.execute(
+            tabela.update()
+            .where(tabela.c.id == db.bindparam('produto_id'))
+            .values(velocidade_vendas=db.bindparam('velocidade'), velocidade_atualizada_em=momento,
+                    atualizado_em=tabela.c.atualizado_em),
+            [{'produto_id': produto_id, 'velocidade': velocidade}
+             for produto_id, velocidade in velocidades.items()]
+        )
+    db.session.commit()
+    return len(velocidades)
@@ -0,0 +1,3 @@
+"""
+Sistema de Supermercado - Blueprints das rotas
+"""
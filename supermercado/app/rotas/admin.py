@@ -0,0 +1,40 @@
+"""
+Sistema de Supermercado - Rotas do painel administrativo
+"""
+
+from flask import Blueprint, render_template, redirect, url_for
+from flask_login import login_required, current_user
+
+from app.modelos import Usuario
+from app.estatisticas import obter_estatisticas
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/admin')
+@login_required
+def dashboard():
+    """Dashboard administrativo"""
+    if not current_user.is_admin():
+        return redirect(url_for('pdv.index'))
+    
+    return render_template('admin_dashboard.html', **obter_estatisticas())
+
+@admin_bp.route('/admin/produtos')
+@login_required
+def produtos():
+    """Gerenciamento de produtos"""
+    if not current_user.is_admin():
+        return redirect(url_for('pdv.index'))
+    
+    # A tabela é carregada de forma incremental pela API paginada
+    return render_template('admin_produtos.html')
+
+@admin_bp.route('/admin/usuarios')
+@login_required
+def usuarios():
+    """Gerenciamento de usuários"""
+    if not current_user.is_admin():
+        return redirect(url_for('pdv.index'))
+    
+    usuarios = Usuario.query.filter_by(ativo=True).all()
+    return render_template('admin_usuarios.html', usuarios=usuarios)
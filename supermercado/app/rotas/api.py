@@ -0,0 +1,664 @@
+"""
+Sistema de Supermercado - APIs REST
+"""
+
+import io
+from datetime import datetime, date, timedelta
+
+import hmac
+import uuid
+
+from flask import (Blueprint, request, jsonify, send_file, abort, Response, stream_with_context,
+                   current_app)
+from flask_login import login_required, current_user
+
+from app import busca as busca_produtos
+from app.extensoes import db
+from app.modelos import Usuario, Produto
+from app.caches import (cache_produtos, cache_estatisticas, cache_usuarios, cache_recibos,
+                        cache_vendas_recentes)
+from app.metricas import metricas
+from app.eventos import canal_produtos
+from app.estatisticas import obter_estatisticas, inicio_do_dia_utc
+from app.relatorios import AGRUPAMENTOS_RELATORIO, gerar_relatorio
+from app.produtos import listar_produtos, consultar_produtos_lote, LIMITE_MAXIMO_LOTE
+from app.catalogo import (CatalogoInvalido, FORMATOS_CATALOGO, ler_catalogo, importar_catalogo,
+                          exportar_catalogo, formato_do_arquivo)
+from app.sincronizacao import (LIMITE_PADRAO_SNAPSHOT, LIMITE_MAXIMO_SNAPSHOT, nova_versao_catalogo,
+                               snapshot_catalogo, alteracoes_catalogo, sincronizar_cache_produtos)
+from app.exportacao_vendas import ExportacaoIndisponivel, exportar_vendas_fluxo, ultima_venda_exportavel
+from app.vendas import (VendaInvalida, VendaDuplicada, registrar_venda, data_venda_offline,
+                        venda_feita_offline)
+from app.reposicao import (LIMITE_PADRAO_REPOSICAO, LIMITE_MAXIMO_REPOSICAO, sugestoes_reposicao,
+                           valor_estoque)
+from app.historico_vendas import (LIMITE_PADRAO_HISTORICO, LIMITE_MAXIMO_HISTORICO, historico_vendas,
+                                  data_historico)
+from app.notas import carregar_nota_fiscal, obter_nota_fiscal_pdf, agendar_nota_fiscal
+from app.recibos import renderizar_texto, renderizar_escpos, FORMATOS_NOTA, COLUNAS_BOBINA
+
+api_bp = Blueprint('api', __name__)
+
+@api_bp.route('/api/dashboard/estatisticas')
+@login_required
+def api_estatisticas():
+    """API com os contadores do dashboard"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    return jsonify({'success': True, 'estatisticas': obter_estatisticas()})
+
+@api_bp.route('/api/relatorios')
+@login_required
+def api_relatorios():
+    """API de relatórios de vendas por dia, produto, categoria ou operador"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    agrupar = request.args.get('agrupar', 'dia')
+    if agrupar not in AGRUPAMENTOS_RELATORIO:
+        return jsonify({'success': False, 'message': 'Agrupamento inválido'}), 400
+    try:
+        fim = datetime.strptime(request.args['fim'], '%Y-%m-%d').date() \
+            if request.args.get('fim') else date.today()
+        inicio = datetime.strptime(request.args['inicio'], '%Y-%m-%d').date() \
+            if request.args.get('inicio') else fim - timedelta(days=29)
+        limite = min(max(int(request.args.get('limite', 50)), 1), 1000)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos'}), 400
+    
+    relatorio = gerar_relatorio(inicio, fim, agrupar, limite)
+    return jsonify({
+        'success': True,
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'agrupar': agrupar,
+        **relatorio
+    })
+
+@api_bp.route('/api/produtos', methods=['GET', 'POST'])
+@login_required
+def api_produtos():
+    """API para gerenciar produtos"""
+    if request.method == 'GET':
+        return listar_produtos(request.args)
+    
+    elif request.method == 'POST':
+        # Criar novo produto
+        if not current_user.is_admin():
+            return jsonify({'success': False, 'message': 'Acesso negado'})
+        
+        data = request.get_json()
+        
+        # Gerar código de barras se não fornecido
+        if not data.get('codigo_barras'):
+            import random
+            data['codigo_barras'] = f"7891234{random.randint(100000, 999999)}"
+        
+        produto = Produto(
+            nome=data['nome'],
+            preco=data['preco'],
+            estoque=data['estoque'],
+            codigo_barras=data['codigo_barras'],
+            categoria=data['categoria']
+        )
+        
+        try:
+            db.session.add(produto)
+            produto.versao = nova_versao_catalogo()
+            db.session.commit()
+            cache_produtos.invalidate(produto.codigo_barras)
+            cache_estatisticas.clear()
+            canal_produtos.notificar()
+            return jsonify({'success': True, 'produto': produto.to_dict()})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Erro ao salvar produto'})
+
+@api_bp.route('/api/reposicao')
+@login_required
+def api_reposicao():
+    """API de sugestões de compra: produtos com poucos dias de cobertura
+
+    Parâmetros: categoria e limite. A velocidade de cada produto (unidades/dia)
+    é atualizada a cada venda.
+    """
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    try:
+        limite = min(max(int(request.args.get('limite', LIMITE_PADRAO_REPOSICAO)), 1),
+                     LIMITE_MAXIMO_REPOSICAO)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos'}), 400
+    
+    return jsonify({'success': True, **sugestoes_reposicao(limite, request.args.get('categoria'))})
+
+@api_bp.route('/api/estoque/valor')
+@login_required
+def api_valor_estoque():
+    """API com o valor do estoque a preço de venda, total e por categoria"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    valor = valor_estoque()
+    return jsonify({
+        'success': True,
+        'valor_total': float(valor['valor_total']),
+        'unidades': valor['unidades'],
+        'categorias': [dict(categoria, valor=float(categoria['valor'])) for categoria in valor['categorias']]
+    })
+
+@api_bp.route('/api/produtos/<int:produto_id>', methods=['PUT', 'DELETE'])
+@login_required
+def api_produto_item(produto_id):
+    """API para atualizar ou deletar produto específico"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    produto = Produto.query.get_or_404(produto_id)
+    
+    if request.method == 'PUT':
+        data = request.get_json()
+        produto.nome = data.get('nome', produto.nome)
+        produto.preco = data.get('preco', produto.preco)
+        produto.estoque = data.get('estoque', produto.estoque)
+        produto.categoria = data.get('categoria', produto.categoria)
+        
+        try:
+            produto.versao = nova_versao_catalogo()
+            db.session.commit()
+            if produto.ativo:
+                cache_produtos.set(produto.codigo_barras, produto.to_dict())
+            else:
+                cache_produtos.invalidate(produto.codigo_barras)
+            canal_produtos.notificar()
+            return jsonify({'success': True, 'produto': produto.to_dict()})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Erro ao atualizar produto'})
+    
+    elif request.method == 'DELETE':
+        produto.ativo = False
+        try:
+            produto.versao = nova_versao_catalogo()
+            db.session.commit()
+            cache_produtos.invalidate(produto.codigo_barras)
+            cache_estatisticas.clear()
+            canal_produtos.notificar()
+            return jsonify({'success': True})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Erro ao deletar produto'})
+
+@api_bp.route('/api/produtos/importar', methods=['POST'])
+@login_required
+def api_importar_produtos():
+    """API para importar um catálogo CSV ou JSON (upsert por código de barras)
+
+    Aceita o arquivo no campo `arquivo` (multipart) ou no corpo da requisição;
+    o formato vem de ?formato= ou da extensão/Content-Type. O arquivo é lido
+    em blocos e gravado em lotes; a resposta traz os erros por linha.
+    """
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    arquivo = request.files.get('arquivo')
+    if arquivo is not None:
+        fluxo, nome, tipo = arquivo.stream, arquivo.filename, arquivo.mimetype
+    else:
+        fluxo, nome, tipo = request.stream, None, request.mimetype
+    
+    formato = request.args.get('formato') or formato_do_arquivo(nome)
+    if not formato:
+        formato = 'json' if 'json' in (tipo or '') else 'csv' if 'csv' in (tipo or '') else None
+    if formato not in FORMATOS_CATALOGO:
+        return jsonify({'success': False, 'message': 'Formato inválido (use csv ou json)'}), 400
+    
+    texto = io.TextIOWrapper(fluxo, encoding='utf-8-sig', newline='')
+    try:
+        relatorio = importar_catalogo(ler_catalogo(texto, formato), limite_erros=100)
+    except (CatalogoInvalido, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'message': f'Arquivo inválido: {e}'}), 400
+    finally:
+        texto.detach()
+        canal_produtos.notificar()
+    
+    if relatorio.get('interrompido'):
+        return jsonify({'success': False, 'message': f"Importação interrompida: {relatorio['interrompido']}",
+                        **relatorio}), 400
+    return jsonify({'success': True, **relatorio})
+
+@api_bp.route('/api/produtos/exportar')
+@login_required
+def api_exportar_produtos():
+    """API para exportar o catálogo em CSV ou JSON, gerado em blocos
+
+    Parâmetros: formato (csv ou json) e ativos=1 para omitir os inativos.
+    """
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    formato = request.args.get('formato', 'csv').lower()
+    if formato not in FORMATOS_CATALOGO:
+        return jsonify({'success': False, 'message': 'Formato inválido (use csv ou json)'}), 400
+    
+    blocos = exportar_catalogo(formato, apenas_ativos=request.args.get('ativos') == '1')
+    return Response(
+        stream_with_context(blocos),
+        mimetype='text/csv; charset=utf-8' if formato == 'csv' else 'application/json',
+        headers={'Content-Disposition': f'attachment; filename=catalogo.{formato}'}
+    )
+
+@api_bp.route('/api/produtos/snapshot')
+@login_required
+def api_snapshot_produtos():
+    """API de sincronização do catálogo local dos PDVs
+
+    Sem parâmetros devolve a primeira página do catálogo completo; com a
+    `posicao` de uma resposta anterior (desde e apos_id) devolve apenas os
+    produtos alterados depois dela, inclusive os inativados (removidos).
+    """
+    try:
+        desde = int(request.args.get('desde', 0))
+        apos_id = int(request.args.get('apos_id', 0))
+        limite = min(max(int(request.args.get('limite', LIMITE_PADRAO_SNAPSHOT)), 1), LIMITE_MAXIMO_SNAPSHOT)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos'}), 400
+    
+    return jsonify({'success': True, **snapshot_catalogo(desde, apos_id, limite)})
+
+@api_bp.route('/api/produtos/changes')
+@login_required
+def api_alteracoes_produtos():
+    """API com os produtos alterados ou desativados depois de uma versão do catálogo
+
+    Parâmetros: since (versão já sincronizada), after_id e limit. Quando
+    tem_mais vier true, repita com os valores de `proximo`; ao final, guarde
+    `proximo` para a próxima sincronização.
+    """
+    if 'since' not in request.args:
+        return jsonify({'success': False, 'message': 'Informe since (versão do catálogo)'}), 400
+    try:
+        desde = int(request.args['since'])
+        apos_id = int(request.args.get('after_id', 0))
+        limite = min(max(int(request.args.get('limit', LIMITE_PADRAO_SNAPSHOT)), 1), LIMITE_MAXIMO_SNAPSHOT)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos'}), 400
+    
+    return jsonify({'success': True, **alteracoes_catalogo(desde, apos_id, limite)})
+
+@api_bp.route('/api/eventos/produtos')
+@login_required
+def api_eventos_produtos():
+    """Eventos (Server-Sent Events) de estoque e preço dos produtos alterados
+
+    Evento `produtos`: lista de {id, codigo_barras, preco, estoque, ativo};
+    evento `recarregar`: alterações demais (importação), a tela deve recarregar.
+    Ao reconectar, o navegador envia Last-Event-ID e recebe o que perdeu; uma
+    tela que estava consultando /api/produtos/changes informa a posição em
+    `ultimo_id` (versão:id). Com o limite de telas atingido, responde 503.
+    """
+    assinatura = canal_produtos.assinar(
+        current_app._get_current_object(),
+        ultimo_id=request.headers.get('Last-Event-ID') or request.args.get('ultimo_id'),
+        limite=current_app.config['EVENTOS_MAX_ASSINANTES']
+    )
+    # A conexão com o banco volta ao pool: a tela pode ficar aberta por horas
+    db.session.close()
+    if assinatura is None:
+        return jsonify({'success': False, 'message': 'Limite de telas conectadas atingido'}), 503
+    return Response(assinatura, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_bp.route('/api/produto/<codigo_barras>')
+@login_required
+def api_produto_por_codigo(codigo_barras):
+    """API para buscar produto por código de barras"""
+    # Descartar do cache o que outros workers alteraram
+    sincronizar_cache_produtos()
+    produto_dict = cache_produtos.get(codigo_barras)
+    if produto_dict is not None:
+        return jsonify({'success': True, 'produto': produto_dict})
+    
+    # Capturar a geração antes da consulta para não cachear dados que
+    # tenham sido alterados por uma escrita concorrente
+    geracao = cache_produtos.geracao
+    produto = Produto.query.filter_by(codigo_barras=codigo_barras, ativo=True).first()
+    if produto:
+        produto_dict = produto.to_dict()
+        cache_produtos.set(codigo_barras, produto_dict, geracao=geracao)
+        return jsonify({'success': True, 'produto': produto_dict})
+    else:
+        return jsonify({'success': False, 'message': 'Produto não encontrado'})
+
+@api_bp.route('/api/produtos/lookup', methods=['POST'])
+@login_required
+def api_produtos_lote():
+    """API para buscar vários produtos de uma vez (leituras em rajada no PDV)
+    
+    Corpo: {"codigos_barras": [...], "ids": [...]} (uma ou as duas listas)
+    """
+    data = request.get_json(silent=True) or {}
+    codigos = data.get('codigos_barras') or []
+    ids = data.get('ids') or []
+    if not isinstance(codigos, list) or not isinstance(ids, list) \
+            or not all(isinstance(c, str) for c in codigos) \
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({'success': False,
+                        'message': 'Informe codigos_barras (textos) e/ou ids (números)'}), 400
+    if not codigos and not ids:
+        return jsonify({'success': False, 'message': 'Nenhum produto informado'}), 400
+    if len(codigos) + len(ids) > LIMITE_MAXIMO_LOTE:
+        return jsonify({'success': False,
+                        'message': f'Máximo de {LIMITE_MAXIMO_LOTE} produtos por consulta'}), 400
+    
+    # Descartar do cache o que outros workers alteraram
+    sincronizar_cache_produtos()
+    produtos, codigos_faltando, ids_faltando = consultar_produtos_lote(codigos, ids)
+    return jsonify({
+        'success': True,
+        'produtos': produtos,
+        'nao_encontrados': {'codigos_barras': codigos_faltando, 'ids': ids_faltando}
+    })
+
+@api_bp.route('/api/produtos/busca')
+@login_required
+def api_buscar_produtos():
+    """API de busca de produtos por relevância (nome ou código de barras)"""
+    termo = request.args.get('q', '').strip()
+    try:
+        limite = int(request.args.get('limite', busca_produtos.LIMITE_PADRAO_BUSCA))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Limite inválido'}), 400
+    
+    ids = busca_produtos.buscar_ids(db, termo, limite=limite)
+    if not ids:
+        return jsonify([])
+    
+    produtos = {p.id: p for p in Produto.query.filter(Produto.id.in_(ids)).all()}
+    return jsonify([produtos[i].to_dict() for i in ids if i in produtos])
+
+@api_bp.route('/api/produtos/cache')
+@login_required
+def api_cache_produtos():
+    """API com as estatísticas do cache de produtos"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    return jsonify({'success': True, 'cache': cache_produtos.stats()})
+
+def _acesso_metricas():
+    """Admin logado ou coletor com o token METRICAS_TOKEN (Authorization: Bearer)"""
+    token = current_app.config.get('METRICAS_TOKEN')
+    enviado = request.headers.get('Authorization', '')
+    if token and enviado.startswith('Bearer ') and hmac.compare_digest(enviado[7:], token):
+        return True
+    return current_user.is_authenticated and current_user.is_admin()
+
+@api_bp.route('/api/metricas')
+def api_metricas():
+    """Métricas de requisições, consultas SQL e caches no formato do Prometheus"""
+    if not current_app.config.get('METRICAS'):
+        return jsonify({'success': False, 'message': 'Métricas desativadas (METRICAS=0)'}), 404
+    if not _acesso_metricas():
+        return jsonify({'success': False, 'message': 'Acesso negado'}), 403
+    
+    texto = metricas.prometheus(caches={
+        'produtos': cache_produtos,
+        'estatisticas': cache_estatisticas,
+        'usuarios': cache_usuarios,
+        'recibos': cache_recibos,
+        'vendas_recentes': cache_vendas_recentes
+    })
+    return Response(texto, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@api_bp.route('/api/metricas/consultas-lentas')
+def api_consultas_lentas():
+    """Consultas SQL lentas mais recentes, com o endpoint que as executou"""
+    if not current_app.config.get('METRICAS'):
+        return jsonify({'success': False, 'message': 'Métricas desativadas (METRICAS=0)'}), 404
+    if not _acesso_metricas():
+        return jsonify({'success': False, 'message': 'Acesso negado'}), 403
+    
+    return jsonify({'success': True, 'consultas': metricas.consultas_lentas()})
+
+@api_bp.route('/api/venda', methods=['POST'])
+@login_required
+def api_finalizar_venda():
+    """API para finalizar uma venda
+
+    O PDV envia `uuid` gerado no caixa: reenvios da fila offline devolvem a
+    venda já registrada (duplicada=true) em vez de gravá-la de novo. `offline`
+    true só vale com `uuid` e `registrada_em` (ISO 8601) anterior à requisição;
+    sem eles a venda é validada como qualquer outra.
+    """
+    recebida_em = datetime.utcnow()
+    data = request.get_json()
+    itens = data.get('itens', [])
+    
+    if not itens:
+        return jsonify({'success': False, 'message': 'Carrinho vazio'})
+    
+    uuid_venda = data.get('uuid')
+    if uuid_venda is not None:
+        try:
+            uuid_venda = str(uuid.UUID(str(uuid_venda)))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'uuid inválido'}), 400
+    offline = bool(data.get('offline')) and venda_feita_offline(uuid_venda, data.get('registrada_em'),
+                                                                  recebida_em)
+    data_venda = data_venda_offline(data['registrada_em']) if offline else None
+    
+    try:
+        venda = registrar_venda(current_user.id, itens, uuid=uuid_venda, offline=offline,
+                                data_venda=data_venda)
+        canal_produtos.notificar()
+        agendar_nota_fiscal(venda.id)
+        return jsonify({
+            'success': True,
+            'venda_id': venda.id,
+            'total': float(venda.valor_total)
+        })
+    
+    except VendaDuplicada as e:
+        return jsonify({
+            'success': True,
+            'venda_id': e.venda.id,
+            'total': float(e.venda.valor_total),
+            'duplicada': True
+        })
+    except VendaInvalida as e:
+        return jsonify({'success': False, 'message': str(e)})
+    except Exception as e:
+        db.session.rollback()
+        # 500: o PDV mantém a venda na fila e tenta de novo
+        return jsonify({'success': False, 'message': 'Erro ao processar venda'}), 500
+
+@api_bp.route('/api/vendas')
+@login_required
+def api_historico_vendas():
+    """API do histórico de vendas, da mais recente para a mais antiga
+
+    Parâmetros: operador_id (só admin; o operador vê apenas as próprias
+    vendas), inicio e fim (AAAA-MM-DD, dias locais), limite, e antes/antes_id
+    com a posição `proximo` da página anterior.
+    """
+    try:
+        operador_id = int(request.args['operador_id']) if request.args.get('operador_id') else None
+        inicio = datetime.strptime(request.args['inicio'], '%Y-%m-%d').date() \
+            if request.args.get('inicio') else None
+        fim = datetime.strptime(request.args['fim'], '%Y-%m-%d').date() \
+            if request.args.get('fim') else None
+        limite = min(max(int(request.args.get('limite', LIMITE_PADRAO_HISTORICO)), 1),
+                     LIMITE_MAXIMO_HISTORICO)
+        antes = None
+        if request.args.get('antes'):
+            antes = (data_historico(request.args['antes']), int(request.args['antes_id']))
+            if antes[0] is None:
+                raise ValueError
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos'}), 400
+    
+    if not current_user.is_admin():
+        if operador_id not in (None, current_user.id):
+            return jsonify({'success': False, 'message': 'Acesso negado'})
+        operador_id = current_user.id
+    
+    pagina = historico_vendas(
+        operador_id,
+        inicio=inicio_do_dia_utc(inicio) if inicio else None,
+        fim=inicio_do_dia_utc(fim + timedelta(days=1)) if fim else None,
+        antes=antes,
+        limite=limite
+    )
+    return jsonify({'success': True, **pagina})
+
+@api_bp.route('/api/vendas/exportar')
+@login_required
+def api_exportar_vendas():
+    """API para exportar os itens vendidos em Parquet ou Arrow, gerado em lotes
+
+    Parâmetros: formato (parquet ou arrow) e desde (id da última venda já
+    exportada). O cabeçalho X-Exportacao-Ate traz o `desde` da próxima
+    exportação incremental.
+    """
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    formato = request.args.get('formato', 'parquet').lower()
+    try:
+        desde = int(request.args.get('desde', 0))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'desde deve ser o id de uma venda'}), 400
+    ate = ultima_venda_exportavel()
+    try:
+        blocos = exportar_vendas_fluxo(formato, desde=desde, ate=ate)
+    except ExportacaoIndisponivel as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    extensao = 'parquet' if formato == 'parquet' else 'arrows'
+    return Response(
+        stream_with_context(blocos),
+        mimetype='application/vnd.apache.parquet' if formato == 'parquet'
+        else 'application/vnd.apache.arrow.stream',
+        headers={
+            'Content-Disposition': f'attachment; filename=vendas-{desde + 1}-{ate}.{extensao}',
+            'X-Exportacao-Ate': str(ate)
+        }
+    )
+
+@api_bp.route('/api/nota-fiscal/<int:venda_id>')
+@login_required
+def api_gerar_nota_fiscal(venda_id):
+    """API para gerar nota fiscal em PDF, texto (bobina) ou ESC/POS
+
+    Parâmetros: formato (pdf, texto ou escpos) e colunas (40 ou 48) para os
+    formatos de bobina.
+    """
+    formato = request.args.get('formato', 'pdf').lower()
+    if formato not in FORMATOS_NOTA:
+        return jsonify({'success': False, 'message': 'Formato inválido'}), 400
+    
+    if formato == 'pdf':
+        pdf = obter_nota_fiscal_pdf(venda_id)
+        if pdf is None:
+            abort(404)
+        
+        return send_file(
+            io.BytesIO(pdf),
+            as_attachment=True,
+            download_name=f'nota_fiscal_{venda_id:06d}.pdf',
+            mimetype='application/pdf'
+        )
+    
+    try:
+        colunas = int(request.args.get('colunas', 48))
+    except ValueError:
+        colunas = None
+    if colunas not in COLUNAS_BOBINA:
+        return jsonify({'success': False, 'message': 'Colunas inválidas (use 40 ou 48)'}), 400
+    
+    nota = carregar_nota_fiscal(venda_id)
+    if nota is None:
+        abort(404)
+    
+    # A nota já está em memória: o gerador não depende da sessão do banco
+    if formato == 'texto':
+        return Response(renderizar_texto(nota, colunas), mimetype='text/plain; charset=utf-8')
+    return Response(
+        renderizar_escpos(nota, colunas),
+        mimetype='application/octet-stream',
+        headers={'Content-Disposition': f'attachment; filename=nota_fiscal_{venda_id:06d}.bin'}
+    )
+
+@api_bp.route('/api/usuarios', methods=['GET', 'POST'])
+@login_required
+def api_usuarios():
+    """API para gerenciar usuários"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    if request.method == 'GET':
+        usuarios = Usuario.query.filter_by(ativo=True).all()
+        return jsonify([{
+            'id': u.id,
+            'nome': u.nome,
+            'login': u.login,
+            'tipo': u.tipo,
+            'data_criacao': u.data_criacao.strftime('%d/%m/%Y')
+        } for u in usuarios])
+    
+    elif request.method == 'POST':
+        data = request.get_json()
+        
+        # Verificar se login já existe
+        if Usuario.query.filter_by(login=data['login']).first():
+            return jsonify({'success': False, 'message': 'Login já existe'})
+        
+        usuario = Usuario(
+            nome=data['nome'],
+            login=data['login'],
+            tipo=data['tipo']
+        )
+        usuario.set_password(data['senha'])
+        
+        try:
+            db.session.add(usuario)
+            db.session.commit()
+            cache_usuarios.invalidate(str(usuario.id))
+            cache_estatisticas.clear()
+            return jsonify({'success': True})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Erro ao criar usuário'})
+
+@api_bp.route('/api/usuarios/<int:usuario_id>', methods=['PUT', 'DELETE'])
+@login_required
+def api_usuario_item(usuario_id):
+    """API para atualizar ou desativar usuário específico"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Acesso negado'})
+    
+    usuario = Usuario.query.get_or_404(usuario_id)
+    
+    if request.method == 'PUT':
+        data = request.get_json()
+        usuario.nome = data.get('nome', usuario.nome)
+        usuario.tipo = data.get('tipo', usuario.tipo)
+        usuario.ativo = data.get('ativo', usuario.ativo)
+        if data.get('senha'):
+            usuario.set_password(data['senha'])
+    
+    elif request.method == 'DELETE':
+        if usuario.id == current_user.id:
+            return jsonify({'success': False, 'message': 'Não é possível desativar o próprio usuário'})
+        usuario.ativo = False
+    
+    try:
+        db.session.commit()
+        cache_usuarios.invalidate(str(usuario.id))
+        cache_estatisticas.clear()
+        return jsonify({'success': True})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Erro ao atualizar usuário'})
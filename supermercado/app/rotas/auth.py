@@ -0,0 +1,100 @@
+"""
+Sistema de Supermercado - Autenticação
+Carregamento do usuário da sessão (Flask-Login) e rotas de login/logout
+"""
+
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for
+from flask_login import UserMixin, login_user, logout_user, login_required, current_user
+
+from app.extensoes import db, login_manager
+from app.modelos import Usuario
+from app.senhas import SenhasOcupadas
+from app.caches import cache_usuarios
+
+auth_bp = Blueprint('auth', __name__)
+
+# ==================== USUÁRIO DA SESSÃO ====================
+
+class UsuarioSessao(UserMixin):
+    """Dados do usuário logado mantidos em cache, desvinculados da sessão do banco"""
+    
+    def __init__(self, id, nome, login, tipo):
+        self.id = id
+        self.nome = nome
+        self.login = login
+        self.tipo = tipo
+    
+    def is_admin(self):
+        """Verifica se o usuário é administrador"""
+        return self.tipo == 'admin'
+
+@login_manager.user_loader
+def load_user(user_id):
+    """Carrega o usuário pelo ID (usuários inativos perdem a sessão)"""
+    usuario = cache_usuarios.get(user_id)
+    if usuario is not None:
+        return usuario or None
+    
+    geracao = cache_usuarios.geracao
+    linha = db.session.execute(
+        db.select(Usuario.id, Usuario.nome, Usuario.login, Usuario.tipo)
+        .where(Usuario.id == int(user_id), Usuario.ativo.is_(True))
+    ).first()
+    # False marca usuário inexistente/inativo, para não consultar de novo até o TTL
+    usuario = UsuarioSessao(linha.id, linha.nome, linha.login, linha.tipo) if linha else False
+    cache_usuarios.set(user_id, usuario, geracao=geracao)
+    return usuario or None
+
+# ==================== ROTAS ====================
+
+@auth_bp.route('/')
+def index():
+    """Página inicial - redireciona para login se não autenticado"""
+    if current_user.is_authenticated:
+        if current_user.is_admin():
+            return redirect(url_for('admin.dashboard'))
+        else:
+            return redirect(url_for('pdv.index'))
+    return redirect(url_for('auth.login'))
+
+@auth_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """Página de login"""
+    if request.method == 'POST':
+        data = request.get_json()
+        login_usuario = data.get('login')
+        senha = data.get('senha')
+        
+        usuario = Usuario.query.filter_by(login=login_usuario, ativo=True).first()
+        
+        try:
+            senha_correta = usuario is not None and usuario.check_password(senha)
+        except SenhasOcupadas:
+            resposta = jsonify({'success': False,
+                                'message': 'Muitos logins ao mesmo tempo. Tente novamente em instantes.'})
+            return resposta, 503, {'Retry-After': '2'}
+        
+        if senha_correta:
+            # Aproveitar a senha em claro para migrar hashes antigos
+            if usuario.precisa_rehash():
+                usuario.set_password(senha)
+                try:
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+            login_user(usuario)
+            if usuario.is_admin():
+                return jsonify({'success': True, 'redirect': url_for('admin.dashboard')})
+            else:
+                return jsonify({'success': True, 'redirect': url_for('pdv.index')})
+        else:
+            return jsonify({'success': False, 'message': 'Login ou senha incorretos'})
+    
+    return render_template('login.html')
+
+@auth_bp.route('/logout')
+@login_required
+def logout():
+    """Logout do usuário"""
+    logout_user()
+    return redirect(url_for('auth.login'))
@@ -0,0 +1,14 @@
+"""
+Sistema de Supermercado - Rotas do PDV (Ponto de Venda)
+"""
+
+from flask import Blueprint, render_template
+from flask_login import login_required
+
+pdv_bp = Blueprint('pdv', __name__)
+
+@pdv_bp.route('/pdv')
+@login_required
+def index():
+    """Tela do Ponto de Venda"""
+    return render_template('pdv.html')
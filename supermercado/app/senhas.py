@@ -0,0 +1,144 @@
+"""
+Sistema de Supermercado - Hash de senhas
+Algoritmo e custo configuráveis (pbkdf2 do Werkzeug, bcrypt ou argon2), com
+atualização do hash no login quando os parâmetros mudam
+
+No login, no máximo `threads` verificações rodam ao mesmo tempo: na troca de
+turno, vários logins simultâneos não ocupam todos os núcleos e as demais
+requisições (leituras de código de barras, vendas) continuam sendo atendidas.
+O login aguarda a vez na própria thread, em fila e sem prazo: uma vaga libera
+a cada hash, então a espera é a do custo do hash vezes os logins à frente.
+Com `espera` (SENHA_ESPERA), quem não consegue vaga nesse tempo é recusado
+(SenhasOcupadas, 503), como proteção opcional contra sobrecarga. Em workers gevent o hash roda no pool de threads do gevent, para não
+parar as demais greenlets do worker.
+"""
+
+import os
+import threading
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+try:
+    import bcrypt
+except ImportError:  # dependência opcional
+    bcrypt = None
+
+try:
+    from gevent import get_hub
+    from gevent.monkey import is_module_patched
+except ImportError:  # dependência opcional
+    get_hub = None
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerificationError, InvalidHashError
+except ImportError:  # dependência opcional
+    PasswordHasher = None
+
+ALGORITMOS = ('pbkdf2', 'bcrypt', 'argon2')
+
+
+class SenhasOcupadas(Exception):
+    """Todas as vagas de verificação ocupadas além do tempo de espera (se houver)"""
+
+
+class ConfiguracaoSenhas:
+    """Algoritmo e custo usados para gerar novos hashes"""
+
+    def __init__(self, algoritmo='pbkdf2', pbkdf2_iteracoes=600000, bcrypt_rounds=12,
+                 argon2_tempo=3, argon2_memoria=65536, argon2_paralelismo=4, threads=None,
+                 espera=None):
+        if algoritmo not in ALGORITMOS:
+            raise ValueError(f"Algoritmo de senha inválido: {algoritmo}")
+        if algoritmo == 'bcrypt' and bcrypt is None:
+            raise RuntimeError("Algoritmo 'bcrypt' requer o pacote bcrypt")
+        if algoritmo == 'argon2' and PasswordHasher is None:
+            raise RuntimeError("Algoritmo 'argon2' requer o pacote argon2-cffi")
+
+        self.algoritmo = algoritmo
+        self.pbkdf2_iteracoes = pbkdf2_iteracoes
+        self.bcrypt_rounds = bcrypt_rounds
+        self.argon2 = PasswordHasher(
+            time_cost=argon2_tempo, memory_cost=argon2_memoria, parallelism=argon2_paralelismo
+        ) if PasswordHasher is not None else None
+        self.threads = threads or max(1, (os.cpu_count() or 2) // 2)
+        self.espera = espera
+        self._vagas = threading.BoundedSemaphore(self.threads)
+
+    @classmethod
+    def do_ambiente(cls):
+        """Lê a configuração das variáveis SENHA_*"""
+        return cls(
+            algoritmo=os.getenv('SENHA_ALGORITMO', 'pbkdf2').lower(),
+            pbkdf2_iteracoes=int(os.getenv('SENHA_PBKDF2_ITERACOES', '600000')),
+            bcrypt_rounds=int(os.getenv('SENHA_BCRYPT_ROUNDS', '12')),
+            argon2_tempo=int(os.getenv('SENHA_ARGON2_TEMPO', '3')),
+            argon2_memoria=int(os.getenv('SENHA_ARGON2_MEMORIA', '65536')),
+            argon2_paralelismo=int(os.getenv('SENHA_ARGON2_PARALELISMO', '4')),
+            threads=int(os.getenv('SENHA_THREADS', '0')) or None,
+            espera=float(os.getenv('SENHA_ESPERA', '0')) or None
+        )
+
+    def gerar_hash(self, senha):
+        """Gera o hash da senha com o algoritmo e o custo configurados"""
+        if self.algoritmo == 'bcrypt':
+            return bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt(self.bcrypt_rounds)).decode('ascii')
+        if self.algoritmo == 'argon2':
+            return self.argon2.hash(senha)
+        return generate_password_hash(senha, method=f'pbkdf2:sha256:{self.pbkdf2_iteracoes}')
+
+    def verificar(self, senha_hash, senha):
+        """Confere a senha contra um hash de qualquer um dos algoritmos"""
+        algoritmo = algoritmo_do_hash(senha_hash)
+        if algoritmo == 'bcrypt':
+            if bcrypt is None:
+                return False
+            try:
+                return bcrypt.checkpw(senha.encode('utf-8'), senha_hash.encode('ascii'))
+            except ValueError:
+                return False
+        if algoritmo == 'argon2':
+            if self.argon2 is None:
+                return False
+            try:
+                return self.argon2.verify(senha_hash, senha)
+            except (VerificationError, InvalidHashError):
+                return False
+        return check_password_hash(senha_hash, senha)
+
+    def precisa_rehash(self, senha_hash):
+        """Indica se o hash foi gerado com outro algoritmo ou outro custo"""
+        algoritmo = algoritmo_do_hash(senha_hash)
+        if algoritmo != self.algoritmo:
+            return True
+        if algoritmo == 'bcrypt':
+            # Formato: $2b$<rounds>$<salt+hash>
+            return int(senha_hash.split('$')[2]) != self.bcrypt_rounds
+        if algoritmo == 'argon2':
+            return self.argon2.check_needs_rehash(senha_hash)
+        # Formato do Werkzeug: pbkdf2:sha256:<iterações>$<salt>$<hash>
+        metodo = senha_hash.split('$', 1)[0].split(':')
+        return metodo[:2] != ['pbkdf2', 'sha256'] or len(metodo) < 3 or int(metodo[2]) != self.pbkdf2_iteracoes
+
+    def verificar_limitado(self, senha_hash, senha):
+        """Verifica a senha quando houver vaga (SenhasOcupadas após `espera`, se definida)"""
+        if not self._vagas.acquire(timeout=self.espera):
+            raise SenhasOcupadas()
+        try:
+            if get_hub is not None and is_module_patched('threading'):
+                return get_hub().threadpool.apply(self.verificar, (senha_hash, senha))
+            return self.verificar(senha_hash, senha)
+        finally:
+            self._vagas.release()
+
+
+def algoritmo_do_hash(senha_hash):
+    """Identifica o algoritmo pelo prefixo do hash"""
+    if senha_hash.startswith(('$2a$', '$2b$', '$2y$')):
+        return 'bcrypt'
+    if senha_hash.startswith('$argon2'):
+        return 'argon2'
+    if senha_hash.startswith('pbkdf2:'):
+        return 'pbkdf2'
+    return 'werkzeug'
+
@@ -0,0 +1,202 @@
+"""
+Sistema de Supermercado - Sincronização do catálogo com os PDVs e caches
+Cada escrita em produtos (inclusive a baixa de estoque das vendas) recebe uma
+versão crescente do catálogo; o caixa guarda a posição (versão, id) da última
+alteração recebida e, nas próximas sincronizações, baixa apenas o que mudou
+depois dela. Os workers usam o mesmo feed para invalidar o cache de produtos
+"""
+
+import os
+import threading
+import time
+
+from app.extensoes import db
+from app.modelos import Produto, CatalogoVersao
+from app.caches import cache_produtos
+
+LIMITE_PADRAO_SNAPSHOT = 5000
+LIMITE_MAXIMO_SNAPSHOT = 20000
+
+# Maior id possível: posição "depois de todos os produtos da versão"
+ULTIMO_ID = 2 ** 62
+
+# Intervalo (s) entre as consultas de alterações feitas por outros processos
+# para invalidar o cache de produtos deste (0 desativa)
+INTERVALO_SINCRONIZACAO_CACHE = float(os.getenv('CACHE_PRODUTOS_SINCRONIZACAO', '2'))
+
+def nova_versao_catalogo():
+    """Reserva a próxima versão do catálogo na transação atual
+
+    O UPDATE bloqueia a linha do contador até o commit, então as versões são
+    confirmadas na mesma ordem em que são geradas: um caixa que já leu até a
+    versão N nunca perde uma escrita de versão menor confirmada depois.
+    Chame o mais perto possível do commit para segurar o bloqueio pouco tempo
+    e depois de bloquear os produtos (sempre produtos -> contador, a mesma
+    ordem das vendas, para não haver deadlock).
+    """
+    db.session.execute(
+        db.update(CatalogoVersao)
+        .where(CatalogoVersao.id == 1)
+        .values(versao=CatalogoVersao.versao + 1)
+    )
+    return db.session.scalar(db.select(CatalogoVersao.versao).where(CatalogoVersao.id == 1))
+
+def marcar_produtos_alterados(ids=None, codigos=None):
+    """Atribui uma nova versão aos produtos (por id ou código) alterados na transação atual"""
+    versao = nova_versao_catalogo()
+    if ids or codigos:
+        filtro = Produto.id.in_(sorted(ids)) if ids else Produto.codigo_barras.in_(sorted(codigos))
+        db.session.execute(
+            db.update(Produto)
+            .where(filtro)
+            .values(versao=versao)
+            .execution_options(synchronize_session=False)
+        )
+    return versao
+
+def versao_catalogo():
+    """Última versão do catálogo já reservada"""
+    return db.session.scalar(db.select(CatalogoVersao.versao).where(CatalogoVersao.id == 1)) or 0
+
+def linhas_alteradas(colunas, desde, apos_id, limite):
+    """Linhas alteradas depois da posição (desde, apos_id), em ordem de (versao, id)
+
+    Retorna (linhas, tem_mais, posição da última linha).
+    """
+    consulta = db.select(Produto.id, Produto.versao, *colunas)
+    # Duas buscas por intervalo no índice (versao, id): com um OR na mesma
+    # consulta o SQLite percorre a versão `desde` inteira (todo o catálogo
+    # na versão 0) mesmo quando já foi entregue
+    linhas = db.session.execute(
+        consulta.where(Produto.versao == desde, Produto.id > apos_id)
+        .order_by(Produto.id)
+        .limit(limite + 1)
+    ).all()
+    if len(linhas) <= limite:
+        linhas += db.session.execute(
+            consulta.where(Produto.versao > desde)
+            .order_by(Produto.versao, Produto.id)
+            .limit(limite + 1 - len(linhas))
+        ).all()
+
+    tem_mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    posicao = {'desde': linhas[-1].versao, 'apos_id': linhas[-1].id} if linhas \
+        else {'desde': desde, 'apos_id': apos_id}
+    return linhas, tem_mais, posicao
+
+def snapshot_catalogo(desde=0, apos_id=0, limite=LIMITE_PADRAO_SNAPSHOT):
+    """Produtos alterados depois da posição (desde, apos_id), no formato do PDV
+
+    Com a posição inicial (0, 0) é o catálogo completo. Produtos inativos vêm
+    em `removidos` (apenas o código de barras) para o caixa apagá-los.
+    A resposta traz a posição da última linha: o caixa a envia de volta na
+    próxima página (tem_mais) ou na próxima sincronização.
+    """
+    versao = versao_catalogo()
+    linhas, tem_mais, posicao = linhas_alteradas(
+        (Produto.codigo_barras, Produto.nome, Produto.preco, Produto.estoque,
+         Produto.categoria, Produto.ativo),
+        desde, apos_id, limite
+    )
+
+    produtos, removidos = [], []
+    for linha in linhas:
+        if linha.ativo:
+            produtos.append({
+                'id': linha.id,
+                'codigo_barras': linha.codigo_barras,
+                'nome': linha.nome,
+                'preco': float(linha.preco),
+                'estoque': linha.estoque,
+                'categoria': linha.categoria
+            })
+        else:
+            removidos.append(linha.codigo_barras)
+
+    return {
+        'versao': versao,
+        'produtos': produtos,
+        'removidos': removidos,
+        'tem_mais': tem_mais,
+        'posicao': posicao
+    }
+
+def alteracoes_catalogo(desde, apos_id=0, limite=LIMITE_PADRAO_SNAPSHOT):
+    """Feed de alterações: produtos alterados e desativados depois da posição
+
+    Diferente do snapshot do PDV, traz todos os campos, a versão e a data da
+    alteração de cada produto, e os desativados com id e código de barras.
+    """
+    versao = versao_catalogo()
+    linhas, tem_mais, posicao = linhas_alteradas(
+        (Produto.codigo_barras, Produto.nome, Produto.preco, Produto.estoque,
+         Produto.categoria, Produto.ativo, Produto.atualizado_em),
+        desde, apos_id, limite
+    )
+
+    alterados, desativados = [], []
+    for linha in linhas:
+        if linha.ativo:
+            alterados.append({
+                'id': linha.id,
+                'codigo_barras': linha.codigo_barras,
+                'nome': linha.nome,
+                'preco': float(linha.preco),
+                'estoque': linha.estoque,
+                'categoria': linha.categoria,
+                'versao': linha.versao,
+                'atualizado_em': linha.atualizado_em.isoformat() if linha.atualizado_em else None
+            })
+        else:
+            desativados.append({'id': linha.id, 'codigo_barras': linha.codigo_barras,
+                                'versao': linha.versao})
+
+    return {
+        'versao': versao,
+        'alterados': alterados,
+        'desativados': desativados,
+        'tem_mais': tem_mais,
+        'proximo': {'since': posicao['desde'], 'after_id': posicao['apos_id']}
+    }
+
+# ==================== CACHE DE PRODUTOS ENTRE PROCESSOS ====================
+
+_posicao_cache = None
+_ultima_sincronizacao_cache = 0.0
+_lock_cache = threading.Lock()
+
+def sincronizar_cache_produtos():
+    """Remove do cache de produtos deste processo o que outros processos alteraram
+
+    Consulta no máximo a cada INTERVALO_SINCRONIZACAO_CACHE segundos apenas
+    as alterações depois da última posição vista, em vez de depender só do TTL.
+    """
+    global _posicao_cache, _ultima_sincronizacao_cache
+    if INTERVALO_SINCRONIZACAO_CACHE <= 0:
+        return
+    agora = time.monotonic()
+    if agora - _ultima_sincronizacao_cache < INTERVALO_SINCRONIZACAO_CACHE:
+        return
+    if not _lock_cache.acquire(blocking=False):
+        return  # Outra thread já está sincronizando
+    try:
+        _ultima_sincronizacao_cache = agora
+        if _posicao_cache is None:
+            # Versões anteriores à última reservada já foram confirmadas
+            # (o contador é liberado só no commit): começar depois delas
+            _posicao_cache = (max(versao_catalogo() - 1, 0), ULTIMO_ID)
+            return
+        linhas, tem_mais, posicao = linhas_alteradas(
+            (Produto.codigo_barras,), _posicao_cache[0], _posicao_cache[1], LIMITE_PADRAO_SNAPSHOT
+        )
+        if tem_mais:
+            # Muitas alterações (importação): mais barato esvaziar o cache
+            cache_produtos.clear()
+            _posicao_cache = (max(versao_catalogo() - 1, 0), ULTIMO_ID)
+        else:
+            for linha in linhas:
+                cache_produtos.invalidate(linha.codigo_barras)
+            _posicao_cache = (posicao['desde'], posicao['apos_id'])
+    finally:
+        _lock_cache.release()
@@ -564,6 +564,92 @@ function removeFromLocalStorage(key) {
     }
 }
 
+// ==================== EVENTOS EM TEMPO REAL ====================
+
+// Consulta ao feed de alterações quando o servidor recusa a conexão de eventos
+const INTERVALO_CONSULTA_ALTERACOES = 5000;   // ms
+const INTERVALO_NOVA_CONEXAO_EVENTOS = 60000;  // ms
+
+/**
+ * Assina os eventos de estoque e preço dos produtos (Server-Sent Events)
+ * O navegador reconecta sozinho e recebe o que perdeu (Last-Event-ID). Se o
+ * servidor recusar a conexão (503 no limite de telas), o navegador desiste:
+ * a tela passa a consultar /api/produtos/changes a partir do último evento e
+ * volta a tentar os eventos de tempos em tempos.
+ * @param {Function} aoAlterar - Recebe a lista de produtos alterados
+ *   ({id, codigo_barras, preco, estoque, ativo})
+ * @param {Function} aoRecarregar - Chamada quando houve alterações demais
+ *   (importação do catálogo) e a tela deve recarregar os dados
+ * @returns {EventSource|null} - Conexão aberta ou null sem suporte a SSE
+ */
+function assinarEventosProdutos(aoAlterar, aoRecarregar) {
+    if (!window.EventSource) return null;
+    let posicao = null;   // {since, after_id} do último evento recebido
+    let consulta = null;
+
+    const recarregar = () => aoRecarregar && aoRecarregar();
+
+    const conectar = () => {
+        // Depois de consultas, a nova conexão continua da posição já aplicada
+        const eventos = new EventSource('/api/eventos/produtos' +
+            (posicao ? `?ultimo_id=${posicao.since}:${posicao.after_id}` : ''));
+        eventos.addEventListener('produtos', e => {
+            const [since, afterId] = e.lastEventId.split(':').map(Number);
+            posicao = { since, after_id: afterId };
+            aoAlterar(JSON.parse(e.data));
+        });
+        eventos.addEventListener('recarregar', recarregar);
+        eventos.addEventListener('open', () => {
+            clearInterval(consulta);
+            consulta = null;
+        });
+        eventos.addEventListener('error', () => {
+            // CONNECTING: o navegador reconecta sozinho; CLOSED: conexão recusada
+            if (eventos.readyState !== EventSource.CLOSED) return;
+            if (!consulta) consulta = setInterval(consultarAlteracoes, INTERVALO_CONSULTA_ALTERACOES);
+            setTimeout(conectar, INTERVALO_NOVA_CONEXAO_EVENTOS);
+        });
+        return eventos;
+    };
+
+    const consultarAlteracoes = async () => {
+        try {
+            if (!posicao) {
+                // Sem evento recebido: começar da versão atual do catálogo
+                const inicio = await httpGet('/api/produtos/changes?since=0&limit=1');
+                posicao = { since: Math.max(inicio.versao - 1, 0), after_id: 0 };
+            }
+            const data = await httpGet(`/api/produtos/changes?since=${posicao.since}&after_id=${posicao.after_id}&limit=1000`);
+            if (data.tem_mais) {
+                posicao = null;
+                recarregar();
+                return;
+            }
+            posicao = data.proximo;
+            const alteracoes = data.alterados.map(produto => ({
+                id: produto.id, codigo_barras: produto.codigo_barras,
+                preco: produto.preco, estoque: produto.estoque, ativo: true
+            })).concat(data.desativados.map(produto => ({
+                id: produto.id, codigo_barras: produto.codigo_barras, preco: 0, estoque: 0, ativo: false
+            })));
+            if (alteracoes.length) aoAlterar(alteracoes);
+        } catch (error) {
+            console.warn('Consulta de alterações adiada:', error);
+        }
+    };
+
+    return conectar();
+}
+
+/**
+ * Classe do badge de estoque (verde, amarelo ou vermelho)
+ * @param {number} estoque - Quantidade em estoque
+ * @returns {string} - Classe CSS do badge
+ */
+function classeBadgeEstoque(estoque) {
+    return estoque > 10 ? 'bg-success' : estoque > 0 ? 'bg-warning' : 'bg-danger';
+}
+
 // ==================== EXPORTAR FUNÇÕES GLOBAIS ====================
 
 // Tornar funções principais disponíveis globalmente
@@ -587,5 +673,7 @@ window.throttle = throttle;
 window.copyToClipboard = copyToClipboard;
 window.generateUniqueId = generateUniqueId;
 window.stringToSlug = stringToSlug;
+window.assinarEventosProdutos = assinarEventosProdutos;
+window.classeBadgeEstoque = classeBadgeEstoque;
 
 console.log('JavaScript principal carregado com sucesso!');
\ No newline at end of file
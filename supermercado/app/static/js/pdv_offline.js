@@ -0,0 +1,332 @@
+/**
+ * Sistema de Supermercado - PDV offline
+ * Catálogo local no IndexedDB para ler códigos de barras sem ir ao servidor
+ * e fila durável das vendas finalizadas, reenviadas quando a conexão volta
+ */
+
+// ==================== CONFIGURAÇÃO ====================
+const PDV_BANCO = 'supermercado-pdv';
+const PDV_BANCO_VERSAO = 1;
+const INTERVALO_SINCRONIZACAO = 60000;   // catálogo (ms)
+const INTERVALO_FILA = 15000;            // reenvio das vendas pendentes (ms)
+const TEMPO_LIMITE_VENDA = 8000;         // envio de uma venda (ms)
+
+let bancoPdv = null;
+let sincronizandoCatalogo = false;
+let enviandoFila = false;
+const vendasEmEnvio = new Set();         // primeiro envio ainda em andamento
+
+// ==================== INDEXEDDB ====================
+
+/**
+ * Converte uma requisição do IndexedDB em Promise
+ * @param {IDBRequest} requisicao - Requisição do IndexedDB
+ * @returns {Promise<any>} - Resultado da requisição
+ */
+function resultadoIdb(requisicao) {
+    return new Promise((resolve, reject) => {
+        requisicao.onsuccess = () => resolve(requisicao.result);
+        requisicao.onerror = () => reject(requisicao.error);
+    });
+}
+
+/**
+ * Aguarda o fim (commit) de uma transação do IndexedDB
+ * @param {IDBTransaction} transacao - Transação aberta
+ * @returns {Promise<void>}
+ */
+function fimTransacao(transacao) {
+    return new Promise((resolve, reject) => {
+        transacao.oncomplete = () => resolve();
+        transacao.onerror = () => reject(transacao.error);
+        transacao.onabort = () => reject(transacao.error);
+    });
+}
+
+/**
+ * Abre (e cria na primeira vez) o banco local do PDV
+ * @returns {Promise<IDBDatabase|null>} - Banco aberto ou null sem IndexedDB
+ */
+async function abrirBancoPdv() {
+    if (bancoPdv) return bancoPdv;
+    if (!window.indexedDB) return null;
+
+    const requisicao = indexedDB.open(PDV_BANCO, PDV_BANCO_VERSAO);
+    requisicao.onupgradeneeded = function() {
+        const banco = requisicao.result;
+        banco.createObjectStore('produtos', { keyPath: 'codigo_barras' });
+        banco.createObjectStore('meta', { keyPath: 'chave' });
+        banco.createObjectStore('vendas_pendentes', { keyPath: 'uuid' });
+        banco.createObjectStore('vendas_recusadas', { keyPath: 'uuid' });
+    };
+    try {
+        bancoPdv = await resultadoIdb(requisicao);
+    } catch (error) {
+        console.error('IndexedDB indisponível:', error);
+        return null;
+    }
+    return bancoPdv;
+}
+
+async function lerMeta(chave) {
+    const banco = await abrirBancoPdv();
+    const registro = await resultadoIdb(banco.transaction('meta').objectStore('meta').get(chave));
+    return registro ? registro.valor : null;
+}
+
+// ==================== CATÁLOGO LOCAL ====================
+
+/**
+ * Busca um produto ativo pelo código de barras no catálogo local
+ * @param {string} codigo - Código de barras
+ * @returns {Promise<Object|null>} - Produto ou null se não estiver no catálogo local
+ */
+async function buscarProdutoLocal(codigo) {
+    const banco = await abrirBancoPdv();
+    if (!banco) return null;
+    const produto = await resultadoIdb(banco.transaction('produtos').objectStore('produtos').get(codigo));
+    return produto || null;
+}
+
+/**
+ * Baixa as alterações do catálogo desde a última sincronização
+ * A posição (versão, id) só avança junto com os produtos gravados, na mesma
+ * transação: uma sincronização interrompida recomeça de onde parou.
+ */
+async function sincronizarCatalogo() {
+    const banco = await abrirBancoPdv();
+    if (!banco || sincronizandoCatalogo || !navigator.onLine) return;
+    sincronizandoCatalogo = true;
+
+    try {
+        let posicao = (await lerMeta('posicao')) || { desde: 0, apos_id: 0 };
+        let temMais = true;
+        while (temMais) {
+            const response = await fetch(`/api/produtos/snapshot?desde=${posicao.desde}&apos_id=${posicao.apos_id}`);
+            const data = await response.json();
+            if (!data.success) throw new Error(data.message);
+
+            const transacao = banco.transaction(['produtos', 'meta'], 'readwrite');
+            const produtos = transacao.objectStore('produtos');
+            if (data.versao < posicao.desde) {
+                // Banco do servidor recriado: recomeçar do catálogo completo
+                produtos.clear();
+                posicao = { desde: 0, apos_id: 0 };
+                transacao.objectStore('meta').put({ chave: 'posicao', valor: posicao });
+                await fimTransacao(transacao);
+                continue;
+            }
+            data.produtos.forEach(produto => produtos.put(produto));
+            data.removidos.forEach(codigo => produtos.delete(codigo));
+            transacao.objectStore('meta').put({ chave: 'posicao', valor: data.posicao });
+            transacao.objectStore('meta').put({ chave: 'sincronizado_em', valor: Date.now() });
+            await fimTransacao(transacao);
+
+            posicao = data.posicao;
+            temMais = data.tem_mais;
+        }
+    } catch (error) {
+        console.warn('Sincronização do catálogo adiada:', error);
+    } finally {
+        sincronizandoCatalogo = false;
+        atualizarStatusPdv();
+    }
+}
+
+/**
+ * Aplica ao catálogo local as alterações recebidas por eventos do servidor
+ * A posição da sincronização não muda: a próxima sincronização confirma
+ * (e completa) o que chegou por aqui.
+ * @param {Array} alteracoes - Produtos alterados ({codigo_barras, preco, estoque, ativo})
+ */
+async function aplicarEventosCatalogo(alteracoes) {
+    const banco = await abrirBancoPdv();
+    if (!banco) return;
+    const transacao = banco.transaction('produtos', 'readwrite');
+    const produtos = transacao.objectStore('produtos');
+    alteracoes.forEach(alteracao => {
+        if (!alteracao.ativo) {
+            produtos.delete(alteracao.codigo_barras);
+            return;
+        }
+        const requisicao = produtos.get(alteracao.codigo_barras);
+        requisicao.onsuccess = () => {
+            // Produto novo (sem nome e categoria aqui) chega na sincronização
+            if (requisicao.result) {
+                produtos.put({ ...requisicao.result, preco: alteracao.preco, estoque: alteracao.estoque });
+            }
+        };
+    });
+    await fimTransacao(transacao);
+}
+
+// ==================== FILA DE VENDAS ====================
+
+/**
+ * Gera o identificador da venda no caixa
+ * @returns {string} - UUID versão 4
+ */
+function gerarUuidVenda() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    const bytes = crypto.getRandomValues(new Uint8Array(16));
+    bytes[6] = (bytes[6] & 0x0f) | 0x40;
+    bytes[8] = (bytes[8] & 0x3f) | 0x80;
+    const hex = Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+    return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+}
+
+async function gravarNaFila(loja, venda) {
+    const banco = await abrirBancoPdv();
+    if (!banco) return;
+    const transacao = banco.transaction(loja, 'readwrite');
+    transacao.objectStore(loja).put(venda);
+    await fimTransacao(transacao);
+}
+
+async function removerDaFila(uuid) {
+    const banco = await abrirBancoPdv();
+    if (!banco) return;
+    const transacao = banco.transaction('vendas_pendentes', 'readwrite');
+    transacao.objectStore('vendas_pendentes').delete(uuid);
+    await fimTransacao(transacao);
+}
+
+async function listarFila(loja) {
+    const banco = await abrirBancoPdv();
+    if (!banco) return [];
+    return resultadoIdb(banco.transaction(loja).objectStore(loja).getAll());
+}
+
+/**
+ * Envia uma venda ao servidor
+ * Falhas de rede, erros 5xx e respostas que não são JSON (sessão expirada)
+ * lançam exceção: a venda continua na fila para um novo envio.
+ * @param {Object} venda - Venda com uuid, itens e registrada_em
+ * @returns {Promise<Object>} - Resposta da API (success, venda_id, message)
+ */
+async function enviarVenda(venda) {
+    const controle = new AbortController();
+    const temporizador = setTimeout(() => controle.abort(), TEMPO_LIMITE_VENDA);
+    try {
+        const response = await fetch('/api/venda', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(venda),
+            signal: controle.signal
+        });
+        if (response.status >= 500) {
+            const erro = new Error(`HTTP ${response.status}`);
+            erro.status = response.status;
+            throw erro;
+        }
+        return await response.json();
+    } finally {
+        clearTimeout(temporizador);
+    }
+}
+
+/**
+ * Finaliza uma venda: grava na fila local antes de enviá-la
+ * @param {Array} itens - Itens do carrinho (id e quantidade)
+ * @returns {Promise<Object>} - {enviada, data} ou {enviada: false} se ficou na fila
+ */
+async function registrarVendaPdv(itens) {
+    const venda = {
+        uuid: gerarUuidVenda(),
+        itens: itens.map(item => ({ id: item.id, quantidade: item.quantidade })),
+        total: itens.reduce((soma, item) => soma + item.subtotal, 0),
+        registrada_em: new Date().toISOString()
+    };
+    if (!(await abrirBancoPdv())) {
+        // Sem IndexedDB não há fila: a venda depende da conexão
+        return { enviada: true, data: await enviarVenda(venda) };
+    }
+    await gravarNaFila('vendas_pendentes', venda);
+
+    vendasEmEnvio.add(venda.uuid);
+    try {
+        const data = await enviarVenda(venda);
+        // Recusada (estoque, produto inativo): o operador vê o erro na hora
+        await removerDaFila(venda.uuid);
+        return { enviada: true, data };
+    } catch (error) {
+        // Sem resposta do servidor, a venda aconteceu sem ele: o reenvio leva
+        // offline. Se o servidor respondeu com erro, ela volta a ser validada
+        if (!error.status) {
+            venda.offline = true;
+            await gravarNaFila('vendas_pendentes', venda);
+        }
+        return { enviada: false };
+    } finally {
+        vendasEmEnvio.delete(venda.uuid);
+        atualizarStatusPdv();
+    }
+}
+
+/**
+ * Reenvia as vendas pendentes na ordem em que foram feitas
+ * Para na primeira falha de rede; vendas recusadas pelo servidor vão para
+ * vendas_recusadas para conferência do gerente.
+ */
+async function enviarFilaVendas() {
+    if (enviandoFila || !navigator.onLine) return;
+    enviandoFila = true;
+
+    try {
+        const pendentes = await listarFila('vendas_pendentes');
+        pendentes.sort((a, b) => a.registrada_em.localeCompare(b.registrada_em));
+        for (const venda of pendentes) {
+            if (vendasEmEnvio.has(venda.uuid)) continue;
+            // Inclusive as que ficaram na fila com a página fechada no meio do
+            // envio; essas não têm a marca offline e são validadas normalmente
+            const data = await enviarVenda(venda);
+            if (!data.success) {
+                await gravarNaFila('vendas_recusadas', { ...venda, motivo: data.message });
+            }
+            await removerDaFila(venda.uuid);
+        }
+    } catch (error) {
+        console.warn('Reenvio das vendas adiado:', error);
+    } finally {
+        enviandoFila = false;
+        atualizarStatusPdv();
+    }
+}
+
+// ==================== STATUS E AGENDAMENTO ====================
+
+/**
+ * Mostra conexão, vendas pendentes e recusadas no indicador do PDV
+ */
+async function atualizarStatusPdv() {
+    const indicador = document.getElementById('pdvStatus');
+    if (!indicador) return;
+
+    const pendentes = (await listarFila('vendas_pendentes')).filter(venda => !vendasEmEnvio.has(venda.uuid)).length;
+    const recusadas = (await listarFila('vendas_recusadas')).length;
+
+    const partes = [navigator.onLine ? 'Online' : 'Offline'];
+    if (pendentes) partes.push(`${pendentes} venda(s) pendente(s)`);
+    if (recusadas) partes.push(`${recusadas} recusada(s)`);
+    indicador.textContent = partes.join(' · ');
+    indicador.className = `badge ${!navigator.onLine || recusadas ? 'bg-danger' : pendentes ? 'bg-warning' : 'bg-success'}`;
+}
+
+/**
+ * Inicia a sincronização do catálogo e o reenvio periódico da fila
+ */
+async function iniciarPdvOffline() {
+    if (!(await abrirBancoPdv())) return;
+
+    window.addEventListener('online', () => {
+        enviarFilaVendas();
+        sincronizarCatalogo();
+    });
+    window.addEventListener('offline', atualizarStatusPdv);
+    setInterval(sincronizarCatalogo, INTERVALO_SINCRONIZACAO);
+    setInterval(enviarFilaVendas, INTERVALO_FILA);
+
+    await atualizarStatusPdv();
+    await enviarFilaVendas();
+    await sincronizarCatalogo();
+}
@@ -0,0 +1,209 @@
+"""
+Sistema de Supermercado - Registro de vendas
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+from app.extensoes import db
+from app.modelos import Produto, Venda, ItemVenda
+from app.caches import cache_produtos
+from app.relatorios import acumular_resumos_venda
+from app.estatisticas import registrar_venda_estatisticas, inicio_do_dia_utc
+from app.historico_vendas import registrar_venda_historico
+from app.reposicao import somar_venda
+from app.sincronizacao import nova_versao_catalogo
+
+# Vendas feitas sem conexão mais antigas que isso recebem a data do servidor
+PRAZO_VENDA_OFFLINE = timedelta(days=7)
+
+class VendaInvalida(Exception):
+    """Venda recusada por dados inválidos ou estoque insuficiente"""
+
+class VendaDuplicada(Exception):
+    """Venda com um uuid já registrado (reenvio do PDV)"""
+    
+    def __init__(self, venda):
+        super().__init__(f'Venda {venda.id} já registrada')
+        self.venda = venda
+
+def _data_pdv(registrada_em):
+    """Data informada pelo PDV em UTC sem fuso (datas sem fuso já são UTC), ou None"""
+    try:
+        data = datetime.fromisoformat(str(registrada_em))
+    except ValueError:
+        return None
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+def venda_feita_offline(uuid, registrada_em, recebida_em):
+    """Se uma venda marcada `offline` pelo PDV pode ser tratada como tal
+
+    Só vendas identificadas (uuid) e registradas no caixa antes de a
+    requisição chegar: a marca sozinha não dispensa as validações.
+    """
+    data = _data_pdv(registrada_em) if registrada_em else None
+    return uuid is not None and data is not None and data < recebida_em
+
+def data_venda_offline(registrada_em):
+    """Data (UTC) informada pelo PDV para uma venda feita sem conexão
+
+    Datas inválidas, futuras ou fora de PRAZO_VENDA_OFFLINE são ignoradas.
+    """
+    data = _data_pdv(registrada_em)
+    agora = datetime.utcnow()
+    if data is None or not agora - PRAZO_VENDA_OFFLINE <= data <= agora:
+        return None
+    return data
+
+def registrar_venda(operador_id, itens, uuid=None, offline=False, data_venda=None):
+    """Registra uma venda completa em uma única transação
+    
+    Os produtos do carrinho são carregados em uma só consulta e bloqueados
+    em ordem de id (SELECT ... FOR UPDATE), evitando deadlocks entre caixas.
+    Preços e totais são recalculados a partir do cadastro, os itens são
+    inseridos em lote e o estoque é baixado por um único UPDATE condicional,
+    de modo que vendas concorrentes nunca deixam o estoque negativo. O mesmo
+    UPDATE atualiza a velocidade de vendas dos produtos (reposição).
+    
+    Com `uuid`, um reenvio da mesma venda levanta VendaDuplicada com a venda
+    já gravada. Vendas `offline` (ver venda_feita_offline) já aconteceram no
+    caixa: produtos inativados depois do último sincronismo são aceitos e a
+    falta de estoque zera o estoque em vez de recusar a venda. A venda fica
+    marcada como offline para conferência.
+    """
+    # Consolidar quantidades por produto (o mesmo produto pode vir repetido)
+    quantidades = {}
+    for item in itens:
+        try:
+            produto_id = int(item['id'])
+            quantidade = int(item['quantidade'])
+        except (KeyError, TypeError, ValueError):
+            raise VendaInvalida('Item inválido no carrinho')
+        if quantidade <= 0:
+            raise VendaInvalida('Quantidade inválida no carrinho')
+        quantidades[produto_id] = quantidades.get(produto_id, 0) + quantidade
+    
+    ids = sorted(quantidades)
+    
+    if uuid is not None:
+        existente = Venda.query.filter_by(uuid=uuid).first()
+        if existente is not None:
+            raise VendaDuplicada(existente)
+    
+    try:
+        consulta = (
+            db.select(Produto.id, Produto.nome, Produto.preco, Produto.estoque,
+                      Produto.codigo_barras, Produto.categoria,
+                      Produto.velocidade_vendas, Produto.velocidade_atualizada_em)
+            .where(Produto.id.in_(ids))
+            .order_by(Produto.id)
+            .with_for_update()
+        )
+        if not offline:
+            consulta = consulta.where(Produto.ativo == True)
+        produtos = db.session.execute(consulta).all()
+        
+        if len(produtos) != len(ids):
+            raise VendaInvalida('Produto não encontrado ou inativo')
+        
+        if not offline:
+            for produto in produtos:
+                if produto.estoque < quantidades[produto.id]:
+                    raise VendaInvalida(f'Estoque insuficiente para {produto.nome}')
+        
+        # Calcular subtotais e total no servidor a partir do preço cadastrado
+        linhas = []
+        valor_total = 0
+        for produto in produtos:
+            quantidade = quantidades[produto.id]
+            subtotal = produto.preco * quantidade
+            valor_total += subtotal
+            linhas.append({
+                'produto_id': produto.id,
+                'quantidade': quantidade,
+                'preco_unitario': produto.preco,
+                'subtotal': subtotal
+            })
+        
+        data_venda = data_venda or datetime.utcnow()
+        venda = Venda(
+            operador_id=operador_id,
+            data_venda=data_venda,
+            valor_total=valor_total,
+            uuid=uuid,
+            offline=offline
+        )
+        db.session.add(venda)
+        db.session.flush()  # Para obter o ID da venda
+        
+        # Inserir todos os itens da venda em lote
+        db.session.execute(ItemVenda.__table__.insert(), [{
+            'venda_id': venda.id,
+            'produto_id': linha['produto_id'],
+            'quantidade': linha['quantidade'],
+            'preco_unitario': linha['preco_unitario'],
+            'subtotal': linha['subtotal']
+        } for linha in linhas])
+        
+        # Baixar o estoque de todos os produtos em um único UPDATE condicional,
+        # que também registra a velocidade de vendas (calculada das linhas já
+        # bloqueadas)
+        tabela = Produto.__table__
+        baixa = db.case(quantidades, value=tabela.c.id)
+        velocidades = {produto.id: somar_venda(produto.velocidade_vendas, produto.velocidade_atualizada_em,
+                                               quantidades[produto.id], data_venda)
+                       for produto in produtos}
+        valores = {
+            'velocidade_vendas': db.case({produto_id: velocidade for produto_id, (velocidade, _)
+                                          in velocidades.items()}, value=tabela.c.id),
+            'velocidade_atualizada_em': db.case({produto_id: referencia for produto_id, (_, referencia)
+                                                 in velocidades.items()}, value=tabela.c.id)
+        }
+        if offline:
+            # A mercadoria já saiu: o estoque vai no máximo a zero
+            resultado = db.session.execute(
+                tabela.update()
+                .where(tabela.c.id.in_(ids))
+                .values(estoque=db.case((tabela.c.estoque >= baixa, tabela.c.estoque - baixa), else_=0),
+                        **valores)
+            )
+        else:
+            resultado = db.session.execute(
+                tabela.update()
+                .where(tabela.c.id.in_(ids), tabela.c.estoque >= baixa)
+                .values(estoque=tabela.c.estoque - baixa, **valores)
+            )
+        if resultado.rowcount != len(ids):
+            raise VendaInvalida('Estoque insuficiente para concluir a venda')
+        
+        acumular_resumos_venda(venda, produtos, quantidades)
+        
+        # O contador fica bloqueado até o commit: reservado só agora, logo antes
+        # dele (os produtos já estão bloqueados: a ordem produtos -> contador é
+        # a mesma das outras escritas)
+        versao = nova_versao_catalogo()
+        db.session.execute(tabela.update().where(tabela.c.id.in_(ids)).values(versao=versao))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        # Reenvio concorrente da mesma venda: a outra requisição gravou primeiro
+        existente = Venda.query.filter_by(uuid=uuid).first() if uuid is not None else None
+        if existente is not None:
+            raise VendaDuplicada(existente)
+        raise
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    # Os produtos vendidos tiveram o estoque alterado
+    for produto in produtos:
+        cache_produtos.invalidate(produto.codigo_barras)
+    if venda.data_venda >= inicio_do_dia_utc():
+        # Vendas offline de dias anteriores não entram nos contadores de hoje
+        registrar_venda_estatisticas(valor_total, sum(quantidades.values()))
+    registrar_venda_historico(venda, len(linhas))
+    
+    return venda
@@ -0,0 +1,1885 @@
+#!/usr/bin/env python3
+"""
+Benchmarks e testes de carga do Sistema de Supermercado
+Executa sempre contra um banco descartável: SQLite temporário por padrão ou
+o banco indicado em BENCHMARK_DATABASE_URL (que será APAGADO e recriado)
+"""
+
+import sys
+import os
+import functools
+import json
+import random
+import re
+import subprocess
+import tempfile
+import threading
+import time
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def preparar_banco(recriar=True):
+    """Aponta a aplicação para o banco de benchmark e recria as tabelas"""
+    url = os.getenv('BENCHMARK_DATABASE_URL')
+    if not url:
+        diretorio = tempfile.mkdtemp(prefix='supermercado_bench_')
+        url = f"sqlite:///{os.path.join(diretorio, 'benchmark.db')}"
+    os.environ['DATABASE_URL'] = url
+
+    from app import create_app, db, init_db
+    from app import migracoes
+
+    app = create_app()
+    with app.app_context():
+        if recriar:
+            migracoes.recriar_banco(db)
+        init_db()
+
+    print(f"🗄️  Banco de benchmark: {url}")
+    return app, db
+
+
+# Tentativas de login recusado por falta de vaga (503, só com SENHA_ESPERA)
+TENTATIVAS_LOGIN = 10
+
+
+def entrar(tentar):
+    """Repete o login enquanto o servidor responder 503, aguardando o Retry-After
+
+    `tentar()` faz o login e retorna (status, Retry-After, corpo JSON).
+    """
+    for _ in range(TENTATIVAS_LOGIN):
+        status, espera, corpo = tentar()
+        if status != 503:
+            return bool(isinstance(corpo, dict) and corpo.get('success'))
+        # Um pouco além do Retry-After, para os recusados não voltarem juntos
+        time.sleep(float(espera or 1) * random.uniform(1, 2))
+    return False
+
+
+def cliente_logado(app, login='operador', senha='op123'):
+    """Cria um cliente de teste autenticado"""
+    cliente = app.test_client()
+
+    def tentar():
+        resposta = cliente.post('/login', json={'login': login, 'senha': senha})
+        return resposta.status_code, resposta.headers.get('Retry-After'), resposta.get_json(silent=True)
+
+    if not entrar(tentar):
+        raise RuntimeError(f"Falha no login de '{login}'")
+    return cliente
+
+
+def percentil(amostras, p):
+    """Percentil p (0-100) de uma lista de amostras"""
+    ordenadas = sorted(amostras)
+    if not ordenadas:
+        return 0.0
+    indice = min(len(ordenadas) - 1, max(0, int(round(p / 100 * len(ordenadas))) - 1))
+    return ordenadas[indice]
+
+
+def resumo_latencias(nome, amostras):
+    """Imprime p50/p95/p99 de uma lista de latências em segundos"""
+    print(f"   {nome:<28} p50={percentil(amostras, 50) * 1000:7.2f}ms "
+          f"p95={percentil(amostras, 95) * 1000:7.2f}ms "
+          f"p99={percentil(amostras, 99) * 1000:7.2f}ms "
+          f"({len(amostras)} amostras)")
+
+
+PRODUTOS_BASE = [
+    ('Açúcar Cristal', 'Alimentação'), ('Açúcar Refinado', 'Alimentação'),
+    ('Arroz Branco', 'Alimentação'), ('Feijão Preto', 'Alimentação'),
+    ('Feijão Carioca', 'Alimentação'), ('Café Torrado', 'Alimentação'),
+    ('Macarrão Espaguete', 'Alimentação'), ('Óleo de Soja', 'Alimentação'),
+    ('Farinha de Trigo', 'Alimentação'), ('Pão de Forma', 'Alimentação'),
+    ('Leite Integral', 'Alimentação'), ('Manteiga com Sal', 'Alimentação'),
+    ('Água Mineral', 'Bebidas'), ('Suco de Laranja', 'Bebidas'),
+    ('Refrigerante Cola', 'Bebidas'), ('Cerveja Pilsen', 'Bebidas'),
+    ('Água de Coco', 'Bebidas'), ('Chá Gelado', 'Bebidas'),
+    ('Detergente Líquido', 'Limpeza'), ('Sabão em Pó', 'Limpeza'),
+    ('Água Sanitária', 'Limpeza'), ('Desinfetante', 'Limpeza'),
+    ('Shampoo', 'Higiene'), ('Condicionador', 'Higiene'),
+    ('Sabonete', 'Higiene'), ('Creme Dental', 'Higiene'),
+    ('Papel Higiênico', 'Higiene'), ('Pilha Alcalina', 'Outros'),
+    ('Fósforo', 'Outros'), ('Papel Alumínio', 'Outros'),
+]
+MARCAS = ['União', 'Camil', 'Tio João', 'Pilão', 'Nestlé', 'Italac', 'Ypê', 'Omo',
+          'Dove', 'Colgate', 'Sadia', 'Qualitá', 'São João', 'Três Corações', 'Líder']
+TAMANHOS = ['200g', '500g', '1kg', '2kg', '5kg', '350ml', '1L', '1,5L', '2L', '12un']
+
+
+def gerar_catalogo(db, quantidade, semente=42):
+    """Insere um catálogo sintético com nomes acentuados em lotes"""
+    from app import Produto
+
+    aleatorio = random.Random(semente)
+    tabela = Produto.__table__
+    lote = []
+    for i in range(quantidade):
+        base, categoria = aleatorio.choice(PRODUTOS_BASE)
+        lote.append({
+            'nome': f"{base} {aleatorio.choice(MARCAS)} {aleatorio.choice(TAMANHOS)}",
+            'preco': round(aleatorio.uniform(1, 80), 2),
+            'estoque': aleatorio.randint(0, 500),
+            'codigo_barras': f"789{i:010d}",
+            'categoria': categoria,
+            'ativo': True
+        })
+        if len(lote) >= 5000:
+            db.session.execute(tabela.insert(), lote)
+            lote = []
+    if lote:
+        db.session.execute(tabela.insert(), lote)
+    db.session.commit()
+
+
+def bench_busca(produtos=100000, consultas=300):
+    """Mede a latência da busca de produtos (índice) contra o ILIKE antigo"""
+    app, db = preparar_banco()
+    from app import busca as busca_produtos
+
+    print(f"📦 Gerando catálogo com {produtos} produtos...")
+    inicio = time.perf_counter()
+    with app.app_context():
+        gerar_catalogo(db, produtos)
+    print(f"   catálogo criado em {time.perf_counter() - inicio:.1f}s")
+
+    aleatorio = random.Random(7)
+    termos = []
+    for _ in range(consultas):
+        base = busca_produtos.normalizar(aleatorio.choice(PRODUTOS_BASE)[0]).split()[0]
+        tipo = aleatorio.random()
+        if tipo < 0.4:
+            termos.append(base[:aleatorio.randint(3, len(base))])   # digitação parcial
+        elif tipo < 0.7:
+            termos.append(base)                                     # palavra completa
+        elif tipo < 0.9:
+            posicao = aleatorio.randrange(len(base))                # erro de digitação
+            termos.append(base[:posicao] + base[posicao + 1:])
+        else:
+            codigo = f"789{aleatorio.randint(0, produtos - 1):010d}"
+            termos.append(codigo[:aleatorio.randint(10, len(codigo))])  # leitor/código
+
+    cliente = cliente_logado(app)
+    latencias_indice = []
+    sem_resultado = 0
+    for termo in termos:
+        inicio = time.perf_counter()
+        resultado = cliente.get(f'/api/produtos/busca?q={termo}&limite=20').get_json()
+        latencias_indice.append(time.perf_counter() - inicio)
+        sem_resultado += not resultado
+
+    latencias_ilike = []
+    with app.app_context():
+        for termo in termos:
+            inicio = time.perf_counter()
+            busca_produtos._buscar_ilike(db, termo, 20)
+            latencias_ilike.append(time.perf_counter() - inicio)
+
+    print(f"\n🔎 {consultas} buscas em {produtos} produtos:")
+    resumo_latencias('API /api/produtos/busca', latencias_indice)
+    resumo_latencias('ILIKE (consulta antiga)', latencias_ilike)
+    print(f"   consultas sem resultado: {sem_resultado}")
+
+    # Nome que começa pelo termo vem antes do que só o contém
+    from app import Produto
+    with app.app_context():
+        db.session.add(Produto(nome='Pão de Açúcar', preco=5, estoque=10, codigo_barras='7880000000001',
+                               categoria='Padaria'))
+        db.session.commit()
+        primeiro = db.session.get(Produto, busca_produtos.buscar_ids(db, 'acucar')[0]).nome
+    ok = busca_produtos.normalizar(primeiro).startswith('acucar')
+    print(f"   {'✅' if ok else '❌'} 'acucar' -> {primeiro}")
+    return ok
+
+
+def consultas_frequentes(db):
+    """Consultas dos endpoints mais usados, como o ORM as gera"""
+    from datetime import datetime, timedelta
+    from app import Produto, Venda, ItemVenda
+
+    hoje = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'leitura de código de barras': db.select(Produto).where(
+            Produto.codigo_barras == '7890000000001', Produto.ativo == True),
+        'consulta em lote (códigos e ids)': db.select(Produto).where(db.or_(
+            Produto.codigo_barras.in_(['7890000000001', '7890000000002']), Produto.id.in_([1, 2]))),
+        'produtos ativos (dashboard)': db.select(db.func.count(Produto.id)).where(
+            Produto.ativo == True),
+        'listagem por categoria': db.select(Produto.id, Produto.nome).where(
+            Produto.ativo == True, Produto.categoria == 'Bebidas', Produto.id > 100
+        ).order_by(Produto.id).limit(50),
+        'listagem por nome': db.select(Produto.id, Produto.nome).where(
+            Produto.ativo == True).order_by(Produto.nome, Produto.id).limit(50),
+        'vendas do dia': db.select(db.func.count(Venda.id)).where(
+            Venda.data_venda >= hoje, Venda.data_venda < hoje + timedelta(days=1)),
+        'vendas do operador': db.select(Venda.id).where(
+            Venda.operador_id == 1).order_by(Venda.data_venda.desc()).limit(20),
+        'histórico do caixa (próxima página)': db.select(
+            Venda.id, db.select(db.func.count()).where(ItemVenda.venda_id == Venda.id).scalar_subquery()
+        ).where(
+            Venda.operador_id == 1, Venda.data_venda <= hoje,
+            db.or_(Venda.data_venda < hoje, Venda.id < 100)
+        ).order_by(Venda.data_venda.desc(), Venda.id.desc()).limit(21),
+        'itens da venda': db.select(ItemVenda).where(ItemVenda.venda_id == 1),
+        'vendas do produto': db.select(ItemVenda.id).where(ItemVenda.produto_id == 1),
+    }
+
+
+def bench_planos():
+    """Verifica via EXPLAIN que as consultas frequentes usam índices"""
+    app, db = preparar_banco()
+
+    sucesso = True
+    with app.app_context():
+        # Estatísticas realistas para o planner
+        gerar_catalogo(db, 20000)
+        with db.engine.begin() as conexao:
+            conexao.exec_driver_sql("ANALYZE")
+
+        dialeto = db.engine.dialect
+        with db.engine.connect() as conexao:
+            if dialeto.name == 'postgresql':
+                # Em tabelas pequenas o planner prefere seq scan mesmo com índice
+                conexao.exec_driver_sql("SET enable_seqscan = off")
+                prefixo, varredura = "EXPLAIN ", re.compile(r'Seq Scan on (\w+)')
+            else:
+                prefixo, varredura = "EXPLAIN QUERY PLAN ", re.compile(r'^SCAN (\w+)$')
+
+            print("📋 Planos das consultas frequentes:")
+            for nome, consulta in consultas_frequentes(db).items():
+                sql = str(consulta.compile(dialect=dialeto, compile_kwargs={'literal_binds': True}))
+                plano = [str(linha[-1]) for linha in conexao.exec_driver_sql(prefixo + sql)]
+                sequenciais = [m.group(1) for linha in plano
+                               for m in [varredura.search(linha.strip())] if m]
+                if sequenciais:
+                    sucesso = False
+                print(f"   {'❌' if sequenciais else '✅'} {nome}: {' | '.join(p.strip() for p in plano)}")
+
+    print("\n🎉 Todas as consultas usam índices!" if sucesso
+          else "\n💥 Há consultas com varredura sequencial!")
+    return sucesso
+
+
+def bench_vendas_concorrentes(total_vendas=300, threads=16, produtos=5, estoque=150):
+    """Dispara vendas paralelas e verifica que o estoque nunca é vendido a mais"""
+    app, db = preparar_banco()
+    from app import Produto, Venda, ItemVenda
+
+    with app.app_context():
+        for i in range(produtos):
+            db.session.add(Produto(
+                nome=f"Produto Concorrente {i + 1}",
+                preco=1 + i,
+                estoque=estoque,
+                codigo_barras=f"7890000000{i:03d}",
+                categoria='Outros'
+            ))
+        db.session.commit()
+        ids = [p.id for p in Produto.query.order_by(Produto.id).all()]
+
+    print(f"🏁 {total_vendas} vendas em {threads} threads sobre {produtos} produtos "
+          f"com {estoque} unidades cada...")
+
+    resultados = {'sucesso': 0, 'recusada': 0, 'erro': 0}
+    lock = threading.Lock()
+    fila = list(range(total_vendas))
+
+    def caixa(semente):
+        aleatorio = random.Random(semente)
+        cliente = cliente_logado(app)
+        while True:
+            with lock:
+                if not fila:
+                    return
+                fila.pop()
+            itens = [{'id': produto_id, 'quantidade': aleatorio.randint(1, 3)}
+                     for produto_id in aleatorio.sample(ids, aleatorio.randint(1, min(3, len(ids))))]
+            dados = cliente.post('/api/venda', json={'itens': itens}).get_json()
+            with lock:
+                if dados.get('success'):
+                    resultados['sucesso'] += 1
+                elif 'Estoque insuficiente' in dados.get('message', ''):
+                    resultados['recusada'] += 1
+                else:
+                    resultados['erro'] += 1
+
+    inicio = time.perf_counter()
+    trabalhadores = [threading.Thread(target=caixa, args=(n,)) for n in range(threads)]
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    # Verificar a consistência entre estoque e itens vendidos
+    consistente = True
+    with app.app_context():
+        vendidos = dict(db.session.query(
+            ItemVenda.produto_id, db.func.sum(ItemVenda.quantidade)
+        ).group_by(ItemVenda.produto_id).all())
+        for produto in Produto.query.order_by(Produto.id).all():
+            esperado = estoque - (vendidos.get(produto.id) or 0)
+            if produto.estoque < 0 or produto.estoque != esperado:
+                consistente = False
+                print(f"❌ {produto.nome}: estoque {produto.estoque}, esperado {esperado}")
+        total_registradas = Venda.query.count()
+        if total_registradas != resultados['sucesso']:
+            consistente = False
+            print(f"❌ {total_registradas} vendas gravadas para {resultados['sucesso']} confirmadas")
+
+    print(f"\n⏱️  Duração: {duracao:.2f}s ({total_vendas / duracao:.1f} vendas/s)")
+    print(f"✅ Concluídas: {resultados['sucesso']}")
+    print(f"⚠️  Recusadas por estoque: {resultados['recusada']}")
+    print(f"❌ Erros: {resultados['erro']}")
+    print("🎉 Estoque consistente!" if consistente else "💥 Estoque INCONSISTENTE!")
+    return consistente
+
+
+def vendas_para_nota(tamanhos):
+    """Prepara o banco com uma venda para cada quantidade de itens"""
+    os.environ['RECIBOS_CACHE_DIR'] = tempfile.mkdtemp(prefix='supermercado_recibos_')
+    os.environ['RECIBOS_PRE_RENDERIZAR'] = '0'
+    app, db = preparar_banco()
+    from app import Produto, Usuario
+    from app.vendas import registrar_venda
+
+    with app.app_context():
+        gerar_catalogo(db, max(tamanhos))
+        db.session.execute(db.update(Produto).values(estoque=1000))
+        db.session.commit()
+        operador_id = Usuario.query.filter_by(login='operador').first().id
+        vendas = {}
+        for tamanho in tamanhos:
+            itens = [{'id': produto_id, 'quantidade': 1} for produto_id in range(1, tamanho + 1)]
+            vendas[tamanho] = registrar_venda(operador_id, itens).id
+    return app, db, vendas
+
+
+def bench_nota_fiscal(tamanhos=(1, 10, 50, 200, 1000), repeticoes=5):
+    """Mede a geração da nota fiscal em PDF conforme a quantidade de itens"""
+    app, db, vendas = vendas_para_nota(tamanhos)
+    from sqlalchemy import event
+    from app.notas import carregar_nota_fiscal
+    from app.caches import cache_recibos
+    from app.recibos import renderizar_pdf
+
+    with app.app_context():
+        consultas = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(1))
+
+    cliente = cliente_logado(app)
+    limite_cache = cache_recibos.tamanho_maximo
+
+    print(f"🧾 Nota fiscal em PDF ({repeticoes} repetições por tamanho)")
+    print(f"   {'itens':>6} {'páginas':>8} {'consultas':>10} {'carregar':>10} "
+          f"{'renderizar':>11} {'sem cache':>10} {'com cache':>10}")
+    for tamanho, venda_id in vendas.items():
+        carregar, renderizar, sem_cache, com_cache = [], [], [], []
+        with app.app_context():
+            for _ in range(repeticoes):
+                del consultas[:]
+                inicio = time.perf_counter()
+                nota = carregar_nota_fiscal(venda_id)
+                carregar.append(time.perf_counter() - inicio)
+                total_consultas = len(consultas)
+
+                inicio = time.perf_counter()
+                pdf = renderizar_pdf(nota)
+                renderizar.append(time.perf_counter() - inicio)
+
+        # Requisição completa: cache desligado e, depois, com a nota já gravada
+        cache_recibos.tamanho_maximo = 0
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            cliente.get(f'/api/nota-fiscal/{venda_id}')
+            sem_cache.append(time.perf_counter() - inicio)
+        cache_recibos.tamanho_maximo = limite_cache
+        cliente.get(f'/api/nota-fiscal/{venda_id}')
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            cliente.get(f'/api/nota-fiscal/{venda_id}')
+            com_cache.append(time.perf_counter() - inicio)
+
+        print(f"   {tamanho:>6} {pdf.count(b'/Type /Page') - pdf.count(b'/Type /Pages'):>8} "
+              f"{total_consultas:>10} {percentil(carregar, 50) * 1000:>8.2f}ms "
+              f"{percentil(renderizar, 50) * 1000:>9.2f}ms {percentil(sem_cache, 50) * 1000:>8.2f}ms "
+              f"{percentil(com_cache, 50) * 1000:>8.2f}ms")
+
+    print(f"\n📊 Cache de notas: {cache_recibos.stats()}")
+
+
+def bench_formatos_nota(tamanhos=(10, 50, 200, 1000), repeticoes=10):
+    """Compara tempo de geração e tamanho da nota em PDF, texto e ESC/POS"""
+    app, db, vendas = vendas_para_nota(tamanhos)
+    from app.notas import carregar_nota_fiscal
+    from app.recibos import renderizar_pdf, renderizar_texto, renderizar_escpos
+
+    formatos = {
+        'pdf': renderizar_pdf,
+        'texto 40 col.': lambda nota: ''.join(renderizar_texto(nota, 40)).encode('utf-8'),
+        'texto 48 col.': lambda nota: ''.join(renderizar_texto(nota, 48)).encode('utf-8'),
+        'escpos 48 col.': lambda nota: b''.join(renderizar_escpos(nota, 48)),
+    }
+
+    print(f"🧾 Formatos da nota fiscal ({repeticoes} repetições, mediana da geração)")
+    print(f"   {'itens':>6} {'formato':<16} {'geração':>10} {'tamanho':>12}")
+    for tamanho, venda_id in vendas.items():
+        with app.app_context():
+            nota = carregar_nota_fiscal(venda_id)
+        for nome, renderizar in formatos.items():
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                dados = renderizar(nota)
+                tempos.append(time.perf_counter() - inicio)
+            print(f"   {tamanho:>6} {nome:<16} {percentil(tempos, 50) * 1000:>8.3f}ms "
+                  f"{len(dados):>10,} B")
+
+
+def tamanho_tabela(db, tabela):
+    """Bytes ocupados por uma tabela (com índices no PostgreSQL), ou None"""
+    dialeto = db.engine.dialect.name
+    with db.engine.connect() as conexao:
+        if dialeto == 'postgresql':
+            return conexao.execute(db.text("SELECT pg_total_relation_size(:t)"), {'t': tabela}).scalar()
+        if dialeto == 'sqlite':
+            return conexao.execute(db.text(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name = :t"), {'t': tabela}).scalar()
+    return None
+
+
+def bench_itens_json(vendas=1000000, amostras=500):
+    """Mede o tamanho de vendas e a latência de inserção antes/depois de remover itens_json"""
+    app, db = preparar_banco()
+    import json
+    from datetime import datetime, timedelta
+    from app import Produto
+    from app import migracoes
+
+    aleatorio = random.Random(11)
+    with app.app_context():
+        gerar_catalogo(db, 1000)
+        precos = dict(db.session.query(Produto.id, Produto.preco).all())
+        ids = list(precos)
+
+        # Esquema anterior: coluna itens_json presente e migração 5 pendente
+        with db.engine.begin() as conexao:
+            conexao.exec_driver_sql("ALTER TABLE vendas ADD COLUMN itens_json TEXT")
+            conexao.exec_driver_sql("DELETE FROM schema_versao WHERE versao = 5")
+
+        def nova_venda(venda_id):
+            itens = []
+            for produto_id in aleatorio.sample(ids, aleatorio.randint(1, 5)):
+                quantidade = aleatorio.randint(1, 4)
+                preco = float(precos[produto_id])
+                itens.append({'id': produto_id, 'nome': f'Produto {produto_id}', 'preco': preco,
+                              'quantidade': quantidade, 'subtotal': round(preco * quantidade, 2)})
+            return itens
+
+        print(f"📦 Gerando {vendas} vendas no formato antigo (10% só com o JSON)...")
+        inicio = time.perf_counter()
+        agora = datetime.utcnow()
+        lote_vendas, lote_itens = [], []
+        for venda_id in range(1, vendas + 1):
+            itens = nova_venda(venda_id)
+            lote_vendas.append({
+                'id': venda_id, 'operador_id': 2,
+                'data_venda': agora - timedelta(minutes=aleatorio.randint(0, 525600)),
+                'valor_total': round(sum(i['subtotal'] for i in itens), 2),
+                'itens_json': json.dumps(itens)
+            })
+            if aleatorio.random() >= 0.1:
+                lote_itens.extend({'venda_id': venda_id, 'produto_id': i['id'], 'quantidade': i['quantidade'],
+                                   'preco_unitario': i['preco'], 'subtotal': i['subtotal']} for i in itens)
+            if len(lote_vendas) >= 10000 or venda_id == vendas:
+                with db.engine.begin() as conexao:
+                    conexao.execute(db.text(
+                        "INSERT INTO vendas (id, operador_id, data_venda, valor_total, itens_json) "
+                        "VALUES (:id, :operador_id, :data_venda, :valor_total, :itens_json)"), lote_vendas)
+                    conexao.execute(db.text(
+                        "INSERT INTO itens_venda (venda_id, produto_id, quantidade, preco_unitario, subtotal) "
+                        "VALUES (:venda_id, :produto_id, :quantidade, :preco_unitario, :subtotal)"), lote_itens)
+                lote_vendas, lote_itens = [], []
+        print(f"   vendas criadas em {time.perf_counter() - inicio:.1f}s")
+
+        def medir_insercoes(primeiro_id, com_json):
+            latencias = []
+            for venda_id in range(primeiro_id, primeiro_id + amostras):
+                itens = nova_venda(venda_id)
+                colunas = "id, operador_id, data_venda, valor_total" + (", itens_json" if com_json else "")
+                valores = ":id, :operador_id, :data_venda, :valor_total" + (", :itens_json" if com_json else "")
+                inicio = time.perf_counter()
+                with db.engine.begin() as conexao:
+                    conexao.execute(db.text(f"INSERT INTO vendas ({colunas}) VALUES ({valores})"), {
+                        'id': venda_id, 'operador_id': 2, 'data_venda': datetime.utcnow(),
+                        'valor_total': round(sum(i['subtotal'] for i in itens), 2),
+                        'itens_json': json.dumps(itens)
+                    })
+                    conexao.execute(db.text(
+                        "INSERT INTO itens_venda (venda_id, produto_id, quantidade, preco_unitario, subtotal) "
+                        "VALUES (:venda_id, :produto_id, :quantidade, :preco_unitario, :subtotal)"),
+                        [{'venda_id': venda_id, 'produto_id': i['id'], 'quantidade': i['quantidade'],
+                          'preco_unitario': i['preco'], 'subtotal': i['subtotal']} for i in itens])
+                latencias.append(time.perf_counter() - inicio)
+            return latencias
+
+        antes = {tabela: tamanho_tabela(db, tabela) for tabela in ('vendas', 'itens_venda')}
+        insercao_antes = medir_insercoes(vendas + 1, com_json=True)
+
+        print("🔧 Aplicando a migração 5 e compactando...")
+        inicio = time.perf_counter()
+        migracoes.aplicar_migracoes(db)
+        migracao = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        migracoes.compactar(db)
+        compactacao = time.perf_counter() - inicio
+
+        depois = {tabela: tamanho_tabela(db, tabela) for tabela in ('vendas', 'itens_venda')}
+        insercao_depois = medir_insercoes(vendas + amostras + 1, com_json=False)
+
+        with db.engine.connect() as conexao:
+            sem_itens = conexao.execute(db.text(
+                "SELECT COUNT(*) FROM vendas v WHERE NOT EXISTS "
+                "(SELECT 1 FROM itens_venda i WHERE i.venda_id = v.id)")).scalar()
+
+    print(f"\n⏱️  Migração: {migracao:.1f}s, compactação: {compactacao:.1f}s")
+    for tabela in ('vendas', 'itens_venda'):
+        if antes[tabela] is not None:
+            print(f"   {tabela:<12} {antes[tabela] / 1048576:9.1f} MB -> {depois[tabela] / 1048576:9.1f} MB")
+    resumo_latencias('inserção com itens_json', insercao_antes)
+    resumo_latencias('inserção sem itens_json', insercao_depois)
+    print("🎉 Todas as vendas têm itens normalizados!" if sem_itens == 0
+          else f"💥 {sem_itens} vendas sem itens!")
+    return sem_itens == 0
+
+
+def bench_logins(operadores=50, rodadas=2, threads=16):
+    """Logins simultâneos (troca de turno) com cada algoritmo de hash de senha"""
+    app, db = preparar_banco()
+    from app import Usuario, modelos
+    from app.senhas import ConfiguracaoSenhas
+
+    configuracoes = [
+        ('pbkdf2 600k', 'pbkdf2', {'pbkdf2_iteracoes': 600000}),
+        ('pbkdf2 200k', 'pbkdf2', {'pbkdf2_iteracoes': 200000}),
+        ('bcrypt 12', 'bcrypt', {'bcrypt_rounds': 12}),
+        ('bcrypt 10', 'bcrypt', {'bcrypt_rounds': 10}),
+        ('argon2 t=3', 'argon2', {'argon2_tempo': 3}),
+    ]
+    with app.app_context():
+        for i in range(operadores):
+            db.session.add(Usuario(nome=f"Operador {i + 1}", login=f"turno{i + 1}",
+                                   senha_hash='-', tipo='operador'))
+        db.session.commit()
+
+    print(f"🔑 {operadores} operadores fazendo login ao mesmo tempo ({threads} threads, "
+          f"{rodadas} rodadas)")
+    sucesso = True
+    for rotulo, algoritmo, parametros in configuracoes:
+        try:
+            configuracao = ConfiguracaoSenhas(algoritmo, **parametros)
+        except RuntimeError as e:
+            print(f"   ⏭️  {rotulo}: {e}")
+            continue
+        modelos.configuracao_senhas = configuracao
+        with app.app_context():
+            for usuario in Usuario.query.filter(Usuario.login.like('turno%')):
+                usuario.set_password('senha123')
+            db.session.commit()
+
+        fila = [i % operadores + 1 for i in range(operadores * rodadas)]
+        latencias, falhas, recusados = [], [], []
+        lock = threading.Lock()
+
+        def caixa():
+            cliente = app.test_client()
+            while True:
+                with lock:
+                    if not fila:
+                        return
+                    numero = fila.pop()
+                inicio = time.perf_counter()
+                resposta = cliente.post('/login', json={'login': f'turno{numero}', 'senha': 'senha123'})
+                with lock:
+                    latencias.append(time.perf_counter() - inicio)
+                    # 503: sem vaga para verificar a senha dentro de SENHA_ESPERA (se definida)
+                    if resposta.status_code == 503:
+                        recusados.append(numero)
+                    elif not resposta.get_json().get('success'):
+                        falhas.append(numero)
+
+        inicio = time.perf_counter()
+        trabalhadores = [threading.Thread(target=caixa) for _ in range(threads)]
+        for trabalhador in trabalhadores:
+            trabalhador.start()
+        for trabalhador in trabalhadores:
+            trabalhador.join()
+        duracao = time.perf_counter() - inicio
+
+        print(f"   {rotulo:<12} {(len(latencias) - len(recusados)) / duracao:8.1f} logins/s, "
+              f"{len(falhas)} falhas, {len(recusados)} recusados (503)")
+        resumo_latencias(f'login {rotulo}', latencias)
+        sucesso = sucesso and not falhas
+
+    # Rehash no login: hashes antigos passam para o algoritmo configurado
+    modelos.configuracao_senhas = ConfiguracaoSenhas('pbkdf2', pbkdf2_iteracoes=100000)
+    cliente_logado(app, 'turno1', 'senha123')
+    with app.app_context():
+        atualizado = Usuario.query.filter_by(login='turno1').first().senha_hash
+    rehash = atualizado.startswith('pbkdf2:sha256:100000$')
+    print("🔁 Rehash no login: " + ("ok" if rehash else f"FALHOU ({atualizado[:20]}...)"))
+    return sucesso and rehash
+
+
+def requisitar(opener, url, dados=None):
+    """Requisição HTTP com corpo JSON opcional; retorna o JSON da resposta"""
+    corpo = json.dumps(dados).encode('utf-8') if dados is not None else None
+    cabecalhos = {'Content-Type': 'application/json'} if corpo is not None else {}
+    with opener.open(urllib.request.Request(url, data=corpo, headers=cabecalhos), timeout=30) as resposta:
+        return json.loads(resposta.read())
+
+
+def aguardar_servidor(base, processo, limite=60):
+    """Aguarda o servidor responder (ou encerrar com erro)"""
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            return False
+        try:
+            urllib.request.urlopen(base + '/login', timeout=2).read()
+            return True
+        except urllib.error.HTTPError:
+            return True  # respondeu, mesmo que com erro
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.3)
+    return False
+
+
+def bench_servidor(duracao=15, clientes=16, produtos=2000):
+    """Leituras de código de barras e vendas por HTTP: servidor de desenvolvimento x produção"""
+    app, db = preparar_banco()
+    from app import Produto
+
+    with app.app_context():
+        gerar_catalogo(db, produtos)
+        db.session.execute(db.update(Produto).values(estoque=1000000))
+        db.session.commit()
+        db.engine.dispose()
+
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    modos = {
+        'desenvolvimento': [sys.executable, '-c',
+                            "import os; from app import create_app; app = create_app(); "
+                            "app.run(host='127.0.0.1', port=int(os.environ['WEB_PORTA']), "
+                            "debug=True, use_reloader=False)"],
+        'producao': [sys.executable, 'start.py', 'producao'],
+    }
+
+    print(f"🌐 {clientes} clientes por {duracao}s: 90% leituras de código de barras, 10% vendas")
+    resultados = {}
+    for porta, (modo, comando) in enumerate(modos.items(), start=5101):
+        ambiente = dict(os.environ, WEB_HOST='127.0.0.1', WEB_PORTA=str(porta),
+                        RECIBOS_PRE_RENDERIZAR='0')
+        processo = subprocess.Popen(comando, cwd=diretorio, env=ambiente,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base = f"http://127.0.0.1:{porta}"
+        try:
+            if not aguardar_servidor(base, processo):
+                print(f"   ❌ {modo}: servidor não iniciou")
+                continue
+
+            leituras, vendas, erros = [], [], [0]
+            lock = threading.Lock()
+            fim = time.monotonic() + duracao
+
+            def caixa(semente):
+                aleatorio = random.Random(semente)
+                opener = urllib.request.build_opener(
+                    urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+                requisitar(opener, base + '/login', {'login': 'operador', 'senha': 'op123'})
+                while time.monotonic() < fim:
+                    inicio = time.perf_counter()
+                    try:
+                        if aleatorio.random() < 0.9:
+                            codigo = f"789{aleatorio.randrange(produtos):010d}"
+                            ok = requisitar(opener, f"{base}/api/produto/{codigo}").get('success')
+                            destino = leituras
+                        else:
+                            itens = [{'id': aleatorio.randint(1, produtos), 'quantidade': 1}
+                                     for _ in range(aleatorio.randint(1, 5))]
+                            ok = requisitar(opener, base + '/api/venda', {'itens': itens}).get('success')
+                            destino = vendas
+                    except (urllib.error.URLError, ConnectionError, ValueError):
+                        ok = False
+                    with lock:
+                        if ok:
+                            destino.append(time.perf_counter() - inicio)
+                        else:
+                            erros[0] += 1
+
+            trabalhadores = [threading.Thread(target=caixa, args=(i,)) for i in range(clientes)]
+            for trabalhador in trabalhadores:
+                trabalhador.start()
+            for trabalhador in trabalhadores:
+                trabalhador.join()
+
+            total = len(leituras) + len(vendas)
+            resultados[modo] = total / duracao
+            print(f"\n   {modo}: {total / duracao:.1f} req/s ({len(vendas) / duracao:.1f} vendas/s), "
+                  f"{erros[0]} erros")
+            resumo_latencias('GET /api/produto/<codigo>', leituras)
+            resumo_latencias('POST /api/venda', vendas)
+        finally:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    if len(resultados) == 2 and resultados['desenvolvimento']:
+        print(f"\n📈 Produção/desenvolvimento: {resultados['producao'] / resultados['desenvolvimento']:.2f}x")
+    return len(resultados) == 2
+
+
+# Importações que o app.py fazia no carregamento antes da fábrica create_app
+IMPORTACOES_ANTIGAS = (
+    "import barcode; from barcode.writer import ImageWriter; "
+    "from reportlab.lib.pagesizes import letter; from reportlab.pdfgen import canvas; "
+)
+
+MEDIR_INICIALIZACAO = (
+    "import resource, sys, time; inicio = time.perf_counter(); "
+    "{importacoes}from app import create_app; create_app(); "
+    "fim = time.perf_counter(); memoria = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss; "
+    "from reportlab.pdfgen import canvas; adiado = time.perf_counter() - fim; "
+    "print(fim - inicio, memoria, adiado)"
+)
+
+
+def bench_inicializacao(repeticoes=10):
+    """Tempo de inicialização e memória de cada processo (worker) com e sem as importações pesadas"""
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    ambiente = dict(os.environ, DATABASE_URL='sqlite://')
+    cenarios = {
+        'importações antecipadas (antes)': IMPORTACOES_ANTIGAS,
+        'create_app + importação sob demanda': '',
+    }
+
+    print(f"🚀 Inicialização a frio, {repeticoes} processos por cenário (alternados)")
+    medidas = {nome: ([], [], []) for nome in cenarios}
+    for _ in range(repeticoes):
+        for nome, importacoes in cenarios.items():
+            saida = subprocess.run([sys.executable, '-c', MEDIR_INICIALIZACAO.format(importacoes=importacoes)],
+                                   cwd=diretorio, env=ambiente, capture_output=True, text=True, check=True)
+            tempo, memoria, adiado = saida.stdout.split()[-3:]
+            medidas[nome][0].append(float(tempo))
+            medidas[nome][1].append(int(memoria) / 1024)
+            medidas[nome][2].append(float(adiado))
+
+    resultados = {}
+    for nome, (tempos, memorias, adiados) in medidas.items():
+        resultados[nome] = (percentil(tempos, 50), percentil(memorias, 50))
+        print(f"\n   {nome}:")
+        print(f"      inicialização: {min(tempos) * 1000:.0f} ms (mín) / {percentil(tempos, 50) * 1000:.0f} ms (mediana)")
+        print(f"      memória (RSS máx.): {percentil(memorias, 50):.1f} MB")
+        if not cenarios[nome]:
+            print(f"      ReportLab na primeira nota fiscal: +{percentil(adiados, 50) * 1000:.0f} ms")
+
+    # Módulos mais pesados na inicialização atual
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', "from app import create_app; create_app()"],
+                           cwd=diretorio, env=ambiente, capture_output=True, text=True, check=True)
+    modulos = []
+    for linha in saida.stderr.splitlines():
+        partes = linha.split('|')
+        # Apenas o pacote app e o que ele importa diretamente
+        if len(partes) == 3 and partes[1].strip().isdigit() and len(partes[2]) - len(partes[2].lstrip()) <= 3:
+            modulos.append((int(partes[1]), partes[2].strip()))
+    print("\n   Importações mais lentas (python -X importtime, tempo acumulado):")
+    for cumulativo, modulo in sorted(modulos, reverse=True)[:8]:
+        print(f"      {cumulativo / 1000:7.1f} ms  {modulo}")
+
+    antes, depois = resultados.values()
+    print(f"\n📈 Inicialização {antes[0] / depois[0]:.2f}x mais rápida, "
+          f"{antes[1] - depois[1]:.1f} MB a menos por worker")
+    return True
+
+
+def memoria_maxima_mb():
+    """Pico de memória residente do processo (Linux/macOS)"""
+    import resource
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == 'darwin' else maximo / 1024
+
+
+def bench_catalogo(linhas=100000, linha_a_linha=5000):
+    """Importação e exportação do catálogo em CSV e JSON (upsert em lote x linha a linha)"""
+    app, db = preparar_banco()
+    import csv
+    from app import Produto
+    from app.catalogo import ler_catalogo, importar_catalogo, exportar_catalogo, validar_produto
+
+    aleatorio = random.Random(15)
+    diretorio = tempfile.mkdtemp(prefix='supermercado_catalogo_')
+    caminhos = {'csv': os.path.join(diretorio, 'catalogo.csv'),
+                'json': os.path.join(diretorio, 'catalogo.json')}
+
+    # Arquivos do fornecedor, gravados linha a linha (preço no formato brasileiro no CSV)
+    with open(caminhos['csv'], 'w', encoding='utf-8', newline='') as arquivo_csv, \
+            open(caminhos['json'], 'w', encoding='utf-8') as arquivo_json:
+        escritor = csv.writer(arquivo_csv, delimiter=';')
+        escritor.writerow(['codigo_barras', 'nome', 'preco', 'estoque', 'categoria'])
+        arquivo_json.write('[')
+        for i in range(linhas):
+            base, categoria = aleatorio.choice(PRODUTOS_BASE)
+            nome = f"{base} {aleatorio.choice(MARCAS)} {aleatorio.choice(TAMANHOS)}"
+            preco = round(aleatorio.uniform(1, 80), 2)
+            estoque = aleatorio.randint(0, 500)
+            escritor.writerow([f"789{i:010d}", nome, f"{preco:.2f}".replace('.', ','), estoque, categoria])
+            arquivo_json.write(('\n' if i == 0 else ',\n') + json.dumps(
+                {'codigo_barras': f"789{i:010d}", 'nome': nome, 'preco': preco,
+                 'estoque': estoque, 'categoria': categoria}, ensure_ascii=False))
+        arquivo_json.write('\n]\n')
+
+    print(f"📦 Catálogo de {linhas} linhas ({os.path.getsize(caminhos['csv']) / 1024 / 1024:.1f} MB em CSV, "
+          f"{os.path.getsize(caminhos['json']) / 1024 / 1024:.1f} MB em JSON)\n")
+    print(f"   {'operação':<34} {'tempo':>8} {'linhas/s':>10} {'pico RSS':>9}")
+
+    def medir(nome, funcao):
+        memoria = memoria_maxima_mb()
+        inicio = time.perf_counter()
+        resultado = funcao()
+        duracao = time.perf_counter() - inicio
+        print(f"   {nome:<34} {duracao:7.2f}s {linhas / duracao:10.0f} {memoria_maxima_mb() - memoria:+7.1f}MB")
+        return resultado
+
+    def importar(formato):
+        with open(caminhos[formato], encoding='utf-8-sig', newline='') as arquivo:
+            return importar_catalogo(ler_catalogo(arquivo, formato))
+
+    def exportar(formato):
+        with open(os.path.join(diretorio, f'exportado.{formato}'), 'w', encoding='utf-8', newline='') as arquivo:
+            for bloco in exportar_catalogo(formato):
+                arquivo.write(bloco)
+
+    ok = True
+    with app.app_context():
+        relatorios = [
+            medir('importar CSV (banco vazio)', lambda: importar('csv')),
+            medir('importar CSV (tudo atualização)', lambda: importar('csv')),
+            medir('importar JSON (tudo atualização)', lambda: importar('json')),
+        ]
+        medir('exportar CSV', lambda: exportar('csv'))
+        medir('exportar JSON', lambda: exportar('json'))
+
+        esperado = [(linhas, 0), (0, linhas), (0, linhas)]
+        obtido = [(r['inseridos'], r['atualizados']) for r in relatorios]
+        if obtido != esperado or any(r['total_erros'] for r in relatorios):
+            print(f"\n   ❌ Contagens inesperadas: {obtido}")
+            ok = False
+        if Produto.query.count() != linhas:
+            print("\n   ❌ Quantidade de produtos diferente do arquivo")
+            ok = False
+
+        # Reimportar o que foi exportado não pode alterar nada
+        with open(os.path.join(diretorio, 'exportado.csv'), encoding='utf-8', newline='') as arquivo:
+            relatorio = importar_catalogo(ler_catalogo(arquivo, 'csv'))
+        if relatorio['atualizados'] != linhas or relatorio['total_erros']:
+            print(f"\n   ❌ Reimportação da exportação falhou: {relatorio}")
+            ok = False
+
+        # Comparação: uma consulta e um INSERT/UPDATE por produto, como no cadastro manual
+        amostra = min(linhas, linha_a_linha)
+        db.session.execute(db.delete(Produto))
+        db.session.commit()
+        with open(caminhos['csv'], encoding='utf-8-sig', newline='') as arquivo:
+            inicio = time.perf_counter()
+            for numero, dados in ler_catalogo(arquivo, 'csv'):
+                if numero > amostra + 1:
+                    break
+                produto = validar_produto(dados)
+                existente = Produto.query.filter_by(codigo_barras=produto['codigo_barras']).first()
+                if existente is None:
+                    existente = Produto(codigo_barras=produto['codigo_barras'])
+                    db.session.add(existente)
+                existente.nome, existente.preco = produto['nome'], produto['preco']
+                existente.estoque, existente.categoria = produto['estoque'], produto['categoria']
+                db.session.commit()
+            duracao = time.perf_counter() - inicio
+        print(f"\n   Linha a linha ({amostra} linhas): {amostra / duracao:.0f} linhas/s")
+
+    print(f"\n📁 Arquivos em {diretorio}")
+    return ok
+
+
+# ==================== CARGA SINTÉTICA DO PDV ====================
+
+# Distribuição das vendas ao longo do dia (0h a 23h), com picos no almoço e no fim da tarde
+MOVIMENTO_POR_HORA = [0, 0, 0, 0, 0, 0, 1, 3, 5, 6, 7, 8, 9, 7, 6, 6, 7, 9, 10, 9, 7, 4, 2, 1]
+
+
+def popularidade(ids, expoente=1.1, semente=16):
+    """Pesos acumulados de uma distribuição de Zipf sobre os produtos
+
+    Poucos produtos concentram a maior parte das vendas, como em um
+    supermercado real; a ordem de popularidade é embaralhada para não
+    coincidir com a ordem dos ids.
+    """
+    ordem = list(ids)
+    random.Random(semente).shuffle(ordem)
+    acumulado, total = [], 0.0
+    for posicao in range(len(ordem)):
+        total += 1 / (posicao + 1) ** expoente
+        acumulado.append(total)
+    return ordem, acumulado
+
+
+def gerar_operadores(db, quantidade):
+    """Cria operadores caixa01, caixa02... (senha op123) e retorna os ids"""
+    from app.modelos import Usuario, configuracao_senhas
+
+    senha_hash = configuracao_senhas.gerar_hash('op123')
+    existentes = {u.login: u.id for u in Usuario.query.filter(Usuario.login.like('caixa%'))}
+    novos = [{'nome': f'Caixa {i:02d}', 'login': f'caixa{i:02d}', 'senha_hash': senha_hash,
+              'tipo': 'operador', 'ativo': True}
+             for i in range(1, quantidade + 1) if f'caixa{i:02d}' not in existentes]
+    if novos:
+        db.session.execute(Usuario.__table__.insert(), novos)
+        db.session.commit()
+    return [u.id for u in Usuario.query.filter(Usuario.login.like('caixa%')).order_by(Usuario.id)][:quantidade]
+
+
+def gerar_historico_vendas(db, vendas, operadores, dias=365, semente=16, em_ordem=False):
+    """Insere vendas e itens com cestas de tamanho variável e popularidade enviesada
+
+    As vendas se espalham pelos últimos `dias` (incluindo hoje) seguindo o
+    movimento por hora; com `em_ordem`, os ids crescem com a data, como numa
+    loja real. Os resumos dos relatórios são reconstruídos no fim.
+    """
+    from datetime import datetime, timedelta
+    from app import Produto, Venda, ItemVenda
+    from app.relatorios import reconstruir_resumos
+
+    aleatorio = random.Random(semente)
+    precos = dict(db.session.query(Produto.id, Produto.preco).all())
+    ordem, acumulado = popularidade(precos)
+    primeiro_id = (db.session.query(db.func.max(Venda.id)).scalar() or 0) + 1
+    hoje = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    # Histórico já confirmado: fora do horizonte da exportação
+    gravadas_em = datetime.utcnow() - timedelta(hours=1)
+    horas = list(range(24))
+
+    inicio = time.perf_counter()
+    lote_vendas, lote_itens, total_itens = [], [], 0
+    for venda_id in range(primeiro_id, primeiro_id + vendas):
+        # Cesta: maioria pequena, algumas compras de mês
+        tamanho = min(40, 1 + int(aleatorio.expovariate(1 / 4)))
+        cesta = {}
+        for produto_id in aleatorio.choices(ordem, cum_weights=acumulado, k=tamanho):
+            cesta[produto_id] = cesta.get(produto_id, 0) + (1 if aleatorio.random() < 0.8 else aleatorio.randint(2, 6))
+
+        valor_total = 0
+        for produto_id, quantidade in cesta.items():
+            subtotal = precos[produto_id] * quantidade
+            valor_total += subtotal
+            lote_itens.append({'venda_id': venda_id, 'produto_id': produto_id, 'quantidade': quantidade,
+                               'preco_unitario': precos[produto_id], 'subtotal': subtotal})
+        hora = aleatorio.choices(horas, weights=MOVIMENTO_POR_HORA)[0]
+        dia = dias - 1 - (venda_id - primeiro_id) * dias // vendas if em_ordem else aleatorio.randrange(dias)
+        lote_vendas.append({
+            'id': venda_id, 'operador_id': aleatorio.choice(operadores), 'valor_total': valor_total,
+            'gravada_em': gravadas_em,
+            'data_venda': (hoje - timedelta(days=dia)).replace(hour=hora)
+                          + timedelta(seconds=aleatorio.randrange(3600))
+        })
+
+        if len(lote_vendas) >= 10000 or venda_id == primeiro_id + vendas - 1:
+            with db.engine.begin() as conexao:
+                conexao.execute(Venda.__table__.insert(), lote_vendas)
+                conexao.execute(ItemVenda.__table__.insert(), lote_itens)
+            total_itens += len(lote_itens)
+            lote_vendas, lote_itens = [], []
+            feitas = venda_id - primeiro_id + 1
+            if feitas % 100000 == 0 or feitas == vendas:
+                print(f"   {feitas} vendas / {total_itens} itens ({time.perf_counter() - inicio:.0f}s)")
+
+    reconstruir_resumos()
+    return total_itens
+
+
+class ClienteTeste:
+    """Cliente do PDV sobre o test client do Flask (sem rede)"""
+
+    def __init__(self, app):
+        self.cliente = app.test_client()
+
+    def requisitar(self, metodo, caminho, dados=None):
+        resposta = self.cliente.open(caminho, method=metodo, json=dados)
+        corpo = resposta.get_json(silent=True) if resposta.is_json else resposta.data
+        return resposta.status_code, corpo
+
+    def entrar(self, login, senha):
+        def tentar():
+            resposta = self.cliente.post('/login', json={'login': login, 'senha': senha})
+            return resposta.status_code, resposta.headers.get('Retry-After'), resposta.get_json(silent=True)
+        return entrar(tentar)
+
+
+class ClienteHttp:
+    """Cliente do PDV por HTTP, com cookies de sessão"""
+
+    def __init__(self, base):
+        self.base = base
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def requisitar(self, metodo, caminho, dados=None):
+        corpo = json.dumps(dados).encode('utf-8') if dados is not None else None
+        requisicao = urllib.request.Request(self.base + caminho, data=corpo, method=metodo,
+                                            headers={'Content-Type': 'application/json'} if corpo else {})
+        try:
+            with self.opener.open(requisicao, timeout=30) as resposta:
+                conteudo = resposta.read()
+                status = resposta.status
+                tipo = resposta.headers.get('Content-Type', '')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+        return status, json.loads(conteudo) if tipo.startswith('application/json') else conteudo
+
+    def entrar(self, login, senha):
+        def tentar():
+            requisicao = urllib.request.Request(
+                self.base + '/login', data=json.dumps({'login': login, 'senha': senha}).encode('utf-8'),
+                method='POST', headers={'Content-Type': 'application/json'})
+            try:
+                with self.opener.open(requisicao, timeout=30) as resposta:
+                    return resposta.status, None, json.loads(resposta.read())
+            except urllib.error.HTTPError as e:
+                return e.code, e.headers.get('Retry-After'), None
+        return entrar(tentar)
+
+
+def simular_pdv(criar_cliente, codigos, acumulado, duracao, caixas, semente=16):
+    """Caixas (escanear, buscar, finalizar, imprimir) e um gerente no dashboard em paralelo
+
+    Retorna {endpoint: [latências]} e o número de erros por endpoint.
+    """
+    latencias, erros = {}, {}
+    lock = threading.Lock()
+    fim = time.monotonic() + duracao
+
+    def medir(cliente, endpoint, metodo, caminho, dados=None, esperado=None):
+        inicio = time.perf_counter()
+        try:
+            status, corpo = cliente.requisitar(metodo, caminho, dados)
+            ok = status == 200 and (esperado is None or esperado(corpo))
+        except (urllib.error.URLError, ConnectionError, ValueError):
+            ok, corpo = False, None
+        duracao_requisicao = time.perf_counter() - inicio
+        with lock:
+            if ok:
+                latencias.setdefault(endpoint, []).append(duracao_requisicao)
+            else:
+                erros[endpoint] = erros.get(endpoint, 0) + 1
+        return corpo if ok else None
+
+    def sucesso(corpo):
+        return isinstance(corpo, dict) and corpo.get('success')
+
+    def caixa(numero):
+        aleatorio = random.Random(semente + numero)
+        cliente = criar_cliente()
+        login = f'caixa{numero:02d}'
+        if not cliente.entrar(login, 'op123'):
+            raise RuntimeError(f"Falha no login de '{login}'")
+
+        while time.monotonic() < fim:
+            itens = {}
+            for codigo, produto_id in aleatorio.choices(codigos, cum_weights=acumulado,
+                                                        k=min(40, 1 + int(aleatorio.expovariate(1 / 4)))):
+                if aleatorio.random() < 0.05:
+                    # Etiqueta ilegível: o operador busca pelo nome
+                    termo = aleatorio.choice(PRODUTOS_BASE)[0].split()[0][:4]
+                    medir(cliente, 'GET /api/produtos/busca', 'GET',
+                          f"/api/produtos/busca?q={urllib.parse.quote(termo)}")
+                corpo = medir(cliente, 'GET /api/produto/<codigo>', 'GET', f'/api/produto/{codigo}', esperado=sucesso)
+                if corpo:
+                    itens[produto_id] = itens.get(produto_id, 0) + 1
+
+            if not itens or time.monotonic() >= fim:
+                continue
+            corpo = medir(cliente, 'POST /api/venda', 'POST', '/api/venda',
+                          {'itens': [{'id': i, 'quantidade': q} for i, q in itens.items()]}, esperado=sucesso)
+            if corpo:
+                formato = 'pdf' if aleatorio.random() < 0.3 else 'escpos'
+                medir(cliente, f'GET /api/nota-fiscal ({formato})', 'GET',
+                      f"/api/nota-fiscal/{corpo['venda_id']}?formato={formato}")
+
+    def gerente():
+        aleatorio = random.Random(semente)
+        cliente = criar_cliente()
+        if not cliente.entrar('admin', 'admin123'):
+            raise RuntimeError("Falha no login do admin")
+        while time.monotonic() < fim:
+            medir(cliente, 'GET /admin', 'GET', '/admin')
+            medir(cliente, 'GET /api/dashboard/estatisticas', 'GET', '/api/dashboard/estatisticas', esperado=sucesso)
+            medir(cliente, 'GET /api/produtos (página)', 'GET',
+                  f"/api/produtos?limit=50&ordenar=nome&categoria={urllib.parse.quote(aleatorio.choice(PRODUTOS_BASE)[1])}",
+                  esperado=sucesso)
+            medir(cliente, 'GET /api/relatorios', 'GET', '/api/relatorios?agrupar=categoria', esperado=sucesso)
+            time.sleep(1)
+
+    trabalhadores = [threading.Thread(target=caixa, args=(i,)) for i in range(1, caixas + 1)]
+    trabalhadores.append(threading.Thread(target=gerente))
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    return latencias, erros
+
+
+def comparar_com_referencia(resultado, referencia, tolerancia=0.25, amostras_minimas=50):
+    """Lista as regressões de p95 e de vazão em relação a uma execução anterior
+
+    Endpoints com poucas amostras (como o dashboard) não são comparados: o
+    p95 deles é praticamente o pior caso e varia demais entre execuções.
+    """
+    regressoes = []
+    for endpoint, atual in resultado['endpoints'].items():
+        anterior = referencia.get('endpoints', {}).get(endpoint)
+        if not anterior or min(atual['requisicoes'], anterior['requisicoes']) < amostras_minimas:
+            continue
+        # Folga absoluta de 2ms para não acusar ruído em endpoints muito rápidos
+        if atual['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia) + 2:
+            regressoes.append(f"{endpoint}: p95 {anterior['p95_ms']:.1f} -> {atual['p95_ms']:.1f}ms")
+    if resultado['req_s'] < referencia.get('req_s', 0) * (1 - tolerancia):
+        regressoes.append(f"vazão {referencia['req_s']:.1f} -> {resultado['req_s']:.1f} req/s")
+    return regressoes
+
+
+def bench_pdv(produtos=100000, vendas=1000000, duracao=30, caixas=8):
+    """Carga realista do PDV sobre um histórico grande, com p50/p95/p99 por endpoint
+
+    Variáveis: BENCHMARK_ALVO=cliente (test client, padrão) ou servidor
+    (sobe `start.py producao`); BENCHMARK_REUSAR=1 reaproveita o banco de
+    BENCHMARK_DATABASE_URL se ele já tiver os dados; BENCHMARK_RESULTADO
+    grava o resultado em JSON e BENCHMARK_REFERENCIA compara com um
+    resultado anterior (falha se algum p95 ou a vazão piorar mais que
+    BENCHMARK_TOLERANCIA, padrão 0.25).
+    """
+    reusar = os.getenv('BENCHMARK_REUSAR') == '1' and bool(os.getenv('BENCHMARK_DATABASE_URL'))
+    alvo = os.getenv('BENCHMARK_ALVO', 'cliente')
+    if alvo not in ('cliente', 'servidor'):
+        print("❌ BENCHMARK_ALVO deve ser 'cliente' ou 'servidor'")
+        return False
+
+    app, db = preparar_banco(recriar=not reusar)
+    from app import Produto, Venda, init_db
+    from app import migracoes
+
+    with app.app_context():
+        existentes = Produto.query.count(), Venda.query.count()
+        if reusar and existentes[0] >= produtos and existentes[1] >= vendas:
+            print(f"♻️  Reaproveitando {existentes[0]} produtos e {existentes[1]} vendas")
+            operadores = gerar_operadores(db, caixas)
+        else:
+            if reusar:
+                migracoes.recriar_banco(db)
+                init_db()
+            operadores = gerar_operadores(db, caixas)
+            print(f"📦 Gerando {produtos} produtos...")
+            gerar_catalogo(db, produtos)
+            print(f"🧾 Gerando {vendas} vendas com popularidade enviesada...")
+            gerar_historico_vendas(db, vendas, operadores)
+
+        # Estoque suficiente para a simulação não esbarrar em falta de produto
+        db.session.execute(db.update(Produto).values(estoque=10000000, ativo=True))
+        db.session.commit()
+        linhas = db.session.execute(db.select(Produto.id, Produto.codigo_barras)).all()
+        ordem, acumulado = popularidade([linha.id for linha in linhas])
+        codigo_por_id = {linha.id: linha.codigo_barras for linha in linhas}
+        codigos = [(codigo_por_id[produto_id], produto_id) for produto_id in ordem]
+        db.engine.dispose()
+
+    processo = None
+    if alvo == 'servidor':
+        porta = 5102
+        processo = subprocess.Popen([sys.executable, 'start.py', 'producao'],
+                                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    env=dict(os.environ, WEB_HOST='127.0.0.1', WEB_PORTA=str(porta)),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base = f"http://127.0.0.1:{porta}"
+        if not aguardar_servidor(base, processo):
+            print("❌ Servidor não iniciou")
+            processo.terminate()
+            return False
+        criar_cliente = functools.partial(ClienteHttp, base)
+    else:
+        criar_cliente = functools.partial(ClienteTeste, app)
+
+    print(f"\n🛒 {caixas} caixas + 1 gerente por {duracao}s ({alvo})")
+    try:
+        latencias, erros = simular_pdv(criar_cliente, codigos, acumulado, duracao, caixas)
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    total = sum(len(amostras) for amostras in latencias.values())
+    resultado = {'alvo': alvo, 'produtos': produtos, 'vendas': vendas, 'caixas': caixas,
+                 'duracao': duracao, 'req_s': total / duracao, 'endpoints': {}}
+    print(f"\n   {'endpoint':<36} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'erros':>6}")
+    for endpoint in sorted(set(latencias) | set(erros)):
+        amostras = latencias.get(endpoint, [])
+        resultado['endpoints'][endpoint] = {
+            'requisicoes': len(amostras), 'erros': erros.get(endpoint, 0),
+            'p50_ms': percentil(amostras, 50) * 1000, 'p95_ms': percentil(amostras, 95) * 1000,
+            'p99_ms': percentil(amostras, 99) * 1000
+        }
+        dados = resultado['endpoints'][endpoint]
+        print(f"   {endpoint:<36} {len(amostras) / duracao:7.1f} {dados['p50_ms']:6.1f}ms "
+              f"{dados['p95_ms']:6.1f}ms {dados['p99_ms']:6.1f}ms {dados['erros']:6d}")
+    vendas_s = len(latencias.get('POST /api/venda', [])) / duracao
+    print(f"\n📈 {resultado['req_s']:.1f} req/s, {vendas_s * 60:.0f} vendas/min")
+
+    ok = not erros
+    if os.getenv('BENCHMARK_RESULTADO'):
+        with open(os.getenv('BENCHMARK_RESULTADO'), 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado gravado em {os.getenv('BENCHMARK_RESULTADO')}")
+    if os.getenv('BENCHMARK_REFERENCIA'):
+        with open(os.getenv('BENCHMARK_REFERENCIA'), encoding='utf-8') as arquivo:
+            referencia = json.load(arquivo)
+        diferentes = [c for c in ('alvo', 'produtos', 'vendas', 'caixas') if referencia.get(c) != resultado[c]]
+        if diferentes:
+            print(f"⚠️  Referência com outra configuração ({', '.join(diferentes)}): comparação ignorada")
+            regressoes = []
+        else:
+            regressoes = comparar_com_referencia(
+                resultado, referencia, tolerancia=float(os.getenv('BENCHMARK_TOLERANCIA', '0.25')))
+        for regressao in regressoes:
+            print(f"   ❌ Regressão: {regressao}")
+        if not regressoes and not diferentes:
+            print("✅ Sem regressões em relação à referência")
+        ok = ok and not regressoes
+    if erros:
+        print(f"   ❌ Erros: {erros}")
+    return ok
+
+
+def bench_metricas(requisicoes=3000):
+    """Custo das métricas por requisição: desativadas x ativadas"""
+    app, db = preparar_banco()
+    from app import create_app, Produto
+    from app.caches import cache_produtos
+
+    with app.app_context():
+        gerar_catalogo(db, 1000)
+        db.session.execute(db.update(Produto).values(estoque=10000000))
+        db.session.commit()
+
+    aplicacoes = {
+        'METRICAS=0': create_app({'METRICAS': False}),
+        'METRICAS=1': create_app({'METRICAS': True}),
+    }
+    cenarios = {
+        'GET /api/produto (cache)': lambda cliente, i: cliente.get('/api/produto/7890000000001'),
+        'GET /api/produto (banco)': lambda cliente, i: (cache_produtos.clear(),
+                                                        cliente.get(f'/api/produto/789{i % 1000:010d}')),
+        'POST /api/venda': lambda cliente, i: cliente.post('/api/venda', json={
+            'itens': [{'id': i % 1000 + 1, 'quantidade': 1}, {'id': (i * 7) % 1000 + 1, 'quantidade': 2}]}),
+    }
+
+    print(f"⏱️  {requisicoes} requisições por cenário (test client, mediana de 3 rodadas)\n")
+    print(f"   {'cenário':<28} {'METRICAS=0':>12} {'METRICAS=1':>12} {'custo':>10}")
+    for nome, requisitar_cenario in cenarios.items():
+        tempos = {}
+        for rotulo, aplicacao in aplicacoes.items():
+            cliente = cliente_logado(aplicacao)
+            quantidade = requisicoes if 'venda' not in nome else requisicoes // 10
+            rodadas = []
+            for _ in range(3):
+                inicio = time.perf_counter()
+                for i in range(quantidade):
+                    requisitar_cenario(cliente, i)
+                rodadas.append((time.perf_counter() - inicio) / quantidade)
+            tempos[rotulo] = sorted(rodadas)[1]
+        custo = tempos['METRICAS=1'] - tempos['METRICAS=0']
+        print(f"   {nome:<28} {tempos['METRICAS=0'] * 1e6:10.0f}µs {tempos['METRICAS=1'] * 1e6:10.0f}µs "
+              f"{custo * 1e6:+8.0f}µs")
+    return True
+
+
+def bench_sincronizacao(produtos=100000, alteracoes=100, vendas=500):
+    """Catálogo local do PDV: carga completa x delta e reenvio idempotente da fila de vendas"""
+    app, db = preparar_banco()
+    import uuid
+    from datetime import datetime, timedelta
+    from app import Produto, Venda
+
+    with app.app_context():
+        gerar_catalogo(db, produtos)
+        db.session.execute(db.update(Produto).values(estoque=10000000))
+        db.session.commit()
+
+    caixa = cliente_logado(app)
+    admin = cliente_logado(app, 'admin', 'admin123')
+
+    def sincronizar(posicao):
+        """Todas as páginas a partir da posição; retorna (posição, produtos, removidos, bytes, segundos)"""
+        recebidos = removidos = tamanho = 0
+        inicio = time.perf_counter()
+        while True:
+            resposta = caixa.get(f"/api/produtos/snapshot?desde={posicao['desde']}&apos_id={posicao['apos_id']}")
+            tamanho += len(resposta.data)
+            dados = resposta.get_json()
+            recebidos += len(dados['produtos'])
+            removidos += len(dados['removidos'])
+            posicao = dados['posicao']
+            if not dados['tem_mais']:
+                return posicao, recebidos, removidos, tamanho, time.perf_counter() - inicio
+
+    ok = True
+    print(f"📦 Catálogo de {produtos} produtos\n")
+    print(f"   {'operação':<36} {'tempo':>9} {'produtos':>9} {'tamanho':>10}")
+
+    inicio = time.perf_counter()
+    tamanho = len(caixa.get('/api/produtos').data)
+    print(f"   {'GET /api/produtos (lista completa)':<36} {time.perf_counter() - inicio:8.2f}s "
+          f"{produtos:9d} {tamanho / 1024:8.0f}KB")
+
+    posicao, recebidos, _, tamanho, duracao = sincronizar({'desde': 0, 'apos_id': 0})
+    print(f"   {'snapshot completo (paginado)':<36} {duracao:8.2f}s {recebidos:9d} {tamanho / 1024:8.0f}KB")
+    if recebidos != produtos:
+        print(f"   ❌ Snapshot trouxe {recebidos} de {produtos} produtos")
+        ok = False
+
+    _, recebidos, _, tamanho, duracao = sincronizar(posicao)
+    print(f"   {'delta sem alterações':<36} {duracao * 1000:7.1f}ms {recebidos:9d} {tamanho / 1024:8.1f}KB")
+
+    antes = posicao
+    aleatorio = random.Random(18)
+    alterados = aleatorio.sample(range(1, produtos + 1), alteracoes)
+    inativados = set(alterados[:alteracoes // 10])
+    for produto_id in alterados:
+        if produto_id in inativados:
+            admin.delete(f'/api/produtos/{produto_id}')
+        else:
+            admin.put(f'/api/produtos/{produto_id}', json={'preco': round(aleatorio.uniform(1, 80), 2)})
+    posicao, recebidos, removidos, tamanho, duracao = sincronizar(posicao)
+    print(f"   {f'delta após {alteracoes} alterações':<36} {duracao * 1000:7.1f}ms "
+          f"{recebidos + removidos:9d} {tamanho / 1024:8.1f}KB")
+    if (recebidos, removidos) != (alteracoes - len(inativados), len(inativados)):
+        print(f"   ❌ Delta trouxe {recebidos} alterados e {removidos} removidos")
+        ok = False
+
+    inicio = time.perf_counter()
+    resposta = caixa.get(f"/api/produtos/changes?since={antes['desde']}&after_id={antes['apos_id']}")
+    dados = resposta.get_json()
+    print(f"   {'GET /api/produtos/changes':<36} {(time.perf_counter() - inicio) * 1000:7.1f}ms "
+          f"{len(dados['alterados']) + len(dados['desativados']):9d} {len(resposta.data) / 1024:8.1f}KB")
+
+    # Fila offline: cada venda é enviada duas vezes (confirmação perdida na rede)
+    registrada_em = (datetime.utcnow() - timedelta(minutes=5)).isoformat()
+    fila = [{
+        'uuid': str(uuid.uuid4()),
+        'offline': True,
+        'registrada_em': registrada_em,
+        'itens': [{'id': aleatorio.randint(1, produtos), 'quantidade': aleatorio.randint(1, 3)}
+                  for _ in range(aleatorio.randint(1, 20))]
+    } for _ in range(vendas)]
+    for rotulo in ('reenvio da fila (novas)', 'reenvio da fila (duplicadas)'):
+        latencias = []
+        for venda in fila:
+            inicio = time.perf_counter()
+            resposta = caixa.post('/api/venda', json=venda).get_json()
+            latencias.append(time.perf_counter() - inicio)
+            if not resposta['success']:
+                print(f"   ❌ Venda recusada: {resposta['message']}")
+                ok = False
+                break
+        resumo_latencias(rotulo, latencias)
+
+    with app.app_context():
+        gravadas = db.session.scalar(db.select(db.func.count(Venda.id)))
+    if gravadas != vendas:
+        print(f"   ❌ {gravadas} vendas gravadas para {vendas} enviadas")
+        ok = False
+    return ok
+
+
+def bench_eventos(assinantes=300, alteracoes=200, produtos=2000):
+    """Eventos de estoque e preço (SSE): latência de entrega com muitas telas abertas"""
+    app, db = preparar_banco()
+    from app.eventos import canal_produtos
+
+    with app.app_context():
+        gerar_catalogo(db, produtos)
+        db.session.commit()
+
+    admin = cliente_logado(app, 'admin', 'admin123')
+    caixa = cliente_logado(app)
+
+    # Uma tela pela API (valida o endpoint); as demais direto no canal
+    resposta = caixa.get('/api/eventos/produtos', buffered=False)
+    if resposta.status_code != 200 or resposta.mimetype != 'text/event-stream':
+        print(f"   ❌ /api/eventos/produtos respondeu {resposta.status_code} {resposta.mimetype}")
+        return False
+    assinaturas = [iter(resposta.response)]
+    with app.app_context():
+        assinaturas += [canal_produtos.assinar(app) for _ in range(assinantes - 1)]
+
+    enviados = {}           # id do produto -> instante do commit da alteração
+    latencias = []
+    entregas = [0] * assinantes
+    lock = threading.Lock()
+    terminar = threading.Event()
+
+    def acompanhar(indice, assinatura):
+        for mensagem in assinatura:
+            chegada = time.perf_counter()
+            for bloco in mensagem.decode().split('\n\n'):
+                if 'event: produtos' not in bloco:
+                    continue
+                dados = json.loads(bloco.split('data: ', 1)[1])
+                with lock:
+                    for produto in dados:
+                        if produto['id'] in enviados:
+                            latencias.append(chegada - enviados[produto['id']])
+                            entregas[indice] += 1
+            if terminar.is_set() or entregas[indice] >= alteracoes:
+                break
+
+    threads = [threading.Thread(target=acompanhar, args=(i, a), daemon=True)
+               for i, a in enumerate(assinaturas)]
+    for thread in threads:
+        thread.start()
+
+    print(f"📡 {assinantes} telas conectadas, {alteracoes} alterações de preço\n")
+    aleatorio = random.Random(20)
+    ids = aleatorio.sample(range(1, produtos + 1), alteracoes)
+    escrita = []
+    for produto_id in ids:
+        inicio = time.perf_counter()
+        admin.put(f'/api/produtos/{produto_id}', json={'preco': round(aleatorio.uniform(1, 80), 2)})
+        with lock:
+            enviados[produto_id] = time.perf_counter()
+        escrita.append(enviados[produto_id] - inicio)
+        time.sleep(0.01)
+
+    limite = time.time() + 10
+    while time.time() < limite and sum(entregas) < assinantes * alteracoes:
+        time.sleep(0.05)
+    terminar.set()
+    for assinatura in assinaturas:
+        assinatura.close()
+
+    resumo_latencias('PUT /api/produtos/<id>', escrita)
+    resumo_latencias('entrega (commit -> tela)', latencias)
+    print(f"   lotes publicados: {canal_produtos.publicados} "
+          f"(uma consulta e uma serialização por lote, para todas as telas)")
+
+    # Alternativa: cada tela consultando o feed de alterações a cada segundo
+    inicio = time.perf_counter()
+    for _ in range(50):
+        caixa.get('/api/produtos/changes?since=0&after_id=0&limit=1')
+    consulta = (time.perf_counter() - inicio) / 50
+    print(f"   polling equivalente (1/s por tela): {assinantes} req/s, "
+          f"~{consulta * assinantes * 1000:.0f}ms de CPU por segundo")
+
+    esperado = assinantes * alteracoes
+    if sum(entregas) < esperado:
+        print(f"   ❌ {sum(entregas)} de {esperado} alterações entregues")
+        return False
+    return True
+
+
+def bench_lote(produtos=100000, itens=20, rodadas=100):
+    """Rajada de leituras: uma requisição por código x uma consulta em lote"""
+    app, db = preparar_banco()
+    from app import Produto
+    from app.caches import cache_produtos
+
+    with app.app_context():
+        gerar_catalogo(db, produtos)
+        db.session.commit()
+        codigos = db.session.scalars(db.select(Produto.codigo_barras)).all()
+
+    caixa = cliente_logado(app)
+    aleatorio = random.Random(21)
+    rajadas = [aleatorio.sample(codigos, itens) for _ in range(rodadas)]
+
+    print(f"🔎 {rodadas} rajadas de {itens} leituras em {produtos} produtos\n")
+    ok = True
+    for rotulo, cache_quente in (('cache vazio', False), ('cache quente', True)):
+        unitarias, lotes = [], []
+        for rajada in rajadas:
+            if not cache_quente:
+                cache_produtos.clear()
+            inicio = time.perf_counter()
+            for codigo in rajada:
+                caixa.get(f'/api/produto/{codigo}')
+            unitarias.append(time.perf_counter() - inicio)
+
+            if not cache_quente:
+                cache_produtos.clear()
+            inicio = time.perf_counter()
+            resposta = caixa.post('/api/produtos/lookup', json={'codigos_barras': rajada}).get_json()
+            lotes.append(time.perf_counter() - inicio)
+            if len(resposta['produtos']) != itens:
+                print(f"   ❌ Lote trouxe {len(resposta['produtos'])} de {itens} produtos")
+                ok = False
+        print(f"   {rotulo}:")
+        resumo_latencias(f'{itens} x GET /api/produto', unitarias)
+        resumo_latencias('POST /api/produtos/lookup', lotes)
+    return ok
+
+
+def bench_arquivo(vendas=300000, meses_mantidos=3, amostras=200):
+    """Arquivo mensal de vendas: tamanho das tabelas, tempo de arquivamento e reimpressão"""
+    app, db = preparar_banco()
+    from app import Venda
+    from app.arquivo_vendas import arquivar_vendas
+    from app.migracoes import compactar
+    from app.estatisticas import calcular_estatisticas, inicio_do_dia_utc
+
+    app.config['VENDAS_ARQUIVO_DIR'] = tempfile.mkdtemp(prefix='supermercado_arquivo_')
+    with app.app_context():
+        gerar_catalogo(db, 5000)
+        db.session.commit()
+        operadores = gerar_operadores(db, 8)
+        gerar_historico_vendas(db, vendas, operadores, em_ordem=True)
+        do_caixa = db.session.scalars(
+            db.select(Venda.id).where(Venda.operador_id == operadores[0])
+            .order_by(Venda.data_venda.desc(), Venda.id.desc())
+        ).all()
+
+    cliente = cliente_logado(app)
+    caixa = cliente_logado(app, 'caixa01')
+
+    def medir():
+        with app.app_context():
+            tamanhos = [tamanho_tabela(db, tabela) for tabela in ('vendas', 'itens_venda')]
+            ids = db.session.scalars(db.select(Venda.id)).all()
+            inicio = time.perf_counter()
+            for _ in range(20):
+                calcular_estatisticas(inicio_do_dia_utc())
+            dashboard = (time.perf_counter() - inicio) / 20
+        return tamanhos, ids, dashboard
+
+    def reimprimir(rotulo, ids):
+        latencias = []
+        for venda_id in random.Random(22).sample(ids, min(amostras, len(ids))):
+            inicio = time.perf_counter()
+            resposta = cliente.get(f'/api/nota-fiscal/{venda_id}?formato=texto')
+            latencias.append(time.perf_counter() - inicio)
+            if resposta.status_code != 200:
+                print(f"   ❌ Nota da venda {venda_id}: HTTP {resposta.status_code}")
+                return False
+        resumo_latencias(rotulo, latencias)
+        return True
+
+    (vendas_antes, itens_antes), ids_antes, dashboard_antes = medir()
+    inicio = time.perf_counter()
+    with app.app_context():
+        resultados = arquivar_vendas(meses_mantidos)
+        duracao = time.perf_counter() - inicio
+        compactar(db)
+    (vendas_depois, itens_depois), ids_depois, dashboard_depois = medir()
+
+    arquivadas = sum(r['vendas'] for r in resultados)
+    tamanho_arquivo = sum(r['bytes'] for r in resultados)
+    mb = lambda valor: f"{valor / 1024 / 1024:8.1f}MB" if valor else '       -'
+    print(f"\n🗄️  {len(resultados)} meses arquivados ({arquivadas} vendas) em {duracao:.1f}s "
+          f"({arquivadas / duracao:.0f} vendas/s), mantendo {meses_mantidos} meses\n")
+    print(f"   {'':<24} {'antes':>10} {'depois':>10}")
+    print(f"   {'vendas no banco':<24} {len(ids_antes):>10} {len(ids_depois):>10}")
+    print(f"   {'tabela vendas':<24} {mb(vendas_antes):>10} {mb(vendas_depois):>10}")
+    print(f"   {'tabela itens_venda':<24} {mb(itens_antes):>10} {mb(itens_depois):>10}")
+    print(f"   {'contadores do dashboard':<24} {dashboard_antes * 1000:8.2f}ms {dashboard_depois * 1000:8.2f}ms")
+    print(f"   arquivos .jsonl.gz: {mb(tamanho_arquivo).strip()}\n")
+
+    ok = arquivadas + len(ids_depois) == len(ids_antes)
+    if not ok:
+        print(f"   ❌ {len(ids_antes)} vendas antes, {arquivadas} arquivadas e {len(ids_depois)} no banco")
+    arquivados = sorted(set(ids_antes) - set(ids_depois))
+    ok = reimprimir('nota (venda no banco)', ids_depois) and ok
+    ok = reimprimir('nota (venda arquivada)', arquivados) and ok
+
+    # Histórico do caixa01 inteiro, do banco aos resumos arquivados
+    paginas, latencias, url = [], [], '/api/vendas?limite=100'
+    while url:
+        inicio = time.perf_counter()
+        resposta = caixa.get(url).get_json()
+        latencias.append(time.perf_counter() - inicio)
+        paginas += [venda['id'] for venda in resposta['vendas']]
+        proximo = resposta['proximo']
+        url = proximo and f"/api/vendas?limite=100&antes={proximo['antes']}&antes_id={proximo['antes_id']}"
+    resumo_latencias(f'histórico ({len(latencias)} páginas)', latencias)
+    if paginas != do_caixa:
+        print(f"   ❌ Histórico do caixa01: {len(paginas)} vendas nas páginas, {len(do_caixa)} esperadas")
+        ok = False
+    return ok
+
+
+def bench_exportacao(vendas=300000, amostra_orm=2000):
+    """Exportação das vendas em Parquet: linhas/s, memória e exportação incremental
+
+    Cada exportação roda em um processo próprio (populate_db.py exportar-vendas)
+    para medir o pico de memória só dela; exportar metade ou todas as vendas
+    deve usar a mesma memória.
+    """
+    app, db = preparar_banco()
+    from app import Venda
+    from app.exportacao_vendas import ExportacaoIndisponivel, ler_marca, _verificar
+
+    try:
+        _verificar('parquet')
+    except ExportacaoIndisponivel as e:
+        print(f"❌ {e}")
+        return False
+
+    with app.app_context():
+        gerar_catalogo(db, 5000)
+        db.session.commit()
+        operadores = gerar_operadores(db, 8)
+        itens = gerar_historico_vendas(db, vendas, operadores, em_ordem=True)
+
+    def exportar(destino, *argumentos):
+        processo = subprocess.Popen(
+            [sys.executable, 'populate_db.py', 'exportar-vendas', destino, 'parquet', *argumentos],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL
+        )
+        inicio = time.perf_counter()
+        _, status, uso = os.wait4(processo.pid, 0)
+        duracao = time.perf_counter() - inicio
+        processo.returncode = os.waitstatus_to_exitcode(status)
+        memoria = uso.ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else uso.ru_maxrss / 1024
+        return processo.returncode == 0, duracao, memoria
+
+    def tamanho(destino):
+        return sum(os.path.getsize(os.path.join(pasta, nome))
+                   for pasta, _, nomes in os.walk(destino) for nome in nomes) / 1024 / 1024
+
+    completo, metade = tempfile.mkdtemp(prefix='supermercado_export_'), tempfile.mkdtemp(prefix='supermercado_export_')
+    ok_metade, duracao_metade, memoria_metade = exportar(metade, '--desde', str(vendas // 2))
+    ok_completo, duracao_completo, memoria_completo = exportar(completo)
+    marca = ler_marca(completo)
+
+    # Incremental: um dia de vendas novas depois da marca
+    with app.app_context():
+        novas = gerar_historico_vendas(db, 1000, operadores, dias=1, semente=23)
+    ok_incremental, duracao_incremental, memoria_incremental = exportar(completo)
+
+    # Caminho pelo ORM: objetos Venda, venda.itens e item.produto, em uma amostra
+    with app.app_context():
+        ids = db.session.scalars(db.select(Venda.id).order_by(Venda.id).limit(amostra_orm)).all()
+        inicio = time.perf_counter()
+        linhas_orm = 0
+        for venda in Venda.query.filter(Venda.id.in_(ids)).all():
+            for item in venda.itens:
+                linhas_orm += item.produto.codigo_barras is not None
+        duracao_orm = time.perf_counter() - inicio
+
+    print(f"\n📤 {vendas} vendas, {itens} itens\n")
+    print(f"   {'exportação':<28} {'itens':>9} {'tempo':>8} {'itens/s':>9} {'memória':>9}")
+    for rotulo, linhas, duracao, memoria in (
+        ('metade das vendas', itens - itens * (vendas // 2) // vendas, duracao_metade, memoria_metade),
+        ('todas as vendas', itens, duracao_completo, memoria_completo),
+        ('incremental (1000 vendas)', novas, duracao_incremental, memoria_incremental),
+    ):
+        print(f"   {rotulo:<28} {'~' if rotulo.startswith('metade') else ' '}{linhas:>8} "
+              f"{duracao:7.1f}s {linhas / duracao:9.0f} {memoria:7.0f}MB")
+    print(f"   {'ORM (venda.itens, amostra)':<28} {linhas_orm:>9} {duracao_orm:7.1f}s "
+          f"{linhas_orm / duracao_orm:9.0f}")
+    print(f"\n   Parquet: {tamanho(completo):.1f}MB em disco, marca na venda {ler_marca(completo)}\n")
+
+    ok = ok_metade and ok_completo and ok_incremental and marca == vendas
+    if not ok:
+        print(f"   ❌ Falha na exportação (marca {marca}, esperado {vendas})")
+    if memoria_completo > memoria_metade * 1.5:
+        print(f"   ❌ Memória cresce com o volume: {memoria_metade:.0f}MB -> {memoria_completo:.0f}MB")
+        ok = False
+    return ok
+
+
+def bench_historico(vendas=300000, consultas=200, paginas=50):
+    """Histórico de vendas do PDV: primeira página (cache) e páginas por posição x OFFSET"""
+    app, db = preparar_banco()
+    from datetime import date
+    from app import Venda, ItemVenda
+    from app.caches import cache_vendas_recentes
+    from app.historico_vendas import LIMITE_PADRAO_HISTORICO, _consultar
+
+    with app.app_context():
+        gerar_catalogo(db, 5000)
+        db.session.commit()
+        operadores = gerar_operadores(db, 8)
+        gerar_historico_vendas(db, vendas, operadores, em_ordem=True)
+        do_caixa = db.session.scalar(db.select(db.func.count()).where(Venda.operador_id == operadores[0]))
+
+    caixa = cliente_logado(app, 'caixa01')
+    admin = cliente_logado(app, 'admin', 'admin123')
+
+    def medir(funcao):
+        latencias = []
+        for _ in range(consultas):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            latencias.append(time.perf_counter() - inicio)
+        return latencias, resultado
+
+    def requisicao(cliente, url, limpar=False):
+        def funcao():
+            if limpar:
+                cache_vendas_recentes.clear()
+            return cliente.get(url).get_json()
+        return funcao
+
+    print(f"\n🧾 {vendas} vendas, {do_caixa} do caixa01, {consultas} consultas por cenário\n")
+    ok = True
+    latencias, resposta = medir(requisicao(caixa, '/api/vendas'))
+    ok = ok and len(resposta['vendas']) == LIMITE_PADRAO_HISTORICO
+    resumo_latencias('primeira página (cache)', latencias)
+    resumo_latencias('primeira página (sem cache)', medir(requisicao(caixa, '/api/vendas', limpar=True))[0])
+
+    # A mesma página pela posição da venda anterior x OFFSET (só o SQL)
+    with app.app_context():
+        ordem = (Venda.data_venda.desc(), Venda.id.desc())
+        for pagina in (paginas, do_caixa // LIMITE_PADRAO_HISTORICO):
+            pulo = (pagina - 1) * LIMITE_PADRAO_HISTORICO
+            anterior = db.session.execute(
+                db.select(Venda.data_venda, Venda.id).where(Venda.operador_id == operadores[0])
+                .order_by(*ordem).offset(pulo - 1).limit(1)
+            ).one()
+            latencias, linhas = medir(lambda: _consultar(operadores[0], None, None, tuple(anterior),
+                                                         LIMITE_PADRAO_HISTORICO + 1))
+            resumo_latencias(f'página {pagina} (posição)', latencias)
+            itens = (db.select(db.func.count()).where(ItemVenda.venda_id == Venda.id).scalar_subquery())
+            latencias, pelo_offset = medir(lambda: db.session.execute(
+                db.select(Venda.id, Venda.data_venda, Venda.valor_total, itens, Venda.operador_id)
+                .where(Venda.operador_id == operadores[0])
+                .order_by(*ordem).offset(pulo).limit(LIMITE_PADRAO_HISTORICO + 1)
+            ).all())
+            resumo_latencias(f'página {pagina} (OFFSET)', latencias)
+            if [linha[0] for linha in linhas] != [linha[0] for linha in pelo_offset]:
+                print(f"   ❌ Página {pagina}: posição e OFFSET trazem vendas diferentes")
+                ok = False
+
+    hoje = date.today().isoformat()
+    resumo_latencias('admin: hoje, todos os caixas',
+                     medir(requisicao(admin, f'/api/vendas?inicio={hoje}&fim={hoje}'))[0])
+    return ok
+
+def bench_reposicao(produtos=100000, vendas=200000, repeticoes=20):
+    """Reposição: valor do estoque no banco x no Python e sugestões de compra"""
+    app, db = preparar_banco()
+    from app import Produto
+    from app.reposicao import valor_estoque, sugestoes_reposicao, recalcular_velocidades
+
+    with app.app_context():
+        gerar_catalogo(db, produtos)
+        db.session.commit()
+        gerar_historico_vendas(db, vendas, gerar_operadores(db, 8), dias=60, em_ordem=True)
+        # Estoques de 0 a 3 semanas de venda, para haver o que repor
+        aleatorio = random.Random(25)
+        db.session.execute(
+            Produto.__table__.update().where(Produto.id == db.bindparam('produto_id'))
+            .values(estoque=db.bindparam('estoque')),
+            [{'produto_id': produto_id, 'estoque': aleatorio.randint(0, 60)}
+             for produto_id in db.session.scalars(db.select(Produto.id))]
+        )
+        db.session.commit()
+
+        inicio = time.perf_counter()
+        com_velocidade = recalcular_velocidades()
+        duracao_recalculo = time.perf_counter() - inicio
+
+        def medir(funcao):
+            latencias = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                resultado = funcao()
+                latencias.append(time.perf_counter() - inicio)
+                db.session.expunge_all()
+            return latencias, resultado
+
+        python, total_python = medir(lambda: sum(p.preco * p.estoque for p in Produto.query.all()))
+        banco, valor = medir(valor_estoque)
+        sugestoes, reposicao = medir(sugestoes_reposicao)
+
+    print(f"\n🚚 {produtos} produtos, {vendas} vendas em 60 dias; velocidades recalculadas para "
+          f"{com_velocidade} produtos em {duracao_recalculo:.1f}s\n")
+    resumo_latencias('valor do estoque (Python)', python)
+    resumo_latencias('valor do estoque (SQL)', banco)
+    resumo_latencias('sugestões de compra', sugestoes)
+    print(f"\n   {reposicao['total']} produtos a repor; o mais urgente: {reposicao['sugestoes'][0]}"
+          if reposicao['sugestoes'] else "\n   Nenhum produto a repor")
+
+    ok = valor['valor_total'] == total_python
+    if not ok:
+        print(f"   ❌ Valor do estoque diferente: SQL {valor['valor_total']} x Python {total_python}")
+    return ok
+
+
+COMANDOS = {
+    'vendas-concorrentes': bench_vendas_concorrentes,
+    'busca': bench_busca,
+    'planos': bench_planos,
+    'nota-fiscal': bench_nota_fiscal,
+    'formatos-nota': bench_formatos_nota,
+    'itens-json': bench_itens_json,
+    'logins': bench_logins,
+    'servidor': bench_servidor,
+    'inicializacao': bench_inicializacao,
+    'catalogo': bench_catalogo,
+    'pdv': bench_pdv,
+    'metricas': bench_metricas,
+    'sincronizacao': bench_sincronizacao,
+    'eventos': bench_eventos,
+    'lote': bench_lote,
+    'arquivo': bench_arquivo,
+    'exportacao': bench_exportacao,
+    'historico': bench_historico,
+    'reposicao': bench_reposicao,
+}
+
+if __name__ == "__main__":
+    print("🛒 Sistema de Supermercado - Benchmarks")
+    print("=" * 60)
+
+    if len(sys.argv) < 2 or sys.argv[1].lower() not in COMANDOS:
+        print("Uso: python benchmark.py [comando]")
+        print("\nComandos disponíveis:")
+        print("  vendas-concorrentes  - Vendas paralelas com verificação de estoque")
+        print("  busca                - Latência da busca de produtos em 100 mil itens")
+        print("  planos               - EXPLAIN das consultas frequentes (falha se houver seq scan)")
+        print("  nota-fiscal          - Tempo de geração da nota fiscal em PDF por quantidade de itens")
+        print("  formatos-nota        - Nota em PDF x texto x ESC/POS: tempo de geração e tamanho")
+        print("  itens-json [vendas]  - Tamanho e inserção antes/depois de remover vendas.itens_json")
+        print("  logins               - Logins/s de cada algoritmo de hash de senha")
+        print("  servidor             - Carga HTTP no servidor de desenvolvimento x produção")
+        print("  inicializacao        - Tempo de importação e memória por worker (python -X importtime)")
+        print("  catalogo [linhas]    - Importação/exportação do catálogo CSV e JSON (100 mil linhas)")
+        print("  pdv [produtos] [vendas] [segundos] [caixas]")
+        print("                       - Caixas e dashboard simultâneos: p50/p95/p99 por endpoint")
+        print("  metricas             - Custo por requisição das métricas (METRICAS=0 x 1)")
+        print("  sincronizacao [produtos] [alteracoes] [vendas]")
+        print("                       - Catálogo local do PDV (completo x delta), feed de alterações")
+        print("                         e reenvio da fila")
+        print("  eventos [telas] [alteracoes]")
+        print("                       - Entrega dos eventos de estoque e preço (SSE) a muitas telas")
+        print("  lote [produtos] [itens] - Rajada de leituras: GET por código x POST /api/produtos/lookup")
+        print("  arquivo [vendas] [meses] - Arquivo mensal de vendas: tamanho, arquivamento e reimpressão")
+        print("  exportacao [vendas]  - Exportação das vendas em Parquet: itens/s, memória e incremental")
+        print("  historico [vendas]   - Vendas Recentes do PDV: cache, páginas por posição x OFFSET")
+        print("  reposicao [produtos] [vendas] - Valor do estoque (SQL x Python) e sugestões de compra")
+        print("\nExemplo: python benchmark.py vendas-concorrentes")
+        sys.exit(1)
+
+    ok = COMANDOS[sys.argv[1].lower()](*map(int, sys.argv[2:]))
+    sys.exit(0 if ok is not False else 1)
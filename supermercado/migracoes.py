@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Sistema de Supermercado - Migrações de esquema (linha de comando)
+As migrações ficam em app/migracoes.py
+"""
+
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app import busca as busca_produtos
+from app.migracoes import MIGRACOES, aplicar_migracoes, versao_atual, compactar
+
+if __name__ == "__main__":
+    comando = sys.argv[1].lower() if len(sys.argv) > 1 else 'status'
+    with create_app().app_context():
+        if comando == 'aplicar':
+            if not aplicar_migracoes(db):
+                print("✅ Banco já está na versão mais recente.")
+        elif comando == 'status':
+            atual = versao_atual(db)
+            print(f"🗄️  Versão do esquema: {atual}")
+            for versao, descricao, _ in MIGRACOES:
+                marca = '✅' if versao <= atual else '⏳'
+                print(f"   {marca} {versao:03d} - {descricao}")
+        elif comando == 'compactar':
+            if compactar(db):
+                print("✅ Banco compactado.")
+            else:
+                print("⚠️  Compactação não suportada para este banco.")
+        elif comando == 'busca':
+            # Depois de instalar pg_trgm/unaccent em um banco que subiu sem elas
+            busca_produtos.criar_indice_busca(db)
+            print("✅ Índices de busca verificados.")
+        else:
+            print("Uso: python migracoes.py [status|aplicar|compactar|busca]")
+            sys.exit(1)
@@ -10,8 +10,18 @@ import os
 # Adicionar o diretório raiz ao path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db, Produto
+from app import create_app, db, Produto
+from app.relatorios import reconstruir_resumos
+from app.arquivo_vendas import MESES_MANTIDOS, arquivar_vendas, periodos_arquivados
+from app.exportacao_vendas import ExportacaoIndisponivel, exportar_vendas_diretorio
+from app.reposicao import sugestoes_reposicao, valor_estoque, recalcular_velocidades
+from app.catalogo import (CatalogoInvalido, ler_catalogo, importar_catalogo,
+                          exportar_catalogo, formato_do_arquivo)
+from datetime import datetime
 import random
+import time
+
+app = create_app()
 
 def generate_barcode():
     """Gera um código de barras aleatório"""
@@ -84,34 +94,26 @@ def create_sample_products():
             print("💡 Para recriar os produtos, primeiro limpe o banco de dados.")
             return
         
-        created_count = 0
-        for product_data in sample_products:
-            try:
-                # Gerar código de barras único
+        # Códigos únicos gerados em memória e gravados em um único lote
+        codigos = set()
+        linhas = []
+        for numero, product_data in enumerate(sample_products, start=1):
+            codigo_barras = generate_barcode()
+            while codigo_barras in codigos:
                 codigo_barras = generate_barcode()
-                
-                # Verificar se o código já existe (improvável, mas por segurança)
-                while Produto.query.filter_by(codigo_barras=codigo_barras).first():
-                    codigo_barras = generate_barcode()
-                
-                produto = Produto(
-                    nome=product_data["nome"],
-                    preco=product_data["preco"],
-                    estoque=product_data["estoque"],
-                    codigo_barras=codigo_barras,
-                    categoria=product_data["categoria"]
-                )
-                
-                db.session.add(produto)
-                created_count += 1
-                print(f"✅ Produto criado: {product_data['nome']} - Código: {codigo_barras}")
-                
-            except Exception as e:
-                print(f"❌ Erro ao criar produto {product_data['nome']}: {str(e)}")
+            codigos.add(codigo_barras)
+            linhas.append((numero, dict(product_data, codigo_barras=codigo_barras)))
         
-        try:
-            db.session.commit()
-            print(f"\n🎉 Sucesso! {created_count} produtos foram criados no banco de dados.")
+        relatorio = importar_catalogo(linhas)
+        erros = {erro['linha']: erro['erro'] for erro in relatorio['erros']}
+        for numero, product_data in linhas:
+            if numero in erros:
+                print(f"❌ Erro ao criar produto {product_data['nome']}: {erros[numero]}")
+            else:
+                print(f"✅ Produto criado: {product_data['nome']} - Código: {product_data['codigo_barras']}")
+        
+        if relatorio['inseridos']:
+            print(f"\n🎉 Sucesso! {relatorio['inseridos']} produtos foram criados no banco de dados.")
             print("\n📊 Resumo por categoria:")
             
             # Mostrar resumo por categoria
@@ -119,12 +121,8 @@ def create_sample_products():
             for categoria, count in categorias:
                 print(f"   • {categoria}: {count} produtos")
                 
-            print(f"\n💰 Valor total em estoque: R$ {sum(p.preco * p.estoque for p in Produto.query.all()):.2f}")
+            print(f"\n💰 Valor total em estoque: R$ {valor_estoque()['valor_total']:.2f}")
             print("🚀 Agora você pode testar o sistema com produtos reais!")
-            
-        except Exception as e:
-            db.session.rollback()
-            print(f"❌ Erro ao salvar produtos no banco: {str(e)}")
 
 def clear_products():
     """Remove todos os produtos do banco de dados"""
@@ -158,16 +156,141 @@ def show_stats():
         for categoria, count in categorias:
             print(f"   • {categoria}: {count} produtos")
         
-        # Valor total em estoque
-        valor_total = sum(p.preco * p.estoque for p in Produto.query.all())
-        print(f"\n💰 Valor total em estoque: R$ {valor_total:.2f}")
+        # Valor total em estoque (somado no banco)
+        valor = valor_estoque()
+        print(f"\n💰 Valor total em estoque: R$ {valor['valor_total']:.2f} ({valor['unidades']} unidades)")
         
-        # Produtos com estoque baixo (menos de 20 unidades)
-        produtos_baixo_estoque = Produto.query.filter(Produto.estoque < 20).all()
-        if produtos_baixo_estoque:
-            print(f"\n⚠️  Produtos com estoque baixo ({len(produtos_baixo_estoque)}):")
-            for produto in produtos_baixo_estoque:
+        # Produtos com estoque baixo (menos de 20 unidades): só os 20 menores
+        total_baixo_estoque = Produto.query.filter(Produto.estoque < 20).count()
+        if total_baixo_estoque:
+            print(f"\n⚠️  Produtos com estoque baixo ({total_baixo_estoque}):")
+            for produto in Produto.query.filter(Produto.estoque < 20).order_by(Produto.estoque, Produto.id).limit(20):
                 print(f"   • {produto.nome}: {produto.estoque} unidades")
+            if total_baixo_estoque > 20:
+                print(f"   ... e mais {total_baixo_estoque - 20}")
+        
+        reposicao = sugestoes_reposicao(limite=10)
+        if reposicao['total']:
+            print(f"\n🚚 Sugestões de compra ({reposicao['total']}):")
+            for sugestao in reposicao['sugestoes']:
+                print(f"   • {sugestao['nome']}: {sugestao['estoque']} unidades, "
+                      f"{sugestao['velocidade']}/dia, {sugestao['dias_cobertura']} dias -> "
+                      f"comprar {sugestao['sugerido']}")
+
+def rebuild_velocities():
+    """Recalcula a velocidade de vendas dos produtos a partir dos resumos diários"""
+    print("🚚 Recalculando velocidade de vendas...")
+    
+    with app.app_context():
+        try:
+            produtos = recalcular_velocidades()
+            print(f"✅ {produtos} produtos com vendas recentes.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Erro ao recalcular velocidades: {str(e)}")
+
+def rebuild_reports(inicio=None, fim=None):
+    """Recalcula as tabelas de resumo de vendas usadas pelos relatórios"""
+    print("📈 Reconstruindo resumos de vendas...")
+    
+    with app.app_context():
+        try:
+            dias = reconstruir_resumos(inicio, fim)
+            print(f"✅ Resumos recalculados para {dias} dias.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Erro ao reconstruir resumos: {str(e)}")
+
+def archive_sales(meses_mantidos=MESES_MANTIDOS):
+    """Move para o arquivo mensal as vendas anteriores aos meses mantidos"""
+    print(f"🗄️  Arquivando vendas anteriores aos últimos {meses_mantidos} meses...")
+    
+    with app.app_context():
+        try:
+            resultados = arquivar_vendas(meses_mantidos)
+        except Exception as e:
+            print(f"❌ Erro ao arquivar vendas: {str(e)}")
+            return False
+        
+        for resultado in resultados:
+            print(f"   • {resultado['periodo']}: {resultado['vendas']} vendas, {resultado['itens']} itens "
+                  f"-> {resultado['arquivo']} ({resultado['bytes'] / 1024 / 1024:.1f} MB)")
+        if resultados:
+            print("✅ Vendas arquivadas. Execute 'python migracoes.py compactar' para devolver o espaço ao disco.")
+        else:
+            print("✅ Nenhum mês a arquivar.")
+        
+        periodos = periodos_arquivados()
+        if periodos:
+            print(f"\n📦 Meses arquivados: {len(periodos)} ({periodos[0]['periodo']} a {periodos[-1]['periodo']}), "
+                  f"{sum(p['vendas'] for p in periodos)} vendas")
+    return True
+
+def export_sales(destino, formato='parquet', desde=None):
+    """Exporta os itens vendidos desde a última exportação, um arquivo por dia"""
+    print(f"📤 Exportando vendas para {destino} ({formato})...")
+    
+    with app.app_context():
+        inicio = time.perf_counter()
+        try:
+            relatorio = exportar_vendas_diretorio(destino, formato, desde=desde)
+        except (OSError, ExportacaoIndisponivel) as e:
+            print(f"❌ Erro ao exportar vendas: {str(e)}")
+            return False
+        duracao = time.perf_counter() - inicio
+    
+    if relatorio['ate'] <= relatorio['desde']:
+        print(f"✅ Nenhuma venda nova depois da venda {relatorio['desde']}.")
+    else:
+        print(f"✅ Vendas {relatorio['desde'] + 1} a {relatorio['ate']}: {relatorio['linhas']} itens "
+              f"em {relatorio['arquivos']} arquivos ({relatorio['dias']} dias) em {duracao:.1f}s")
+    return True
+
+def import_catalog(caminho):
+    """Importa (ou atualiza pelo código de barras) um catálogo CSV ou JSON"""
+    formato = formato_do_arquivo(caminho)
+    if formato is None:
+        print("❌ Use um arquivo .csv, .json ou .jsonl")
+        return False
+    print(f"📥 Importando {caminho}...")
+    
+    with app.app_context():
+        inicio = time.perf_counter()
+        try:
+            with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+                relatorio = importar_catalogo(ler_catalogo(arquivo, formato))
+        except (OSError, UnicodeDecodeError, CatalogoInvalido) as e:
+            print(f"❌ Erro ao ler o arquivo: {str(e)}")
+            return False
+        duracao = time.perf_counter() - inicio
+    
+    for erro in relatorio['erros']:
+        print(f"   ⚠️  Linha {erro['linha']}: {erro['erro']}")
+    if relatorio['total_erros'] > len(relatorio['erros']):
+        print(f"   ... e mais {relatorio['total_erros'] - len(relatorio['erros'])} erros")
+    if relatorio.get('interrompido'):
+        print(f"❌ Importação interrompida: {relatorio['interrompido']}")
+    icone = '✅' if relatorio['total_erros'] == 0 else '⚠️ '
+    print(f"{icone} {relatorio['linhas']} linhas em {duracao:.1f}s: {relatorio['inseridos']} inseridos, "
+          f"{relatorio['atualizados']} atualizados, {relatorio['repetidos']} repetidos, "
+          f"{relatorio['total_erros']} com erro")
+    return relatorio['total_erros'] == 0 and not relatorio.get('interrompido')
+
+def export_catalog(caminho, apenas_ativos=False):
+    """Exporta o catálogo para CSV ou JSON, em blocos"""
+    formato = formato_do_arquivo(caminho)
+    if formato is None:
+        print("❌ Use um arquivo .csv ou .json")
+        return False
+    print(f"📤 Exportando catálogo para {caminho}...")
+    
+    with app.app_context():
+        with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+            for bloco in exportar_catalogo(formato, apenas_ativos=apenas_ativos):
+                arquivo.write(bloco)
+        total = Produto.query.filter_by(ativo=True).count() if apenas_ativos else Produto.query.count()
+    print(f"✅ {total} produtos exportados.")
+    return True
 
 if __name__ == "__main__":
     print("🛒 Sistema de Supermercado - Utilitário de Banco de Dados")
@@ -179,6 +302,12 @@ if __name__ == "__main__":
         print("  create  - Criar produtos de exemplo")
         print("  clear   - Limpar todos os produtos")
         print("  stats   - Mostrar estatísticas")
+        print("  resumos - Reconstruir resumos de vendas [AAAA-MM-DD] [AAAA-MM-DD]")
+        print("  velocidades - Recalcular a velocidade de vendas (reposição) a partir dos resumos")
+        print(f"  arquivar - Arquivar vendas de meses antigos [meses mantidos, padrão {MESES_MANTIDOS}]")
+        print("  exportar-vendas - Exportar itens vendidos (incremental) <diretório> [parquet|arrow] [--desde ID]")
+        print("  importar - Importar catálogo CSV/JSON (upsert por código de barras) <arquivo>")
+        print("  exportar - Exportar catálogo para CSV/JSON <arquivo> [--ativos]")
         print("\nExemplo: python populate_db.py create")
         sys.exit(1)
     
@@ -194,6 +323,35 @@ if __name__ == "__main__":
             print("Operação cancelada.")
     elif command == "stats":
         show_stats()
+    elif command == "resumos":
+        datas = [datetime.strptime(arg, '%Y-%m-%d').date() for arg in sys.argv[2:4]]
+        rebuild_reports(*datas)
+    elif command == "velocidades":
+        rebuild_velocities()
+    elif command == "arquivar":
+        ok = archive_sales(*map(int, sys.argv[2:3]))
+        sys.exit(0 if ok else 1)
+    elif command == "exportar-vendas":
+        argumentos = sys.argv[2:]
+        desde = None
+        if '--desde' in argumentos:
+            posicao = argumentos.index('--desde')
+            desde = int(argumentos[posicao + 1])
+            del argumentos[posicao:posicao + 2]
+        if not argumentos:
+            print("Uso: python populate_db.py exportar-vendas <diretório> [parquet|arrow] [--desde ID]")
+            sys.exit(1)
+        ok = export_sales(argumentos[0], *argumentos[1:2], desde=desde)
+        sys.exit(0 if ok else 1)
+    elif command in ("importar", "exportar"):
+        if len(sys.argv) < 3:
+            print(f"Uso: python populate_db.py {command} <arquivo.csv|arquivo.json>")
+            sys.exit(1)
+        if command == "importar":
+            ok = import_catalog(sys.argv[2])
+        else:
+            ok = export_catalog(sys.argv[2], apenas_ativos='--ativos' in sys.argv[3:])
+        sys.exit(0 if ok else 1)
     else:
         print(f"❌ Comando '{command}' não reconhecido.")
-        print("Comandos válidos: create, clear, stats")
\ No newline at end of file
+        print("Comandos válidos: create, clear, stats, resumos, importar, exportar")
\ No newline at end of file
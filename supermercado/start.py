@@ -2,12 +2,16 @@
 """
 Script de inicialização rápida do Sistema de Supermercado
 Este script facilita a configuração inicial do sistema
+
+Uso:
+    python start.py            # Configuração inicial interativa
+    python start.py producao   # Servidor WSGI com vários processos e threads
 """
 
 import os
 import sys
+import importlib.util
 import subprocess
-import time
 
 def print_banner():
     """Exibe o banner do sistema"""
@@ -41,14 +45,12 @@ def install_dependencies():
 def check_postgresql():
     """Verifica se o PostgreSQL está disponível"""
     print("🐘 Verificando PostgreSQL...")
-    try:
-        import psycopg2
+    if importlib.util.find_spec('psycopg2') is not None:
         print("✅ Driver PostgreSQL (psycopg2) instalado!")
         return True
-    except ImportError:
-        print("❌ Driver PostgreSQL não encontrado!")
-        print("💡 Instale com: pip install psycopg2-binary")
-        return False
+    print("❌ Driver PostgreSQL não encontrado!")
+    print("💡 Instale com: pip install psycopg2-binary")
+    return False
 
 def create_database():
     """Cria o banco de dados se não existir"""
@@ -56,10 +58,11 @@ def create_database():
     
     # Importar após instalar dependências
     try:
-        from app import app, db
+        from app import create_app, db
+        from app import migracoes
         
-        with app.app_context():
-            db.create_all()
+        with create_app().app_context():
+            migracoes.aplicar_migracoes(db)
             print("✅ Tabelas do banco de dados criadas!")
             return True
     except Exception as e:
@@ -90,7 +93,8 @@ def show_instructions():
     print("=" * 70)
     print()
     print("🚀 Para iniciar o sistema:")
-    print("   python app.py")
+    print("   python app.py              # Desenvolvimento (debug)")
+    print("   python start.py producao   # Produção (vários workers)")
     print()
     print("🌐 Acesse no navegador:")
     print("   http://localhost:5000")
@@ -114,6 +118,105 @@ def show_instructions():
     print("📖 Para mais informações, consulte o README.md")
     print("=" * 70)
 
+def psycopg_cooperativo():
+    """Com gevent, faz o psycopg2 liberar o worker enquanto espera o banco
+
+    Sem isso, uma venda esperando o lock de um produto trava o worker inteiro,
+    inclusive a greenlet que segura o lock.
+    """
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:  # dependência opcional
+        if not os.getenv('DATABASE_URL', 'sqlite').startswith('sqlite'):
+            print("⚠️  psycogreen não instalado: com gevent, esperas do PostgreSQL bloqueiam o worker")
+        return
+    patch_psycopg()
+
+def run_production():
+    """Inicia o servidor WSGI de produção
+
+    Linux/macOS: gunicorn com workers gevent (padrão quando instalado: cada
+    tela recebendo eventos é uma greenlet, centenas por worker) ou gthread
+    (WEB_WORKERS processos com WEB_THREADS threads cada). Windows: waitress,
+    um processo com WEB_THREADS.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    host = os.getenv('WEB_HOST', '0.0.0.0')
+    porta = int(os.getenv('WEB_PORTA', '5000'))
+    workers = int(os.getenv('WEB_WORKERS', str(min((os.cpu_count() or 1) * 2 + 1, 8))))
+    if os.getenv('DATABASE_URL', 'sqlite').startswith('sqlite') and not os.getenv('WEB_WORKERS'):
+        # O SQLite aceita um único escritor: vários processos só disputariam o lock
+        print("⚠️  SQLite detectado: usando 1 worker (defina WEB_WORKERS para alterar)")
+        workers = 1
+    threads = int(os.getenv('WEB_THREADS', '8'))
+    classe_worker = os.getenv('WEB_WORKER_CLASS') or \
+        ('gevent' if importlib.util.find_spec('gevent') else 'gthread')
+    if classe_worker != 'gevent':
+        # Cada tela recebendo eventos (SSE) ocupa uma thread: metade fica
+        # reservada para as demais requisições; as telas recusadas (503)
+        # passam a consultar /api/produtos/changes
+        os.environ.setdefault('EVENTOS_MAX_ASSINANTES', str(max(threads // 2, 1)))
+    else:
+        # Antes de importar a aplicação: os locks criados na importação dos
+        # módulos (caches, canal de eventos) precisam ser os do gevent
+        from gevent import monkey
+        monkey.patch_all()
+        psycopg_cooperativo()
+    
+    # Migrações e usuários padrão uma única vez, antes de criar os workers
+    from app import create_app, db, init_db
+    app = create_app()
+    with app.app_context():
+        init_db()
+    
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        BaseApplication = None
+    
+    if BaseApplication is not None:
+        class ServidorGunicorn(BaseApplication):
+            def load_config(self):
+                opcoes = {
+                    'bind': f"{host}:{porta}",
+                    'workers': workers,
+                    'threads': threads,
+                    'worker_class': classe_worker,
+                    'worker_connections': int(os.getenv('WEB_CONEXOES', '1000')),
+                    'timeout': int(os.getenv('WEB_TIMEOUT', '60')),
+                    'keepalive': 5,
+                    'accesslog': os.getenv('WEB_ACCESS_LOG') or None,
+                }
+                for chave, valor in opcoes.items():
+                    self.cfg.set(chave, valor)
+            
+            def load(self):
+                # Cada worker cria a própria aplicação (e o próprio pool de conexões)
+                return create_app()
+        
+        # Conexões abertas pelo init_db não podem ser herdadas pelos workers
+        with app.app_context():
+            db.engine.dispose()
+        
+        if classe_worker == 'gevent':
+            print(f"🚀 gunicorn (gevent) em http://{host}:{porta} ({workers} workers)")
+        else:
+            print(f"🚀 gunicorn em http://{host}:{porta} ({workers} workers x {threads} threads)")
+        ServidorGunicorn().run()
+        return
+    
+    try:
+        from waitress import serve
+    except ImportError:
+        print("❌ Nenhum servidor WSGI de produção instalado!")
+        print("💡 Instale com: pip install gunicorn (Linux/macOS) ou pip install waitress (Windows)")
+        sys.exit(1)
+    
+    print(f"🚀 waitress em http://{host}:{porta} ({threads} threads)")
+    serve(app, host=host, port=porta, threads=threads)
+
 def main():
     """Função principal"""
     print_banner()
@@ -148,7 +251,10 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        if len(sys.argv) > 1 and sys.argv[1].lower() == 'producao':
+            run_production()
+        else:
+            main()
     except KeyboardInterrupt:
         print("\n\n⚠️  Configuração interrompida pelo usuário")
         sys.exit(1)